@@ -0,0 +1,65 @@
+# benchmarks\bench_async_path.py
+"""
+Compare GET /todos/ throughput and tail latency between two running servers,
+typically the async data path and the old synchronous one.
+
+    # async path (this tree)
+    uvicorn fast_zero.app:app --port 8000 --workers 1
+    # sync path, from the revision before the AsyncSession migration
+    git worktree add ../fast_zero_sync <sync-revision>
+    (cd ../fast_zero_sync && uvicorn fast_zero.app:app --port 8001 --workers 1)
+
+    python -m benchmarks.bench_async_path --url http://127.0.0.1:8000 \\
+        --baseline-url http://127.0.0.1:8001 --concurrency 256
+
+Both servers must point at the same kind of database (Postgres for numbers
+that mean anything) and must run with a single worker.
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.loadgen import authenticate, http_client, run_load, seed_todos
+
+
+async def bench(url: str, concurrency: int, total_requests: int, name: str):
+    async with http_client(url, concurrency) as client:
+        headers = await authenticate(client)
+        await seed_todos(client, headers, 20)
+        # warm up connections and caches before measuring
+        await run_load(
+            f'{name} warmup',
+            lambda: client.get('/todos/', headers=headers),
+            concurrency=concurrency,
+            total_requests=concurrency * 2,
+        )
+        return await run_load(
+            name,
+            lambda: client.get('/todos/', headers=headers),
+            concurrency=concurrency,
+            total_requests=total_requests,
+        )
+
+
+async def main(args):
+    report = await bench(args.url, args.concurrency, args.requests, 'GET /todos/ (async)')
+    print(report.line())
+
+    if args.baseline_url:
+        baseline = await bench(
+            args.baseline_url, args.concurrency, args.requests, 'GET /todos/ (baseline)'
+        )
+        print(baseline.line())
+        print(
+            f'throughput x{report.rps / baseline.rps:.2f}, '
+            f'p99 x{report.summary()["p99_ms"] / baseline.summary()["p99_ms"]:.2f}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--baseline-url', default=None)
+    parser.add_argument('--concurrency', type=int, default=256)
+    parser.add_argument('--requests', type=int, default=20_000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+# benchmarks\bench_hashing_isolation.py
+"""
+Check that a burst of logins does not stall other traffic: measure GET /todos/
+latency alone, then again while POST /auth/token is hammered concurrently.
+
+    uvicorn fast_zero.app:app --port 8000
+    python -m benchmarks.bench_hashing_isolation --url http://127.0.0.1:8000
+
+Without --url the app is driven in process against DATABASE_URL. Rejected
+logins (503 from the password hasher queue limit) are counted as errors of
+the login load, which is expected under overload.
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.loadgen import (
+    asgi_client,
+    authenticate,
+    create_schema,
+    create_user,
+    http_client,
+    run_load,
+    seed_todos,
+)
+
+
+async def main(args):
+    if args.url:
+        client = http_client(args.url, args.concurrency + args.login_concurrency)
+    else:
+        from fast_zero.app import app  # noqa: PLC0415
+
+        await create_schema()
+        client = asgi_client(app)
+
+    async with client:
+        headers = await authenticate(client)
+        login_username = await create_user(client, 'login-password')
+        await seed_todos(client, headers, 10)
+
+        def list_todos():
+            return client.get('/todos/', headers=headers)
+
+        alone = await run_load(
+            'GET /todos/ alone',
+            list_todos,
+            concurrency=args.concurrency,
+            duration=args.duration,
+        )
+        print(alone.line())
+
+        def login():
+            return client.post(
+                '/auth/token', data={'username': login_username, 'password': 'login-password'}
+            )
+
+        under_load, logins = await asyncio.gather(
+            run_load(
+                'GET /todos/ during logins',
+                list_todos,
+                concurrency=args.concurrency,
+                duration=args.duration,
+            ),
+            run_load(
+                'POST /auth/token',
+                login,
+                concurrency=args.login_concurrency,
+                duration=args.duration,
+            ),
+        )
+        print(under_load.line())
+        print(logins.line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--login-concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,132 @@
+# benchmarks\bench_hot_paths.py
+"""
+CPU cost of the per-request hot paths: password hashing, token creation
+and verification, and the TodoPublic/UserPublic/TodoList conversions.
+
+    python -m benchmarks.bench_hot_paths [-k todo_list] [--repetitions 20]
+        [--save-baseline FILE] [--baseline FILE] [--threshold 0.05]
+
+--baseline exits with 1 when a benchmark is significantly slower (Welch's
+t-test over the repetitions) by more than --threshold. Run it before and
+after a library upgrade or a change to security.py/schemas.py, on the same
+machine; Argon2 follows the ARGON2_* settings of the environment.
+"""
+
+import argparse
+import json
+import platform
+import sys
+from datetime import UTC, datetime
+from importlib.metadata import version
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmarks.microbench import compare, load, measure, save
+
+TODO_LIST_SIZES = (1, 10, 100, 1_000, 10_000)
+
+
+def todo_rows(count: int) -> list[SimpleNamespace]:
+    now = datetime(2025, 1, 1, tzinfo=UTC)
+    return [
+        SimpleNamespace(
+            id=i,
+            title=f'todo {i}',
+            description='a description of average length',
+            state='doing',
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def cases() -> dict:
+    # imported lazily: fast_zero reads its settings at import time
+    from jwt import decode  # noqa: PLC0415
+
+    from fast_zero.schemas import TodoList, TodoPublic, UserPublic  # noqa: PLC0415
+    from fast_zero.security import (  # noqa: PLC0415
+        create_access_token,
+        decode_token,
+        get_password_hash,
+        settings,
+        verify_password,
+    )
+    from fast_zero.serialization import dumps, row_serializer  # noqa: PLC0415
+
+    hashed = get_password_hash('benchmark')
+    claims = {'sub': 'benchmark', 'uid': 1, 'ver': 0}
+    token = create_access_token(claims)
+    user = SimpleNamespace(id=1, username='benchmark', email='benchmark@example.com')
+    todo = todo_rows(1)[0]
+    serialize_todo = row_serializer(TodoPublic)
+
+    selected = {
+        'get_password_hash': lambda: get_password_hash('benchmark'),
+        'verify_password': lambda: verify_password('benchmark', hashed),
+        'create_access_token': lambda: create_access_token(claims),
+        'jwt.decode': lambda: decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]),
+        'decode_token (cached)': lambda: decode_token(token),
+        'UserPublic.model_validate': lambda: UserPublic.model_validate(user),
+        'TodoPublic.model_validate': lambda: TodoPublic.model_validate(todo, from_attributes=True),
+    }
+    for size in TODO_LIST_SIZES:
+        rows = todo_rows(size)
+        # what FastAPI does with response_model=TodoList, then the FAST_JSON path
+        selected[f'todo_list[{size}] response_model'] = lambda rows=rows: json.dumps(
+            TodoList.model_validate(
+                {'todos': rows, 'next_cursor': None}, from_attributes=True
+            ).model_dump(mode='json')
+        )
+        selected[f'todo_list[{size}] fast_json'] = lambda rows=rows: dumps({
+            'todos': [serialize_todo(row) for row in rows],
+            'next_cursor': None,
+        })
+    return selected
+
+
+def main(args) -> int:
+    measurements = {}
+    for name, func in cases().items():
+        if args.k and args.k not in name:
+            continue
+        measurement = measure(
+            name, func, repetitions=args.repetitions, warmup=args.warmup, min_time=args.min_time
+        )
+        measurements[name] = measurement
+        print(measurement.line())
+
+    if args.save_baseline:
+        meta = {
+            'python': platform.python_version(),
+            'machine': platform.node(),
+            'pydantic': version('pydantic'),
+            'pyjwt': version('pyjwt'),
+            'pwdlib': version('pwdlib'),
+        }
+        save(args.save_baseline, measurements, meta)
+        print(f'# baseline written to {args.save_baseline}', file=sys.stderr)
+
+    if args.baseline:
+        slower = []
+        for comparison in compare(load(args.baseline), measurements):
+            print(comparison.line())
+            if comparison.significant and comparison.change > args.threshold:
+                slower.append(comparison.name)
+        if slower:
+            print(f'REGRESSION past {args.threshold:.0%}: {", ".join(slower)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-k', default=None, help='only benchmarks whose name contains this')
+    parser.add_argument('--repetitions', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per repetition')
+    parser.add_argument('--save-baseline', type=Path, default=None)
+    parser.add_argument('--baseline', type=Path, default=None)
+    parser.add_argument('--threshold', type=float, default=0.05)
+    sys.exit(main(parser.parse_args()))
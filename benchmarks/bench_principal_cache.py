@@ -0,0 +1,41 @@
+# benchmarks\bench_principal_cache.py
+"""
+Measure GET /todos/ throughput with the principal cache of get_current_user
+enabled and disabled, driving the app in process against DATABASE_URL.
+
+    DATABASE_URL=postgresql+psycopg://... python -m benchmarks.bench_principal_cache
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.loadgen import asgi_client, authenticate, create_schema, run_load, seed_todos
+
+
+async def main(args):
+    from fast_zero.app import app  # noqa: PLC0415
+    from fast_zero.security import principal_cache  # noqa: PLC0415
+
+    await create_schema()
+    max_size = principal_cache.max_size
+    async with asgi_client(app) as client:
+        headers = await authenticate(client)
+        await seed_todos(client, headers, 10)
+
+        for label, size in (('cache disabled', 0), ('cache enabled', max_size)):
+            principal_cache.clear()
+            principal_cache.max_size = size
+            report = await run_load(
+                f'GET /todos/ ({label})',
+                lambda: client.get('/todos/', headers=headers),
+                concurrency=args.concurrency,
+                total_requests=args.requests,
+            )
+            print(report.line(), principal_cache.stats())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=5_000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,57 @@
+# benchmarks\bench_principal_claims.py
+"""
+GET /todos/ throughput with tokens that carry the uid/ver claims (the
+principal comes from the token, the version from a cache) versus tokens
+with only the username, resolved by a users query on every request.
+
+    DATABASE_URL=postgresql+psycopg://... python -m benchmarks.bench_principal_claims
+"""
+
+import argparse
+import asyncio
+
+from jwt import decode
+
+from benchmarks.loadgen import asgi_client, authenticate, create_schema, run_load, seed_todos
+
+
+async def main(args):
+    from fast_zero.app import app  # noqa: PLC0415
+    from fast_zero.security import (  # noqa: PLC0415
+        create_access_token,
+        principal_cache,
+        settings,
+        token_versions,
+    )
+
+    await create_schema()
+    async with asgi_client(app) as client:
+        headers = await authenticate(client)
+        await seed_todos(client, headers, 10)
+        claims = decode(
+            headers['Authorization'].removeprefix('Bearer '),
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+        )
+        legacy = {'Authorization': f'Bearer {create_access_token({"sub": claims["sub"]})}'}
+
+        max_size = principal_cache.max_size
+        for label, request_headers in (('username lookup', legacy), ('uid/ver claims', headers)):
+            principal_cache.clear()
+            principal_cache.max_size = 0  # the lookup runs on every request
+            token_versions.clear()
+            report = await run_load(
+                f'GET /todos/ ({label})',
+                lambda: client.get('/todos/', headers=request_headers),
+                concurrency=args.concurrency,
+                total_requests=args.requests,
+            )
+            print(report.line(), token_versions.stats())
+        principal_cache.max_size = max_size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=5_000)
+    asyncio.run(main(parser.parse_args()))
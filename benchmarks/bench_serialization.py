@@ -0,0 +1,80 @@
+# benchmarks\bench_serialization.py
+"""
+Time to turn a page of Todo rows into response bytes: FastAPI's
+response_model path (validate into TodoList, then encode) versus the
+FAST_JSON path (dicts from the rows, encoded once), with the standard json
+module and with orjson.
+
+    python -m benchmarks.bench_serialization [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from fast_zero import serialization
+from fast_zero.models import Todo, TodoState
+from fast_zero.schemas import TodoList, TodoPublic
+from fast_zero.serialization import dumps, row_serializer
+
+SIZES = (10, 100, 1_000)
+
+
+def make_todos(count: int) -> list[Todo]:
+    todos = []
+    for i in range(count):
+        todo = Todo(title=f'todo {i}', description='benchmark row', state=TodoState.todo, user_id=1)
+        todo.id = i + 1
+        todo.created_at = todo.updated_at = datetime(2025, 1, 1, 12, 0, i % 60, 123456)
+        todos.append(todo)
+    return todos
+
+
+async def response_model_path(field, todos) -> bytes:
+    content = await serialize_response(
+        field=field, response_content={'todos': todos, 'next_cursor': None}
+    )
+    return JSONResponse(content).body
+
+
+def fast_path(todos) -> bytes:
+    serialize = row_serializer(TodoPublic)
+    return dumps({'todos': [serialize(todo) for todo in todos], 'next_cursor': None})
+
+
+async def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def main(repeat: int):
+    field = create_model_field('response', TodoList)
+    orjson = serialization.orjson
+    print(f'{"rows":>6} {"response_model":>15} {"fast json":>12} {"fast orjson":>12}')
+    for size in SIZES:
+        todos = make_todos(size)
+        validated = await best_of(lambda: response_model_path(field, todos), repeat)
+        serialization.orjson = None
+        stdlib = await best_of(lambda: fast_path(todos), repeat)
+        serialization.orjson = orjson
+        fast = await best_of(lambda: fast_path(todos), repeat) if orjson else float('nan')
+        print(
+            f'{size:>6} {validated * 1e3:>12.3f} ms {stdlib * 1e3:>9.3f} ms {fast * 1e3:>9.3f} ms'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=200)
+    asyncio.run(main(parser.parse_args().repeat))
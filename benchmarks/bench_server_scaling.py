@@ -0,0 +1,101 @@
+# benchmarks\bench_server_scaling.py
+"""
+Throughput of the production server (fast-zero serve) as workers go from 1
+to N, on GET /todos/.
+
+    python -m benchmarks.bench_server_scaling [--max-workers 4] [--duration 15]
+
+Each run starts `python -m fast_zero serve --workers k` against DATABASE_URL
+(Postgres for numbers that mean anything, SQLite serializes writes but reads
+scale). The load comes from --client-processes processes, so the client is
+not the bottleneck; give the benchmark machine more cores than the server.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.loadgen import (
+    authenticate,
+    http_client,
+    run_load,
+    seed_todos,
+    wait_until_ready,
+)
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    # access log off: the benchmark measures the app, not log I/O
+    command = [sys.executable, '-m', 'fast_zero', 'serve', '--host', '127.0.0.1']
+    command += ['--port', str(port), '--workers', str(workers)]
+    env = {**os.environ, 'SERVER_ACCESS_LOG': 'false'}
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+
+
+async def prepare(url: str) -> dict:
+    async with http_client(url, 1) as client:
+        headers = await authenticate(client)
+        await seed_todos(client, headers, 20)
+        return headers
+
+
+def client_process(url: str, headers: dict, concurrency: int, duration: float) -> tuple:
+    async def load():
+        async with http_client(url, concurrency) as client:
+            report = await run_load(
+                'GET /todos/',
+                lambda: client.get('/todos/', headers=headers),
+                concurrency=concurrency,
+                duration=duration,
+            )
+            return report.requests, report.errors, report.latencies
+
+    return asyncio.run(load())
+
+
+def measure(url: str, headers: dict, args) -> dict:
+    with ProcessPoolExecutor(args.client_processes) as pool:
+        futures = [
+            pool.submit(client_process, url, headers, args.concurrency, args.duration)
+            for _ in range(args.client_processes)
+        ]
+        results = [future.result() for future in futures]
+    latencies = sorted(latency for _, _, batch in results for latency in batch)
+    return {
+        'rps': sum(requests for requests, _, _ in results) / args.duration,
+        'errors': sum(errors for _, errors, _ in results),
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def main(args):
+    url = f'http://127.0.0.1:{args.port}'
+    baseline = None
+    print(f'{"workers":>7} {"req/s":>10} {"speedup":>8} {"p99 ms":>9} {"errors":>7}')
+    for workers in range(1, args.max_workers + 1):
+        server = start_server(args.port, workers)
+        try:
+            wait_until_ready(url)
+            headers = asyncio.run(prepare(url))
+            result = measure(url, headers, args)
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+        baseline = baseline or result['rps']
+        print(
+            f'{workers:>7} {result["rps"]:>10.0f} {result["rps"] / baseline:>7.2f}x '
+            f'{result["p99_ms"]:>9.1f} {result["errors"]:>7}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--concurrency', type=int, default=32, help='per client process')
+    parser.add_argument('--client-processes', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8150)
+    main(parser.parse_args())
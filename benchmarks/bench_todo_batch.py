@@ -0,0 +1,92 @@
+# benchmarks\bench_todo_batch.py
+"""
+Rows per second for creating todos one request at a time versus the
+/todos/batch endpoints, for batch sizes from 10 to 5,000.
+
+    python -m benchmarks.bench_todo_batch [--url http://127.0.0.1:8000]
+
+Without --url the app is driven in process against DATABASE_URL.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.loadgen import asgi_client, authenticate, create_schema, http_client
+
+SIZES = (10, 100, 1_000, 5_000)
+
+
+def todo(i: int) -> dict:
+    return {'title': f'batch {i}', 'description': 'benchmark row', 'state': 'todo'}
+
+
+async def timed(coro) -> float:
+    started = time.perf_counter()
+    await coro
+    return time.perf_counter() - started
+
+
+async def one_by_one(client, headers, size):
+    for i in range(size):
+        response = await client.post('/todos/', headers=headers, json=todo(i))
+        response.raise_for_status()
+
+
+async def batch_cycle(client, headers, size) -> dict:
+    timings = {}
+    started = time.perf_counter()
+    response = await client.post(
+        '/todos/batch', headers=headers, json=[todo(i) for i in range(size)]
+    )
+    response.raise_for_status()
+    timings['create'] = time.perf_counter() - started
+    ids = [item['id'] for item in response.json()['todos']]
+
+    started = time.perf_counter()
+    response = await client.patch(
+        '/todos/batch', headers=headers, json=[{'id': i, 'state': 'done'} for i in ids]
+    )
+    response.raise_for_status()
+    timings['update'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = await client.request('DELETE', '/todos/batch', headers=headers, json=ids)
+    response.raise_for_status()
+    timings['delete'] = time.perf_counter() - started
+    return timings
+
+
+async def main(args):
+    if args.url:
+        client = http_client(args.url, 1)
+    else:
+        from fast_zero.app import app  # noqa: PLC0415
+
+        await create_schema()
+        client = asgi_client(app)
+
+    async with client:
+        headers = await authenticate(client)
+        print(f'{"size":>6} {"single POST":>14} {"batch POST":>14} {"PATCH":>14} {"DELETE":>14}')
+        for size in SIZES:
+            single = ''
+            if size <= args.max_single:
+                elapsed = await timed(one_by_one(client, headers, size))
+                single = f'{size / elapsed:>10.0f} r/s'
+            batch = await batch_cycle(client, headers, size)
+            print(
+                f'{size:>6} {single:>14} '
+                + ' '.join(
+                    f'{size / batch[op]:>10.0f} r/s' for op in ('create', 'update', 'delete')
+                )
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default=None)
+    parser.add_argument(
+        '--max-single', type=int, default=1_000, help='largest size also run one row at a time'
+    )
+    asyncio.run(main(parser.parse_args()))
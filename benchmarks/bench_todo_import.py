@@ -0,0 +1,88 @@
+# benchmarks\bench_todo_import.py
+"""
+Rows per second for POST /todos/import (NDJSON and CSV, streamed upload)
+versus creating the same todos one POST /todos/ at a time.
+
+    python -m benchmarks.bench_todo_import [--rows 100000] [--url http://127.0.0.1:8000]
+
+Without --url the app is driven in process against DATABASE_URL, so the
+COPY path is measured with a postgresql+psycopg:// URL and the executemany
+fallback with SQLite.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import time
+
+from benchmarks.loadgen import asgi_client, authenticate, create_schema, http_client
+
+UPLOAD_CHUNK_ROWS = 1_000
+
+
+def todo(i: int) -> dict:
+    return {'title': f'imported {i}', 'description': f'benchmark row {i}', 'state': 'todo'}
+
+
+async def ndjson_body(rows: int):
+    for start in range(0, rows, UPLOAD_CHUNK_ROWS):
+        end = min(start + UPLOAD_CHUNK_ROWS, rows)
+        yield ''.join(json.dumps(todo(i)) + '\n' for i in range(start, end)).encode()
+
+
+async def csv_body(rows: int):
+    yield b'title,description,state\r\n'
+    for start in range(0, rows, UPLOAD_CHUNK_ROWS):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for i in range(start, min(start + UPLOAD_CHUNK_ROWS, rows)):
+            writer.writerow(todo(i).values())
+        yield buffer.getvalue().encode()
+
+
+async def import_rate(client, headers, body_format: str, rows: int) -> float:
+    body = ndjson_body(rows) if body_format == 'ndjson' else csv_body(rows)
+    started = time.perf_counter()
+    response = await client.post(
+        f'/todos/import?format={body_format}', headers=headers, content=body, timeout=None
+    )
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    assert response.json()['imported'] == rows, response.json()
+    return rows / elapsed
+
+
+async def single_rate(client, headers, rows: int) -> float:
+    started = time.perf_counter()
+    for i in range(rows):
+        response = await client.post('/todos/', headers=headers, json=todo(i))
+        response.raise_for_status()
+    return rows / (time.perf_counter() - started)
+
+
+async def main(args):
+    if args.url:
+        client = http_client(args.url, 1)
+    else:
+        from fast_zero.app import app  # noqa: PLC0415
+
+        await create_schema()
+        client = asgi_client(app)
+
+    async with client:
+        headers = await authenticate(client)
+        rate = await single_rate(client, headers, args.single_rows)
+        print(f'POST /todos/ x{args.single_rows}: {rate:>10.0f} rows/s')
+        for body_format in ('ndjson', 'csv'):
+            rate = await import_rate(client, headers, body_format, args.rows)
+            print(f'import {body_format:<6} x{args.rows}: {rate:>10.0f} rows/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--single-rows', type=int, default=500, help='rows sent one by one')
+    parser.add_argument('--url', default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+# benchmarks\bench_todo_stats.py
+"""
+Latency of the per-state todo counts: the todo_counters read behind
+GET /todos/stats versus a GROUP BY over the user's todos, as the user's
+todo count grows.
+
+    python -m benchmarks.bench_todo_stats [--sizes 1000 10000 100000] [--repeat 200]
+
+Runs in process against DATABASE_URL; the todos are loaded with
+POST /todos/import, which also keeps the counters.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.loadgen import (
+    asgi_client,
+    authenticate,
+    create_schema,
+    percentile,
+    run_load,
+)
+
+STATES = ('draft', 'todo', 'doing', 'done', 'trash')
+
+
+async def import_todos(client, headers, rows: int):
+    body = ''.join(
+        json.dumps({'title': f'stats {i}', 'description': 'row', 'state': STATES[i % 5]}) + '\n'
+        for i in range(rows)
+    )
+    response = await client.post('/todos/import', headers=headers, content=body, timeout=None)
+    response.raise_for_status()
+
+
+async def query_latency(engine, query, repeat: int) -> dict:
+    latencies = []
+    async with AsyncSession(engine) as session:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await query(session)
+            latencies.append(time.perf_counter() - started)
+            await session.rollback()  # new snapshot per call, like one request each
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+    }
+
+
+async def main(args):
+    from fast_zero.app import app  # noqa: PLC0415
+    from fast_zero.counters import actual_counts, todo_stats  # noqa: PLC0415
+    from fast_zero.database import engine  # noqa: PLC0415
+    from fast_zero.models import User  # noqa: PLC0415
+
+    await create_schema()
+    async with asgi_client(app) as client:
+        headers = await authenticate(client)
+        async with AsyncSession(engine) as session:
+            user_id = await session.scalar(select(func.max(User.id)))  # the benchmark user
+        loaded = 0
+        for size in args.sizes:
+            await import_todos(client, headers, size - loaded)
+            loaded = size
+
+            counters = await query_latency(
+                engine, lambda session: todo_stats(session, user_id), args.repeat
+            )
+            group_by = await query_latency(
+                engine, lambda session: actual_counts(session, [user_id]), args.repeat
+            )
+            endpoint = await run_load(
+                f'GET /todos/stats @ {size}',
+                lambda: client.get('/todos/stats', headers=headers),
+                concurrency=1,
+                total_requests=args.repeat,
+            )
+            print(
+                f'{size:>8} todos  counters p50 {counters["p50_ms"]:7.3f} ms '
+                f'p95 {counters["p95_ms"]:7.3f} ms   GROUP BY p50 {group_by["p50_ms"]:7.3f} ms '
+                f'p95 {group_by["p95_ms"]:7.3f} ms'
+            )
+            print(endpoint.line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
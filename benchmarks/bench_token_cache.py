@@ -0,0 +1,68 @@
+# benchmarks\bench_token_cache.py
+"""
+Cost of the auth dependency per request with the verified-token cache
+cold (jwt.decode on every call) and warm (one dict lookup).
+
+    python -m benchmarks.bench_token_cache [--iterations 20000]
+
+decode_token alone, then resolve_principal as get_current_principal runs
+it, with the token version already cached so no query is made.
+"""
+
+import argparse
+import asyncio
+import time
+
+
+def per_call_us(func, iterations: int, before=None) -> float:
+    total = 0.0
+    for _ in range(iterations):
+        if before:
+            before()
+        started = time.perf_counter()
+        func()
+        total += time.perf_counter() - started
+    return total / iterations * 1e6
+
+
+async def async_per_call_us(func, iterations: int, before=None) -> float:
+    total = 0.0
+    for _ in range(iterations):
+        if before:
+            before()
+        started = time.perf_counter()
+        await func()
+        total += time.perf_counter() - started
+    return total / iterations * 1e6
+
+
+async def main(args):
+    from fast_zero.security import (  # noqa: PLC0415
+        create_access_token,
+        decode_token,
+        resolve_principal,
+        token_cache,
+        token_versions,
+    )
+
+    token = create_access_token({'sub': 'benchmark', 'uid': 1, 'ver': 0})
+    token_versions.set(1, 0, ttl=3600)
+
+    cold = per_call_us(lambda: decode_token(token), args.iterations, before=token_cache.clear)
+    warm = per_call_us(lambda: decode_token(token), args.iterations)
+    print(f'decode_token        cold {cold:8.2f} us   warm {warm:8.2f} us   x{cold / warm:.1f}')
+
+    # resolve_principal does not touch the session while the version is cached
+    async def dependency():
+        return await resolve_principal(decode_token(token), None)
+
+    cold = await async_per_call_us(dependency, args.iterations, before=token_cache.clear)
+    warm = await async_per_call_us(dependency, args.iterations)
+    print(f'resolve_principal   cold {cold:8.2f} us   warm {warm:8.2f} us   x{cold / warm:.1f}')
+    print(token_cache.stats())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=20_000)
+    asyncio.run(main(parser.parse_args()))
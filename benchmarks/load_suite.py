@@ -0,0 +1,267 @@
+# benchmarks\load_suite.py
+"""
+Mixed-workload load test with per-endpoint latency baselines.
+
+    python -m benchmarks.load_suite [--mode asgi|socket] [--url URL] [--duration 30]
+        [--save-baseline FILE] [--baseline FILE] [--threshold 0.25]
+
+Every virtual user logs in, gets SEED_TODOS todos and then loops over a
+weighted mix of login, list, create, patch and delete until --duration
+runs out. Throughput and p50/p95/p99 are reported per endpoint.
+
+--mode asgi drives the app in process, --mode socket starts uvicorn on
+--port (or uses the server at --url) and goes through HTTP. The database
+is DATABASE_URL: sqlite+aiosqlite:///... or postgresql+psycopg://...,
+the dialect is stored with the results.
+
+--save-baseline writes the results as JSON. --baseline compares with a
+saved run and exits with 1 when an endpoint's p95 grew, or its
+throughput dropped, by more than --threshold. Baselines only compare
+runs on the same machine, database and options.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks.loadgen import (
+    LoadReport,
+    asgi_client,
+    create_schema,
+    http_client,
+    wait_until_ready,
+)
+
+SEED_TODOS = 50
+PASSWORD = 'benchmark'
+
+
+@dataclass
+class VirtualUser:
+    username: str
+    rng: random.Random
+    headers: dict = field(default_factory=dict)
+    todo_ids: list[int] = field(default_factory=list)
+
+
+Operation = Callable[[httpx.AsyncClient, VirtualUser], Awaitable[httpx.Response]]
+
+
+def todo_body(user: VirtualUser) -> dict:
+    state = user.rng.choice(('draft', 'todo', 'doing', 'done'))
+    return {'title': f'load {uuid.uuid4().hex[:8]}', 'description': 'load suite', 'state': state}
+
+
+async def login(client, user):
+    response = await client.post(
+        '/auth/token', data={'username': user.username, 'password': PASSWORD}
+    )
+    if response.is_success:
+        user.headers = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+    return response
+
+
+async def list_todos(client, user):
+    return await client.get('/todos/', headers=user.headers, params={'limit': 20})
+
+
+async def create_todo(client, user):
+    response = await client.post('/todos/', headers=user.headers, json=todo_body(user))
+    if response.is_success:
+        user.todo_ids.append(response.json()['id'])
+    return response
+
+
+async def patch_todo(client, user):
+    if not user.todo_ids:
+        return await create_todo(client, user)
+    todo_id = user.rng.choice(user.todo_ids)
+    state = user.rng.choice(('todo', 'doing', 'done'))
+    return await client.patch(f'/todos/{todo_id}', headers=user.headers, json={'state': state})
+
+
+async def delete_todo(client, user):
+    if not user.todo_ids:
+        return await create_todo(client, user)
+    todo_id = user.todo_ids.pop(user.rng.randrange(len(user.todo_ids)))
+    return await client.delete(f'/todos/{todo_id}', headers=user.headers)
+
+
+# name -> (weight, operation); the names are the keys of the baselines
+MIX: dict[str, tuple[int, Operation]] = {
+    'POST /auth/token': (5, login),
+    'GET /todos/': (50, list_todos),
+    'POST /todos/': (20, create_todo),
+    'PATCH /todos/{id}': (15, patch_todo),
+    'DELETE /todos/{id}': (10, delete_todo),
+}
+
+
+async def prepare_user(client, seed: int) -> VirtualUser:
+    user = VirtualUser(username=f'load_{uuid.uuid4().hex[:12]}', rng=random.Random(seed))
+    response = await client.post(
+        '/users/',
+        json={
+            'username': user.username,
+            'email': f'{user.username}@example.com',
+            'password': PASSWORD,
+        },
+    )
+    response.raise_for_status()
+    (await login(client, user)).raise_for_status()
+    response = await client.post(
+        '/todos/batch', headers=user.headers, json=[todo_body(user) for _ in range(SEED_TODOS)]
+    )
+    response.raise_for_status()
+    user.todo_ids = [todo['id'] for todo in response.json()['todos']]
+    return user
+
+
+async def run_mix(client, users: list[VirtualUser], duration: float) -> dict[str, LoadReport]:
+    reports = {name: LoadReport(name=name) for name in MIX}
+    names = list(MIX)
+    weights = [weight for weight, _ in MIX.values()]
+    deadline = time.perf_counter() + duration
+
+    async def worker(user: VirtualUser):
+        while time.perf_counter() < deadline:
+            name = user.rng.choices(names, weights)[0]
+            report = reports[name]
+            started = time.perf_counter()
+            try:
+                response = await MIX[name][1](client, user)
+                if response.status_code >= 400:  # noqa: PLR2004
+                    report.errors += 1
+            except httpx.HTTPError:
+                report.errors += 1
+            report.latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(user) for user in users))
+    elapsed = time.perf_counter() - started
+    for report in reports.values():
+        report.elapsed = elapsed
+    return reports
+
+
+# * baselines
+def results(reports: dict[str, LoadReport], args) -> dict:
+    from sqlalchemy.engine import make_url  # noqa: PLC0415
+
+    from fast_zero.settings import Settings  # noqa: PLC0415
+
+    return {
+        'meta': {
+            'database': make_url(Settings().DATABASE_URL).get_backend_name(),
+            'mode': 'url' if args.url else args.mode,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'python': platform.python_version(),
+            'machine': platform.node(),
+        },
+        'endpoints': {name: report.summary() for name, report in reports.items()},
+    }
+
+
+def regressions(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Endpoints whose p95 grew or throughput dropped by more than `threshold`."""
+    found = []
+    for name, before in baseline['endpoints'].items():
+        after = current['endpoints'].get(name)
+        if after is None or not before['requests']:
+            continue
+        if before['p95_ms'] and after['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            found.append(f'{name}: p95 {before["p95_ms"]:.2f} -> {after["p95_ms"]:.2f} ms')
+        if after['rps'] < before['rps'] * (1 - threshold):
+            found.append(f'{name}: {before["rps"]:.1f} -> {after["rps"]:.1f} req/s')
+    return found
+
+
+def start_uvicorn(port: int) -> subprocess.Popen:
+    command = [sys.executable, '-m', 'uvicorn', 'fast_zero.app:app', '--host', '127.0.0.1']
+    command += ['--port', str(port), '--no-access-log']
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def load(args, client) -> dict[str, LoadReport]:
+    async with client:
+        users = [await prepare_user(client, seed) for seed in range(args.concurrency)]
+        return await run_mix(client, users, args.duration)
+
+
+def main(args) -> int:
+    server = None
+    if args.url:
+        client = http_client(args.url, args.concurrency)
+    else:
+        asyncio.run(create_schema())
+        if args.mode == 'socket':
+            url = f'http://127.0.0.1:{args.port}'
+            server = start_uvicorn(args.port)
+            wait_until_ready(f'{url}/')
+            client = http_client(url, args.concurrency)
+        else:
+            from fast_zero.app import app  # noqa: PLC0415
+
+            client = asgi_client(app)
+
+    try:
+        reports = asyncio.run(load(args, client))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    for report in reports.values():
+        print(report.line())
+    total = sum(report.requests for report in reports.values())
+    print(f'{"total":<28} {total:>8} req {total / args.duration:>10.1f} req/s')
+
+    current = results(reports, args)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps(current, indent=2) + '\n')
+        print(f'# baseline written to {args.save_baseline}', file=sys.stderr)
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline['meta']['database'] != current['meta']['database']:
+            print('# warning: baseline recorded on another database', file=sys.stderr)
+        found = regressions(baseline, current, args.threshold)
+        for line in found:
+            print(f'REGRESSION {line}')
+        if found:
+            return 1
+        print(f'# no regression past {args.threshold:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mode', choices=('asgi', 'socket'), default='asgi')
+    parser.add_argument(
+        '--url', default=None, help='an already running server, e.g. fast-zero serve'
+    )
+    parser.add_argument('--port', type=int, default=8160, help='uvicorn port in socket mode')
+    parser.add_argument('--concurrency', type=int, default=16, help='virtual users')
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--save-baseline', type=Path, default=None)
+    parser.add_argument('--baseline', type=Path, default=None)
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=float(os.environ.get('LOAD_SUITE_THRESHOLD', '0.25')),
+        help='allowed relative regression, default 0.25',
+    )
+    sys.exit(main(parser.parse_args()))
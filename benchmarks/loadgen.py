@@ -0,0 +1,168 @@
+# benchmarks\loadgen.py
+"""
+Small asyncio load generator shared by the benchmark scripts.
+
+Every worker coroutine keeps one request in flight, so `concurrency` is the
+number of simultaneous requests the server sees.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+
+RequestFactory = Callable[[], Awaitable[httpx.Response]]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    # Nearest-rank percentile, good enough for latency reports
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+@dataclass
+class LoadReport:
+    name: str
+    elapsed: float = 0.0
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> dict:
+        return {
+            'name': self.name,
+            'requests': self.requests,
+            'errors': self.errors,
+            'rps': round(self.rps, 1),
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 2),
+        }
+
+    def line(self) -> str:
+        s = self.summary()
+        return (
+            f'{s["name"]:<28} {s["requests"]:>8} req {s["rps"]:>10.1f} req/s '
+            f'p50 {s["p50_ms"]:>8.2f} ms  p95 {s["p95_ms"]:>8.2f} ms  '
+            f'p99 {s["p99_ms"]:>8.2f} ms  errors {s["errors"]}'
+        )
+
+
+async def run_load(
+    name: str,
+    request: RequestFactory,
+    *,
+    concurrency: int,
+    total_requests: int | None = None,
+    duration: float | None = None,
+) -> LoadReport:
+    """Drive `request` from `concurrency` workers until `total_requests`
+    have been sent or `duration` seconds have passed."""
+    if total_requests is None and duration is None:
+        raise ValueError('Either total_requests or duration must be given.')
+
+    report = LoadReport(name=name)
+    remaining = total_requests
+    deadline = time.perf_counter() + duration if duration else None
+
+    def should_continue() -> bool:
+        nonlocal remaining
+        if deadline and time.perf_counter() >= deadline:
+            return False
+        if remaining is not None:
+            if remaining <= 0:
+                return False
+            remaining -= 1
+        return True
+
+    async def worker():
+        while should_continue():
+            started = time.perf_counter()
+            try:
+                response = await request()
+                if response.status_code >= 400:  # noqa: PLR2004
+                    report.errors += 1
+            except httpx.HTTPError:
+                report.errors += 1
+            report.latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+async def create_user(client: httpx.AsyncClient, password: str = 'benchmark') -> str:
+    """Create a throwaway user and return its username."""
+    username = f'bench_{uuid.uuid4().hex[:12]}'
+    response = await client.post(
+        '/users/',
+        json={'username': username, 'email': f'{username}@example.com', 'password': password},
+    )
+    response.raise_for_status()
+    return username
+
+
+async def authenticate(client: httpx.AsyncClient, password: str = 'benchmark') -> dict:
+    """Create a throwaway user and return the Authorization header for it."""
+    username = await create_user(client, password)
+    response = await client.post('/auth/token', data={'username': username, 'password': password})
+    response.raise_for_status()
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+async def seed_todos(client: httpx.AsyncClient, headers: dict, count: int):
+    for i in range(count):
+        response = await client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': f'todo {i}', 'description': 'benchmark seed', 'state': 'todo'},
+        )
+        response.raise_for_status()
+
+
+def asgi_client(app) -> httpx.AsyncClient:
+    """Client that calls the ASGI app in process, without a socket."""
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url='http://benchmark', timeout=60
+    )
+
+
+async def create_schema():
+    # imported lazily: fast_zero reads its settings at import time
+    from fast_zero.database import engine  # noqa: PLC0415
+    from fast_zero.models import table_registry  # noqa: PLC0415
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+
+def http_client(url: str, concurrency: int) -> httpx.AsyncClient:
+    """Client for a server listening on `url`, sized for `concurrency`."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(base_url=url, limits=limits, timeout=60)
+
+
+def wait_until_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).is_success:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'server at {url} did not start')
@@ -0,0 +1,147 @@
+# benchmarks\microbench.py
+"""
+Small microbenchmark harness shared by the CPU-bound benchmark scripts.
+
+Like timeit, each repetition runs the function in a loop sized so the
+repetition lasts at least `min_time`; a few untimed warmup calls come
+first. Results are per call, and comparisons against a stored baseline
+use Welch's t-test over the repetitions, so noise is not reported as a
+change.
+"""
+
+import gc
+import json
+import math
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+# |t| above this is treated as a real difference (about 95% for 10+ repetitions)
+SIGNIFICANT_T = 2.1
+
+
+@dataclass
+class Measurement:
+    name: str
+    loops: int
+    samples: list[float]  # seconds per call, one per repetition
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.samples)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.samples) if len(self.samples) > 1 else 0.0
+
+    def line(self) -> str:
+        return (
+            f'{self.name:<36} {format_time(self.median):>10} median  '
+            f'{format_time(self.mean):>10} mean  ± {self.stdev / self.mean:6.1%}  '
+            f'({len(self.samples)} x {self.loops} loops)'
+        )
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return f'{seconds * scale:.2f} {unit}'
+    return f'{seconds * 1e9:.0f} ns'
+
+
+def calibrate_loops(func: Callable, min_time: float) -> int:
+    # 1, 2, 5, 10, 20, ... like timeit.Timer.autorange
+    loops = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            number = loops * multiplier
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            if time.perf_counter() - started >= min_time:
+                return number
+        loops *= 10
+
+
+def measure(
+    name: str,
+    func: Callable,
+    *,
+    repetitions: int = 20,
+    warmup: int = 3,
+    min_time: float = 0.05,
+) -> Measurement:
+    for _ in range(warmup):
+        func()
+    loops = calibrate_loops(func, min_time)
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()  # collections land in random repetitions otherwise
+    try:
+        for _ in range(repetitions):
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            samples.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return Measurement(name=name, loops=loops, samples=samples)
+
+
+# * comparação com a baseline
+def welch_t(before: list[float], after: list[float]) -> float:
+    variance = statistics.variance(before) / len(before) + statistics.variance(after) / len(after)
+    if variance == 0:
+        return 0.0 if statistics.fmean(before) == statistics.fmean(after) else math.inf
+    return (statistics.fmean(after) - statistics.fmean(before)) / math.sqrt(variance)
+
+
+@dataclass
+class Comparison:
+    name: str
+    change: float  # relative change of the mean, +0.10 is 10% slower
+    t: float
+
+    @property
+    def significant(self) -> bool:
+        return abs(self.t) > SIGNIFICANT_T
+
+    def line(self) -> str:
+        verdict = 'slower' if self.change > 0 else 'faster'
+        if not self.significant:
+            verdict = 'no significant change'
+        return f'{self.name:<36} {self.change:+7.1%}  t={self.t:+6.1f}  {verdict}'
+
+
+def compare(baseline: dict[str, Measurement], current: dict[str, Measurement]) -> list[Comparison]:
+    comparisons = []
+    for name, after in current.items():
+        before = baseline.get(name)
+        if before is None or len(before.samples) < 2 or len(after.samples) < 2:  # noqa: PLR2004
+            continue
+        comparisons.append(
+            Comparison(
+                name=name,
+                change=after.mean / before.mean - 1,
+                t=welch_t(before.samples, after.samples),
+            )
+        )
+    return comparisons
+
+
+def save(path: Path, measurements: dict[str, Measurement], meta: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {'meta': meta, 'benchmarks': [asdict(m) for m in measurements.values()]}
+    path.write_text(json.dumps(payload, indent=2) + '\n', encoding='utf-8')
+
+
+def load(path: Path) -> dict[str, Measurement]:
+    payload = json.loads(path.read_text(encoding='utf-8'))
+    return {item['name']: Measurement(**item) for item in payload['benchmarks']}
@@ -4,7 +4,14 @@
 poetry run alembic upgrade head
 
 # Inicia o servidor FastAPI
-poetry run uvicorn fast_zero.app:app --host 0.0.0.0 --port 8000 --reload --workers 1 --log-level info
+# SERVER_MODE=development: um processo uvicorn com --reload (código montado como volume)
+# SERVER_MODE=production (padrão): gunicorn + workers uvicorn (uvloop/httptools), um por CPU
+# a imagem é instalada com --no-root, sem o script fast-zero: usa python -m fast_zero
+if [ "${SERVER_MODE:-production}" = "development" ]; then
+    poetry run uvicorn fast_zero.app:app --host 0.0.0.0 --port 8000 --reload --workers 1 --log-level info
+else
+    exec poetry run python -m fast_zero serve --host 0.0.0.0 --port 8000
+fi
 
 # # Mantém o container ativo
 # tail -f /dev/null
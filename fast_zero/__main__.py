@@ -0,0 +1,4 @@
+# fast_zero\__main__.py
+from fast_zero.cli import main
+
+raise SystemExit(main())
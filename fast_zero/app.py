@@ -1,17 +1,45 @@
 # fast_zero\app.py
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 
-from fast_zero.routers import auth, todo, users
+from fast_zero.metrics import MetricsMiddleware
+from fast_zero.querylog import log_writer
+from fast_zero.replicas import replica_set
+from fast_zero.response_cache import response_cache_backend
+from fast_zero.routers import auth, internal, metrics, todo, users
 from fast_zero.schemas import Message
+from fast_zero.security import password_hasher
+from fast_zero.serialization import FastJSONResponse
+from fast_zero.settings import Settings
+from fast_zero.shards import shard_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_writer.start()  # per worker process, the writer thread does not survive a fork
+    yield
+    password_hasher.shutdown()
+    await response_cache_backend.close()
+    await replica_set.dispose()
+    await shard_router.dispose()
+    log_writer.stop()
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if Settings().FAST_JSON else JSONResponse,
+)
+app.add_middleware(MetricsMiddleware)
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(todo.router)
+app.include_router(internal.router)
+app.include_router(metrics.router)
 
 
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
-def read_root():
+async def read_root():
     return {'message': 'Hello World'}
@@ -0,0 +1,222 @@
+# fast_zero\bulk.py
+import csv
+import json
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import AsyncIterable, AsyncIterator
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Table, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.search import dialect_name
+
+
+# * leitura incremental do corpo (NDJSON/CSV)
+def decode_line(line: bytes) -> str | ValueError:
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        return ValueError(f'invalid UTF-8 at byte {exc.start + 1}')
+
+
+def line_too_long(max_length: int) -> ValueError:
+    return ValueError(f'line longer than {max_length} bytes')
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_length: int
+) -> AsyncIterator[str | ValueError]:
+    """
+    Split a byte stream into text lines, without reading it whole. A line
+    that is not UTF-8 or longer than `max_length` bytes comes out as the
+    error, the bytes of an over-long line are dropped instead of buffered.
+    """
+    pending = bytearray()
+    overflow = False
+    async for chunk in chunks:
+        # only the new chunk is searched, the pending bytes never are again
+        start = 0
+        while (end := chunk.find(b'\n', start)) != -1:
+            if overflow or len(pending) + end - start > max_length:
+                yield line_too_long(max_length)
+            else:
+                pending += chunk[start:end]
+                yield decode_line(bytes(pending))
+            pending.clear()
+            overflow = False
+            start = end + 1
+        if not overflow:
+            pending += chunk[start:]
+            if len(pending) > max_length:
+                pending.clear()
+                overflow = True
+    if overflow:
+        yield line_too_long(max_length)
+    elif pending:
+        yield decode_line(bytes(pending))
+
+
+async def iter_csv_records(
+    lines: AsyncIterable[str | ValueError], max_length: int
+) -> AsyncIterator[tuple[int, str | ValueError]]:
+    """
+    Join lines into CSV records, a quoted field may span several lines.
+    Yields (lines in the record, record), the record being the error for a
+    bad line or for a record longer than `max_length` characters.
+    """
+    parts, length, quotes = [], 0, 0
+    async for line in lines:
+        if isinstance(line, ValueError):
+            if parts:  # the open quoted field cannot be completed
+                yield len(parts), ValueError('unterminated quoted field')
+                parts, length, quotes = [], 0, 0
+            yield 1, line
+            continue
+        parts.append(line)
+        length += len(line) + 1
+        # quotes inside fields are doubled, an odd count means an open field
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield len(parts), '\n'.join(parts)
+            parts, length, quotes = [], 0, 0
+        elif length > max_length:
+            yield len(parts), ValueError(f'record longer than {max_length} characters')
+            parts, length, quotes = [], 0, 0
+    if parts:
+        yield len(parts), '\n'.join(parts)
+
+
+def error_detail(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return '; '.join(
+            f'{".".join(str(loc) for loc in error["loc"])}: {error["msg"]}'
+            for error in exc.errors()
+        )
+    return str(exc)
+
+
+# parsers yield (line number, data), data being the exception for a malformed line,
+# raising would end the generator and the rest of the import with it
+async def parse_ndjson(
+    chunks: AsyncIterable[bytes], max_length: int
+) -> AsyncIterator[tuple[int, dict | Exception]]:
+    line_number = 0
+    async for line in iter_lines(chunks, max_length):
+        line_number += 1
+        if isinstance(line, ValueError):
+            yield line_number, line
+        elif line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as exc:
+                yield line_number, exc
+
+
+async def parse_csv(
+    chunks: AsyncIterable[bytes], max_length: int
+) -> AsyncIterator[tuple[int, dict | Exception]]:
+    header = None
+    line_number = 1
+    async for lines_in_record, record in iter_csv_records(
+        iter_lines(chunks, max_length), max_length
+    ):
+        if isinstance(record, ValueError):
+            yield line_number, record
+        elif record.strip():
+            fields = next(csv.reader([record]))
+            if header is None:
+                header = [name.strip() for name in fields]
+            elif len(fields) != len(header):
+                yield line_number, ValueError(f'expected {len(header)} fields, got {len(fields)}')
+            else:
+                yield line_number, dict(zip(header, fields))
+        line_number += lines_in_record
+
+
+PARSERS = {'ndjson': parse_ndjson, 'csv': parse_csv}
+
+
+@dataclass
+class ImportErrors:
+    """Rejected lines of an import, only the first `max_items` are kept."""
+
+    max_items: int
+    items: list[dict] = field(default_factory=list)
+    count: int = 0
+
+    def add(self, line: int, exc: Exception):
+        self.count += 1
+        if len(self.items) < self.max_items:
+            self.items.append({'line': line, 'detail': error_detail(exc)})
+
+
+async def validate_rows(
+    chunks: AsyncIterable[bytes],
+    input_format: str,
+    schema: type[BaseModel],
+    errors: ImportErrors,
+    max_line_bytes: int,
+) -> AsyncIterator[dict]:
+    """Yield each row of the body validated with `schema`, rejects go to `errors`."""
+    async for line_number, data in PARSERS[input_format](chunks, max_line_bytes):
+        if isinstance(data, Exception):
+            errors.add(line_number, data)
+            continue
+        try:
+            yield schema.model_validate(data).model_dump()
+        except ValidationError as exc:
+            errors.add(line_number, exc)
+
+
+async def chunked(rows: AsyncIterable[dict], size: int) -> AsyncIterator[list[dict]]:
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# * carga em massa
+def copy_value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+async def copy_chunks(session: AsyncSession, table: Table, columns, chunks) -> int:
+    """Load rows with COPY FROM STDIN on the session's psycopg connection."""
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    names = ', '.join(columns)
+    count = 0
+    # same connection and transaction as the session, committed by the caller
+    async with raw.driver_connection.cursor() as cursor:
+        async with cursor.copy(f'COPY {table.name} ({names}) FROM STDIN') as copy:
+            async for chunk in chunks:
+                for row in chunk:
+                    await copy.write_row([copy_value(row[column]) for column in columns])
+                count += len(chunk)
+    return count
+
+
+async def executemany_chunks(session: AsyncSession, table: Table, columns, chunks) -> int:
+    count = 0
+    async for chunk in chunks:
+        await session.execute(insert(table), [{c: row[c] for c in columns} for row in chunk])
+        count += len(chunk)
+    return count
+
+
+async def bulk_insert(
+    session: AsyncSession, table: Table, columns: list[str], chunks: AsyncIterable[list[dict]]
+) -> int:
+    """
+    Insert every row of `chunks` into `table` inside the session's
+    transaction and return how many were written. Postgres uses COPY, other
+    engines one executemany INSERT per chunk.
+    """
+    if dialect_name(session) == 'postgresql':
+        return await copy_chunks(session, table, columns, chunks)
+    return await executemany_chunks(session, table, columns, chunks)
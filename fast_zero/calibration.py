@@ -0,0 +1,63 @@
+# fast_zero\calibration.py
+import statistics
+import time
+from pathlib import Path
+from typing import Callable
+
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+MIN_MEMORY_COST = 19456  # KiB, OWASP minimum for argon2id
+MAX_TIME_COST = 20
+SAMPLES = 5
+
+Measure = Callable[[int, int, int], float]
+
+
+def measure_hash(time_cost: int, memory_cost: int, parallelism: int) -> float:
+    """Median wall time, in seconds, of one Argon2 hash with these parameters."""
+    hasher = Argon2Hasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    hasher.hash('warm-up')
+    timings = []
+    for _ in range(SAMPLES):
+        started = time.perf_counter()
+        hasher.hash('calibration-password')
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target: float, memory_cost: int, parallelism: int, measure: Measure | None = None
+) -> tuple[dict, float]:
+    """
+    Pick the most expensive Argon2 parameters that still hash within `target`
+    seconds on this host. Memory cost is halved (down to MIN_MEMORY_COST) until
+    a single pass fits the budget, then time cost grows while it still fits.
+
+    Returns the chosen settings and their measured latency.
+    """
+    measure = measure or measure_hash
+    while memory_cost > MIN_MEMORY_COST and measure(1, memory_cost, parallelism) > target:
+        memory_cost = max(MIN_MEMORY_COST, memory_cost // 2)
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST and measure(time_cost + 1, memory_cost, parallelism) <= target:
+        time_cost += 1
+
+    values = {
+        'ARGON2_TIME_COST': time_cost,
+        'ARGON2_MEMORY_COST': memory_cost,
+        'ARGON2_PARALLELISM': parallelism,
+    }
+    return values, measure(time_cost, memory_cost, parallelism)
+
+
+def update_env_file(path: Path, values: dict):
+    """Set `values` in a .env file, replacing existing keys and keeping the rest."""
+    lines = path.read_text(encoding='utf-8').splitlines() if path.exists() else []
+    pending = dict(values)
+    for i, line in enumerate(lines):
+        key = line.split('=', 1)[0].strip()
+        if key in pending:
+            lines[i] = f'{key}={pending.pop(key)}'
+    lines.extend(f'{key}={value}' for key, value in pending.items())
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
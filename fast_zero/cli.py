@@ -0,0 +1,256 @@
+# fast_zero\cli.py
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+MIGRATIONS = Path(__file__).parent.parent / 'migrations'
+
+
+def calibrate_argon2(args):
+    from fast_zero.calibration import calibrate, update_env_file  # noqa: PLC0415
+
+    values, latency = calibrate(args.target_ms / 1000, args.memory_cost, args.parallelism)
+    for key, value in values.items():
+        print(f'{key}={value}')
+    print(f'# {latency * 1000:.1f} ms per hash on this host', file=sys.stderr)
+
+    if args.write_env:
+        update_env_file(args.env_file, values)
+        print(f'# written to {args.env_file}', file=sys.stderr)
+
+
+def serve(args):
+    from fast_zero import server  # noqa: PLC0415
+
+    if args.dev:
+        server.run_development(args.host, args.port)
+    else:
+        server.run_production(args.host, args.port, args.workers)
+
+
+async def run_counter_check(repair: bool) -> list[dict]:
+    from sqlalchemy.ext.asyncio import AsyncSession  # noqa: PLC0415
+
+    from fast_zero.counters import counter_drift, repair_counters  # noqa: PLC0415
+    from fast_zero.database import engine  # noqa: PLC0415
+    from fast_zero.shards import shard_router  # noqa: PLC0415
+
+    # the counters live next to the todos they count, on each shard
+    drift = []
+    for shard_engine in shard_router.engines or [engine]:
+        async with AsyncSession(shard_engine, expire_on_commit=False) as session:
+            drift += await (repair_counters(session) if repair else counter_drift(session))
+    return drift
+
+
+def check_counters(args):
+    drift = asyncio.run(run_counter_check(args.repair))
+    for row in drift:
+        print(
+            f'user {row["user_id"]} {row["state"].value}: '
+            f'stored {row["stored"]}, actual {row["actual"]}'
+        )
+    print(
+        f'# {len(drift)} counters {"repaired" if args.repair else "out of sync"}',
+        file=sys.stderr,
+    )
+    return 1 if drift and not args.repair else 0
+
+
+def generate_dataset(args):
+    from fast_zero.dataset import DatasetSpec  # noqa: PLC0415
+
+    spec = DatasetSpec(
+        users=args.users,
+        todos=args.todos,
+        skew=args.skew,
+        seed=args.seed,
+        password=args.password,
+        chunk_size=args.chunk_size,
+    )
+    if args.prefix:
+        spec.prefix = args.prefix
+    result = asyncio.run(run_generate(spec))
+    rate = result['todos'] / result['todos_seconds'] if result['todos_seconds'] else 0.0
+    print(
+        f'{result["users"]} users ({result["prefix"]}_*) in {result["users_seconds"]:.1f} s, '
+        f'{result["todos"]} todos in {result["todos_seconds"]:.1f} s ({rate:.0f} rows/s)'
+    )
+    print(
+        f'# todos per user: heaviest {result["heaviest_user_todos"]}, '
+        f'median {result["median_user_todos"]}; password: {args.password}',
+        file=sys.stderr,
+    )
+
+
+async def run_generate(spec) -> dict:
+    from sqlalchemy.ext.asyncio import AsyncSession  # noqa: PLC0415
+
+    from fast_zero.database import engine  # noqa: PLC0415
+    from fast_zero.dataset import generate  # noqa: PLC0415
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        return await generate(session, spec)
+
+
+# * shards dos todos (fast_zero.shards)
+def migrate_databases(urls: list[str], revision: str, config_file: str | None = 'alembic.ini'):
+    from alembic import command  # noqa: PLC0415
+    from alembic.config import Config  # noqa: PLC0415
+
+    for url in urls:
+        config = Config(config_file)
+        if config_file is None:  # no alembic.ini, nor its logging setup
+            config.set_main_option('script_location', str(MIGRATIONS))
+        config.attributes['url'] = url  # read by migrations/env.py
+        command.upgrade(config, revision)
+
+
+def migrate_shards(args):
+    from sqlalchemy.engine import make_url  # noqa: PLC0415
+
+    from fast_zero.settings import Settings  # noqa: PLC0415
+
+    settings = Settings()
+    # DATABASE_URL first, it may be one of the shards as well
+    urls = list(dict.fromkeys([settings.DATABASE_URL, *settings.TODO_SHARD_URLS]))
+    migrate_databases(urls, args.revision, args.config)
+    for url in urls:
+        print(f'{make_url(url).render_as_string(hide_password=True)} at {args.revision}')
+
+
+def run_shard_task(task, **kwargs):
+    from fast_zero.shards import shard_router  # noqa: PLC0415
+
+    if not shard_router.enabled:
+        print('TODO_SHARD_URLS is empty, todos are not sharded', file=sys.stderr)
+        return None
+    return asyncio.run(task(shard_router, **kwargs))
+
+
+def pin_shards(args):
+    from fast_zero.shards import pin_existing  # noqa: PLC0415
+
+    pinned = run_shard_task(pin_existing)
+    if pinned is None:
+        return 1
+    for shard, users in sorted(pinned.items()):
+        print(f'shard {shard}: {users} users pinned')
+    print(f'# {pinned.total()} users pinned', file=sys.stderr)
+    return 0
+
+
+def shards_status(args):
+    from fast_zero.shards import shard_status  # noqa: PLC0415
+
+    status = run_shard_task(shard_status)
+    if status is None:
+        return 1
+    for row in status:
+        print(
+            f'shard {row["shard"]} {row["url"]}: {row["users"]} users, '
+            f'{row["todos"]} todos, {row["to_move"]} users to move'
+        )
+    return 0
+
+
+def rebalance_shards(args):
+    from fast_zero.shards import plan_rebalance, rebalance  # noqa: PLC0415
+
+    if args.dry_run:
+        plan = run_shard_task(plan_rebalance)
+        if plan is None:
+            return 1
+        for user_id, (source, target) in list(plan.items())[: args.limit]:
+            print(f'user {user_id}: shard {source} -> {target}')
+        return 0
+
+    moved = run_shard_task(rebalance, batch_size=args.batch_size, limit=args.limit)
+    if moved is None:
+        return 1
+    print(f'{len(moved)} users moved, {sum(moved.values())} todos copied')
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='fast-zero', description='fast_zero management commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    calibrate = commands.add_parser(
+        'calibrate-argon2', help='pick Argon2 costs that fit a latency budget on this host'
+    )
+    calibrate.add_argument('--target-ms', type=float, default=250.0, help='time budget per hash')
+    calibrate.add_argument(
+        '--memory-cost', type=int, default=65536, help='starting memory cost in KiB'
+    )
+    calibrate.add_argument('--parallelism', type=int, default=4)
+    calibrate.add_argument(
+        '--write-env', action='store_true', help='store the parameters in the .env file'
+    )
+    calibrate.add_argument('--env-file', type=Path, default=Path('.env'))
+    calibrate.set_defaults(handler=calibrate_argon2)
+
+    serve_parser = commands.add_parser(
+        'serve', help='run the API: gunicorn + uvicorn workers, or --dev for auto reload'
+    )
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument(
+        '--workers', type=int, default=None, help='default: SERVER_WORKERS or one per CPU'
+    )
+    serve_parser.add_argument(
+        '--dev', action='store_true', help='single uvicorn process with --reload'
+    )
+    serve_parser.set_defaults(handler=serve)
+
+    counters = commands.add_parser(
+        'check-counters', help='compare todo_counters with the todos, exit 1 on drift'
+    )
+    counters.add_argument(
+        '--repair', action='store_true', help='overwrite drifted counters with the actual counts'
+    )
+    counters.set_defaults(handler=check_counters)
+
+    dataset = commands.add_parser(
+        'generate-dataset', help='bulk-load synthetic users and todos for scale testing'
+    )
+    dataset.add_argument('--users', type=int, default=10_000)
+    dataset.add_argument('--todos', type=int, default=1_000_000)
+    dataset.add_argument(
+        '--skew', type=float, default=1.1, help='Zipf exponent of todos per user, 0 is even'
+    )
+    dataset.add_argument('--seed', type=int, default=0)
+    dataset.add_argument('--password', default='benchmark', help='password of every user')
+    dataset.add_argument('--chunk-size', type=int, default=10_000)
+    dataset.add_argument('--prefix', default=None, help='username prefix, random by default')
+    dataset.set_defaults(handler=generate_dataset)
+
+    shards = commands.add_parser('shards', help='manage the databases todos are sharded across')
+    actions = shards.add_subparsers(dest='action', required=True)
+    migrate = actions.add_parser(
+        'migrate', help='run the Alembic migrations on DATABASE_URL and every shard'
+    )
+    migrate.add_argument('revision', nargs='?', default='head')
+    migrate.add_argument('--config', default='alembic.ini')
+    migrate.set_defaults(handler=migrate_shards)
+    actions.add_parser(
+        'pin', help='record the shard of users whose todos were written while unsharded'
+    ).set_defaults(handler=pin_shards)
+    actions.add_parser('status', help='users and todos per shard').set_defaults(
+        handler=shards_status
+    )
+    rebalance = actions.add_parser(
+        'rebalance', help='move users to their jump hash shard while the API serves'
+    )
+    rebalance.add_argument('--batch-size', type=int, default=100, help='users moved together')
+    rebalance.add_argument('--limit', type=int, default=None, help='move at most this many users')
+    rebalance.add_argument('--dry-run', action='store_true', help='only list the moves')
+    rebalance.set_defaults(handler=rebalance_shards)
+
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
@@ -0,0 +1,140 @@
+# fast_zero\counters.py
+from collections import Counter
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import Todo, TodoCounter, TodoListVersion, TodoState
+from fast_zero.search import dialect_name
+
+INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+# * manutenção dos contadores
+# Called by the todo write paths inside their transaction, so a counter changes
+# exactly when the todos it counts are committed. The upsert adds to the stored
+# value in the database (count = count + delta), concurrent writers for the same
+# user serialize on the counter row instead of overwriting each other. Every
+# call also moves the user's list version on, even without a state change.
+async def adjust_counters(session: AsyncSession, user_id: int, deltas: Counter):
+    await add_counts(session, {(user_id, state): delta for state, delta in deltas.items() if delta})
+    await bump_versions(session, [user_id])
+
+
+async def add_counts(session: AsyncSession, counts: dict):
+    """Add {(user_id, state): delta} to the counters, one executemany upsert."""
+    if not counts:
+        return
+    rows = [
+        {'user_id': user_id, 'state': state, 'count': delta}
+        for (user_id, state), delta in sorted(counts.items())  # same lock order in every writer
+    ]
+    upsert = INSERTS[dialect_name(session)](TodoCounter)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=['user_id', 'state'],
+        set_={'count': TodoCounter.count + upsert.excluded['count']},
+    )
+    await session.execute(upsert, rows)
+
+
+async def bump_versions(session: AsyncSession, user_ids):
+    """Increment the todo list version of `user_ids`, one executemany upsert."""
+    rows = [{'user_id': user_id, 'version': 1} for user_id in sorted(set(user_ids))]
+    if not rows:
+        return
+    upsert = INSERTS[dialect_name(session)](TodoListVersion)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=['user_id'], set_={'version': TodoListVersion.version + 1}
+    )
+    await session.execute(upsert, rows)
+
+
+async def list_version(session: AsyncSession, user_id: int) -> int:
+    # primary key lookup, whatever the number of todos
+    version = await session.scalar(
+        select(TodoListVersion.version).where(TodoListVersion.user_id == user_id)
+    )
+    return version or 0
+
+
+def state_changes(changes) -> Counter:
+    """Counter deltas for (old_state, new_state) pairs."""
+    deltas = Counter()
+    for old_state, new_state in changes:
+        if new_state != old_state:
+            deltas[old_state] -= 1
+            deltas[new_state] += 1
+    return deltas
+
+
+async def todo_stats(session: AsyncSession, user_id: int) -> dict:
+    counts = dict(
+        (
+            await session.execute(
+                select(TodoCounter.state, TodoCounter.count).where(TodoCounter.user_id == user_id)
+            )
+        ).all()
+    )
+    states = {state: counts.get(state, 0) for state in TodoState}
+    return {'total': sum(states.values()), 'states': states}
+
+
+# * verificação e reparo
+async def actual_counts(session: AsyncSession, user_ids=None) -> dict:
+    query = select(Todo.user_id, Todo.state, func.count()).group_by(Todo.user_id, Todo.state)
+    if user_ids is not None:
+        query = query.where(Todo.user_id.in_(user_ids))
+    return {(user_id, state): count for user_id, state, count in await session.execute(query)}
+
+
+async def stored_counts(session: AsyncSession, user_ids=None, *, lock: bool = False) -> dict:
+    query = select(TodoCounter.user_id, TodoCounter.state, TodoCounter.count)
+    if user_ids is not None:
+        query = query.where(TodoCounter.user_id.in_(user_ids))
+    if lock:
+        query = query.order_by(TodoCounter.user_id, TodoCounter.state).with_for_update()
+    return {(user_id, state): count for user_id, state, count in await session.execute(query)}
+
+
+def compare(stored: dict, actual: dict) -> list[dict]:
+    return [
+        {
+            'user_id': user_id,
+            'state': state,
+            'stored': stored.get((user_id, state), 0),
+            'actual': actual.get((user_id, state), 0),
+        }
+        for user_id, state in sorted(stored.keys() | actual.keys())
+        if stored.get((user_id, state), 0) != actual.get((user_id, state), 0)
+    ]
+
+
+async def counter_drift(session: AsyncSession) -> list[dict]:
+    """Counters that disagree with a GROUP BY over the todos."""
+    return compare(await stored_counts(session), await actual_counts(session))
+
+
+async def repair_counters(session: AsyncSession) -> list[dict]:
+    """Overwrite the drifted counters with the actual counts, returns what was fixed."""
+    drift = await counter_drift(session)
+    user_ids = sorted({row['user_id'] for row in drift})
+    if not user_ids:
+        return []
+    # lock the counters of the affected users and count again: writers committed
+    # since the first pass are included, running ones wait on the counter rows
+    stored = await stored_counts(session, user_ids, lock=True)
+    drift = compare(stored, await actual_counts(session, user_ids))
+    for row in drift:
+        upsert = INSERTS[dialect_name(session)](TodoCounter).values(
+            user_id=row['user_id'], state=row['state'], count=row['actual']
+        )
+        await session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=['user_id', 'state'], set_={'count': row['actual']}
+            )
+        )
+    # todos written behind the API's back: cached list ETags are stale as well
+    await bump_versions(session, user_ids)
+    await session.commit()
+    return drift
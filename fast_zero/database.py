@@ -1,12 +1,113 @@
 # fast_zero\database.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+import time
 
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from fast_zero.querylog import query_log
 from fast_zero.settings import Settings
 
-engine = create_engine(Settings().DATABASE_URL, echo=True)  # echo=True enables SQL query logging
+
+# * pool de conexões instrumentado
+class PoolStats:
+    """Checkout counters of a pool: how often and how long requests wait for a connection."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, *, timed_out: bool = False):
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def as_dict(self) -> dict:
+        attempts = self.checkouts + self.timeouts
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_avg_ms': self.wait_total / attempts * 1000 if attempts else 0.0,
+            'wait_max_ms': self.wait_max * 1000,
+        }
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that times every checkout, the wait includes opening new connections."""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        # DB_MAX_OVERFLOW from engine_options, reported by pool_status
+        self.max_overflow = max_overflow
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+
+def engine_options(settings: Settings, url: str | None = None) -> dict:
+    url = make_url(url or settings.DATABASE_URL)
+    # echo logs every statement synchronously, keep it for local debugging;
+    # production relies on the slow-query log (fast_zero.querylog)
+    options = {'echo': settings.DB_ECHO}
+    # in-memory SQLite lives in a single connection (StaticPool), there is nothing to size
+    if url.get_backend_name() == 'sqlite' and url.database in {None, '', ':memory:'}:
+        return options
+    return {
+        **options,
+        'poolclass': InstrumentedPool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'pool_use_lifo': settings.DB_POOL_USE_LIFO,
+    }
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPool):
+        return {'pool': type(pool).__name__}
+    return {
+        'pool': type(pool).__name__,
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        # connections opened beyond pool_size, negative while the pool is not full yet
+        'overflow': pool.overflow(),
+        'max_overflow': pool.max_overflow,
+        **pool.stats.as_dict(),
+    }
+
+
+def create_engine(settings: Settings, url: str | None = None) -> AsyncEngine:
+    """Engine for DATABASE_URL, or for `url` (a replica) with the same pool settings."""
+    url = url or settings.DATABASE_URL
+    # postgresql+psycopg:// URLs resolve to psycopg's async driver on an async engine
+    async_engine = create_async_engine(url, **engine_options(settings, url))
+    query_log.install(async_engine.sync_engine)
+    return async_engine
+
+
+engine = create_engine(Settings())
 
 
-def get_session():  # pragma: no cover
-    with Session(engine) as session:
+async def get_session():  # pragma: no cover
+    # expire_on_commit=False keeps attributes loaded after commit, since lazy
+    # loading (implicit IO) is not allowed with an AsyncSession
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
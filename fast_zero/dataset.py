@@ -0,0 +1,207 @@
+# fast_zero\dataset.py
+import itertools
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero import shards
+from fast_zero.bulk import bulk_insert
+from fast_zero.counters import add_counts, bump_versions
+from fast_zero.models import Todo, TodoState, User
+from fast_zero.security import get_password_hash
+
+# share of the todos in each state, roughly what a long-lived account has
+STATE_WEIGHTS = {
+    TodoState.draft: 10,
+    TodoState.todo: 35,
+    TodoState.doing: 15,
+    TodoState.done: 35,
+    TodoState.trash: 5,
+}
+WORDS = (
+    'review pull request deploy staging fix login bug write tests update docs call client '
+    'prepare report invoice meeting notes plan sprint refactor database migration backup '
+    'server monitor alerts renew certificate order supplies book flight hotel dentist '
+    'groceries pay rent clean kitchen laundry read chapter study exam email reply schedule '
+    'interview onboarding budget review quarterly goals design mockup feedback release'
+).split()
+TEXT_POOL_SIZE = 4_096  # distinct titles and descriptions, picked at random per row
+USER_COLUMNS = ['username', 'email', 'password']
+TODO_COLUMNS = ['title', 'description', 'state', 'user_id', 'created_at', 'updated_at']
+
+
+@dataclass
+class DatasetSpec:
+    users: int
+    todos: int
+    skew: float = 1.1  # Zipf exponent of todos per user, 0 spreads them evenly
+    seed: int = 0
+    password: str = 'benchmark'
+    chunk_size: int = 10_000
+    prefix: str = field(default_factory=lambda: f'gen{uuid.uuid4().hex[:6]}')
+
+
+def sentence(rng: random.Random, median_words: float, max_words: int) -> str:
+    # log-normal word counts: mostly short, a long tail
+    count = min(max_words, max(1, round(rng.lognormvariate(math.log(median_words), 0.6))))
+    return ' '.join(rng.choices(WORDS, k=count)).capitalize()
+
+
+def user_weights(count: int, skew: float) -> list[float]:
+    """Cumulative Zipf weights: user k gets 1 / (k + 1) ** skew of the todos."""
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+async def user_chunks(spec: DatasetSpec, hashed_password: str):
+    for start in range(0, spec.users, spec.chunk_size):
+        yield [
+            {
+                'username': f'{spec.prefix}_{i}',
+                'email': f'{spec.prefix}_{i}@example.com',
+                'password': hashed_password,
+            }
+            for i in range(start, min(start + spec.chunk_size, spec.users))
+        ]
+
+
+async def todo_chunks(spec: DatasetSpec, user_ids: list[int], counts: Counter):
+    rng = random.Random(spec.seed)
+    titles = [sentence(rng, 4, 12) for _ in range(TEXT_POOL_SIZE)]
+    descriptions = [sentence(rng, 12, 80) for _ in range(TEXT_POOL_SIZE)]
+    states = list(STATE_WEIGHTS)
+    state_weights = list(itertools.accumulate(STATE_WEIGHTS.values()))
+    owner_weights = user_weights(len(user_ids), spec.skew)
+    now = datetime.now(UTC).replace(tzinfo=None)
+    year = timedelta(days=365).total_seconds()
+
+    for start in range(0, spec.todos, spec.chunk_size):
+        size = min(spec.chunk_size, spec.todos - start)
+        owners = rng.choices(user_ids, cum_weights=owner_weights, k=size)
+        chunk_states = rng.choices(states, cum_weights=state_weights, k=size)
+        chunk = []
+        for user_id, state in zip(owners, chunk_states):
+            age = rng.random() * year
+            created_at = now - timedelta(seconds=age)
+            chunk.append({
+                'title': rng.choice(titles),
+                'description': rng.choice(descriptions),
+                'state': state,
+                'user_id': user_id,
+                'created_at': created_at,
+                'updated_at': created_at + timedelta(seconds=rng.random() * age),
+            })
+            counts[user_id, state] += 1
+        yield chunk
+
+
+async def store_counts(session: AsyncSession, counts: Counter, user_ids, chunk_size: int):
+    # the counters behind GET /todos/stats and the list versions behind the
+    # ETag of GET /todos/, as the todo write paths would keep them
+    keys = sorted(counts)
+    for start in range(0, len(keys), chunk_size):
+        await add_counts(session, {key: counts[key] for key in keys[start : start + chunk_size]})
+    for start in range(0, len(user_ids), chunk_size):
+        await bump_versions(session, user_ids[start : start + chunk_size])
+
+
+async def one_chunk(rows: list[dict]):
+    yield rows
+
+
+async def load_sharded(
+    primary: AsyncSession, router: shards.ShardRouter, spec: DatasetSpec, user_ids: list[int]
+) -> tuple[int, Counter]:
+    """
+    Write the todos to each user's jump_hash shard, like the API would: the
+    users are pinned first and the todo ids come from id_sequences.
+    """
+    homes = {user_id: router.home(user_id) for user_id in user_ids}
+    for start in range(0, len(user_ids), spec.chunk_size):
+        chunk = {user_id: homes[user_id] for user_id in user_ids[start : start + spec.chunk_size]}
+        for shard, owners in itertools.groupby(sorted(chunk, key=chunk.get), key=chunk.get):
+            await router.ensure_owners(shard, list(owners))
+        await router.pin(chunk, replace=False)
+
+    counts = Counter()
+    todos = 0
+    async with AsyncExitStack() as stack:
+        sessions = {}
+        async for chunk in todo_chunks(spec, user_ids, counts):
+            per_shard = {}
+            for row, todo_id in zip(chunk, await router.allocate_ids(len(chunk))):
+                per_shard.setdefault(homes[row['user_id']], []).append(row | {'id': todo_id})
+            for shard, rows in sorted(per_shard.items()):
+                if shard not in sessions:
+                    sessions[shard] = await stack.enter_async_context(
+                        router.session(shard, primary)
+                    )
+                todos += await bulk_insert(
+                    sessions[shard], Todo.__table__, ['id', *TODO_COLUMNS], one_chunk(rows)
+                )
+        for shard, shard_session in sorted(sessions.items()):
+            owners = [user_id for user_id in user_ids if homes[user_id] == shard]
+            shard_counts = Counter({
+                key: count for key, count in counts.items() if homes[key[0]] == shard
+            })
+            await store_counts(shard_session, shard_counts, owners, spec.chunk_size)
+            await shard_session.commit()
+    return todos, counts
+
+
+async def generate(session: AsyncSession, spec: DatasetSpec) -> dict:
+    """
+    Load `spec.users` users and `spec.todos` todos with COPY (Postgres) or
+    batched inserts. Every user gets the same password, hashed once. With
+    TODO_SHARD_URLS the todos go to the users' shards (see load_sharded).
+    """
+    started = time.perf_counter()
+    hashed_password = get_password_hash(spec.password)
+    await bulk_insert(session, User.__table__, USER_COLUMNS, user_chunks(spec, hashed_password))
+    await session.commit()
+
+    # in id order, so the first users of the run are the heavy ones
+    user_ids = list(
+        (
+            await session.scalars(
+                select(User.id)
+                .where(User.username.startswith(f'{spec.prefix}_', autoescape=True))
+                .order_by(User.id)
+            )
+        ).all()
+    )
+    users_done = time.perf_counter()
+
+    counts = Counter()
+    todos = 0
+    if user_ids and spec.todos:
+        if shards.sharded():
+            todos, counts = await load_sharded(session, shards.shard_router, spec, user_ids)
+        else:
+            todos = await bulk_insert(
+                session, Todo.__table__, TODO_COLUMNS, todo_chunks(spec, user_ids, counts)
+            )
+            await store_counts(session, counts, user_ids, spec.chunk_size)
+    await session.commit()
+    finished = time.perf_counter()
+
+    per_user = Counter()
+    for (user_id, _), count in counts.items():
+        per_user[user_id] += count
+    sizes = sorted(per_user.values(), reverse=True) or [0]
+    return {
+        'prefix': spec.prefix,
+        'users': len(user_ids),
+        'todos': todos,
+        'heaviest_user_todos': sizes[0],
+        'median_user_todos': sizes[len(sizes) // 2],
+        'users_seconds': users_done - started,
+        'todos_seconds': finished - users_done,
+    }
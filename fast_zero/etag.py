@@ -0,0 +1,25 @@
+# fast_zero\etag.py
+import hashlib
+from http import HTTPStatus
+
+from fastapi import Response
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the parts that determine a response body."""
+    digest = hashlib.sha256(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" matches "x" (RFC 9110, 13.1.2)
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag})
@@ -0,0 +1,215 @@
+# fast_zero\metrics.py
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# seconds, from the cheapest cached reads up to the slowest exports
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SERVER_TIMING = b'db;dur=%.2f;desc="%d queries", auth;dur=%.2f, hash;dur=%.2f, total;dur=%.2f'
+SERVER_TIMING_NO_HASH = (
+    b'db;dur=%.2f;desc="%d queries", auth;dur=%.2f, hash;dur=0.00, total;dur=%.2f'
+)
+UNMATCHED_ROUTE = 'unmatched'  # 404s are not labelled by raw path, it would not be bounded
+
+
+# * tempos da requisição corrente
+class RequestTimings:
+    """Time spent per phase while handling one request, in seconds."""
+
+    __slots__ = ('auth', 'db', 'db_queries', 'hash')
+
+    def __init__(self):
+        self.db = 0.0
+        self.db_queries = 0
+        self.auth = 0.0
+        self.hash = 0.0
+
+    def server_timing(self, total: float) -> bytes:
+        # bytes %-formatting: about half the cost of an f-string plus encode();
+        # most requests hash nothing, the float formatting is skipped for them
+        if self.hash:
+            return SERVER_TIMING % (
+                self.db * 1000,
+                self.db_queries,
+                self.auth * 1000,
+                self.hash * 1000,
+                total * 1000,
+            )
+        return SERVER_TIMING_NO_HASH % (
+            self.db * 1000,
+            self.db_queries,
+            self.auth * 1000,
+            total * 1000,
+        )
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar('current_timings', default=None)
+
+
+def record_db_time(elapsed: float):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.db += elapsed
+        timings.db_queries += 1
+    db_queries.inc(elapsed)
+
+
+def record_auth(elapsed: float):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.auth += elapsed
+    auth_latency.observe((), elapsed)
+
+
+def record_hash(operation: str, elapsed: float):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.hash += elapsed
+    hash_latency.observe((operation,), elapsed)
+
+
+# * métricas no formato de texto do Prometheus
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def labelled(self, label_values: tuple) -> list:
+        """The series of `label_values`, callers on a hot path may keep it and observe_into it."""
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        return series
+
+    def observe(self, label_values: tuple, value: float):
+        self.observe_into(self.labelled(label_values), value)
+
+    def observe_into(self, series: list, value: float):
+        series[bisect_left(self.buckets, value)] += 1  # last slot is +Inf
+        series[-2] += value
+        series[-1] += 1
+
+    def expose(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label_values, series in self.series.items():
+            labels = format_labels(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                bucket_labels = format_labels([*zip(self.labels, label_values), ('le', bound)])
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.extend((
+                f'{self.name}_sum{labels} {series[-2]}',
+                f'{self.name}_count{labels} {series[-1]}',
+            ))
+        return lines
+
+
+class Counter:
+    """Count and total time of an event, exposed as <name>_total and <name>_seconds_total."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.count = 0
+        self.seconds = 0.0
+
+    def inc(self, elapsed: float = 0.0):
+        self.count += 1
+        self.seconds += elapsed
+
+    def expose(self) -> list[str]:
+        return [
+            f'# HELP {self.name}_total {self.help}',
+            f'# TYPE {self.name}_total counter',
+            f'{self.name}_total {self.count}',
+            f'# TYPE {self.name}_seconds_total counter',
+            f'{self.name}_seconds_total {self.seconds}',
+        ]
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(pairs) -> str:
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in pairs) + '}'
+
+
+def gauges(name: str, help_text: str, values: dict) -> list[str]:
+    """One gauge per key of a stats dict, e.g. TTLCache.stats() or pool_status()."""
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, int | float):
+            continue
+        lines += [f'# HELP {name}_{key} {help_text}', f'# TYPE {name}_{key} gauge']
+        lines.append(f'{name}_{key} {value}')
+    return lines
+
+
+request_latency = Histogram(
+    'http_request_duration_seconds',
+    'Latency of HTTP requests by route template.',
+    ('method', 'route', 'status'),
+)
+auth_latency = Histogram(
+    'auth_duration_seconds', 'Time resolving the current user of a request.', ()
+)
+hash_latency = Histogram(
+    'password_hash_duration_seconds', 'Time hashing or verifying a password.', ('operation',)
+)
+db_queries = Counter('db_queries', 'SQL statements executed.')
+
+
+# * middleware
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: times each HTTP request, labels it with its route
+    template and adds a Server-Timing header with the DB, auth and hashing
+    time collected through `current_timings`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # (method, id(route), status) -> (route, histogram series): the route
+        # template and the label tuple are looked up once per route, not per request
+        self.series: dict[tuple, tuple] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                header = timings.server_timing(time.perf_counter() - started)
+                message['headers'] = [
+                    *message.get('headers', ()),
+                    (b'server-timing', header),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            route = scope.get('route')
+            # routes are not hashable, the entry keeps the route to rule out a reused id
+            key = (scope['method'], id(route), status)
+            entry = self.series.get(key)
+            if entry is None or entry[0] is not route:
+                path = route.path if route is not None else UNMATCHED_ROUTE
+                entry = self.series[key] = (route, request_latency.labelled((key[0], path, status)))
+            request_latency.observe_into(entry[1], time.perf_counter() - started)
@@ -2,7 +2,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, ForeignKey, Index, event, false, func, literal_column, text
 from sqlalchemy.orm import Mapped, mapped_column, registry
 
 table_registry = registry()
@@ -23,6 +23,8 @@ class User:
     username: Mapped[str] = mapped_column(unique=True)
     password: Mapped[str] = mapped_column()
     email: Mapped[str] = mapped_column(unique=True)
+    # the ver claim of its tokens; incrementing it revokes every token issued before
+    token_version: Mapped[int] = mapped_column(init=False, default=0, server_default='0')
     created_at: Mapped[datetime] = mapped_column(init=False, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), onupdate=func.now()
@@ -31,10 +33,36 @@ class User:
 
 Base = table_registry.generate_base()
 
+SEARCH_CONFIG = 'simple'  # text search configuration, no language stemming
+
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        # every route filters on user_id, listings also on state, ordered by id
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        # must match todo_search_document() for the planner to use it
+        Index(
+            'ix_todos_search',
+            text(f"to_tsvector('{SEARCH_CONFIG}', title || ' ' || description)"),
+            postgresql_using='gin',
+        ).ddl_if(dialect='postgresql'),
+        Index(
+            'ix_todos_title_trgm',
+            'title',
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+        ).ddl_if(dialect='postgresql'),
+        Index(
+            'ix_todos_description_trgm',
+            'description',
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+        ).ddl_if(dialect='postgresql'),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
     title: Mapped[str]
     description: Mapped[str]
@@ -44,3 +72,98 @@ class Todo:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), onupdate=func.now()
     )
+
+
+# * contadores de todos por usuario e estado
+# GET /todos/stats reads these rows instead of a GROUP BY over the todos. Every
+# todo write path adjusts them in the same transaction (fast_zero.counters);
+# `fast-zero check-counters --repair` recomputes them from the todos.
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    __tablename__ = 'todo_counters'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0, server_default='0')
+
+
+# * versão da lista de todos por usuario
+# The ETag of GET /todos/ is derived from this number instead of an aggregate
+# over the user's todos. The same write paths increment it with the counters
+# (fast_zero.counters); a user without a row is at version 0.
+@table_registry.mapped_as_dataclass
+class TodoListVersion:
+    __tablename__ = 'todo_list_versions'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(default=0, server_default='0')
+
+
+# * sharding dos todos por usuario (fast_zero.shards)
+# Both tables live on DATABASE_URL. user_shards records the shard of every user
+# that has todos; id_sequences hands out todo ids in blocks, so ids stay unique
+# across the shards and a user keeps them when moved to another shard.
+@table_registry.mapped_as_dataclass
+class UserShard:
+    __tablename__ = 'user_shards'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    shard: Mapped[int]
+    # set while `fast-zero shards rebalance` copies the user's todos, writes wait for it
+    moving: Mapped[bool] = mapped_column(default=False, server_default=false())
+
+
+@table_registry.mapped_as_dataclass
+class IdSequence:
+    __tablename__ = 'id_sequences'
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    next_id: Mapped[int]
+
+
+# * busca textual (q=) nos todos
+# Postgres: GIN index over the same tsvector expression the search query uses
+# (see Todo.__table_args__), plus pg_trgm indexes so the ILIKE '%...%' filters
+# can use an index as well.
+# SQLite (local runs): an external-content FTS5 table kept in sync by triggers.
+def todo_search_document():
+    return func.to_tsvector(
+        literal_column(f"'{SEARCH_CONFIG}'"),
+        Todo.title + literal_column("' '") + Todo.description,
+    )
+
+
+event.listen(
+    Todo.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'),
+)
+
+TODOS_FTS_DDL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5('
+    "title, description, content='todos', content_rowid='id')",
+    'CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN '
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+    'CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    'CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); "
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+)
+for statement in TODOS_FTS_DDL:
+    event.listen(Todo.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(
+    Todo.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS todos_fts').execute_if(dialect='sqlite'),
+)
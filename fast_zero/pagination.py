@@ -0,0 +1,41 @@
+# fast_zero\pagination.py
+import base64
+import json
+from http import HTTPStatus
+from typing import Sequence, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar('T')
+
+
+def encode_cursor(last_id: int) -> str:
+    # Opaque to clients: base64 of a small JSON document
+    payload = json.dumps({'id': last_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+MAX_ID = 2**63 - 1  # BIGINT, anything above cannot be bound as a parameter
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))['id']
+    except (ValueError, KeyError, TypeError):
+        last_id = None
+    # only the integers encode_cursor writes: no floats (1e400 is inf), bools or strings
+    if type(last_id) is not int or not 0 <= last_id <= MAX_ID:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor.')
+    return last_id
+
+
+def paginate(rows: Sequence[T], limit: int) -> tuple[Sequence[T], str | None]:
+    """
+    Split a result fetched with `limit + 1` rows into the page itself and the
+    cursor for the next one (None when this is the last page).
+    """
+    page = rows[: max(limit, 0)]
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(page[-1].id)
@@ -0,0 +1,226 @@
+# fast_zero\querylog.py
+import functools
+import hashlib
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from sqlalchemy import Engine, event
+
+from fast_zero.metrics import record_db_time
+from fast_zero.settings import Settings
+
+logger = logging.getLogger('fast_zero.sql')
+
+OTHER_FINGERPRINT = 'other'  # bucket for statements past max_fingerprints
+
+# literals and bind placeholders of every paramstyle we run on
+LITERALS = re.compile(
+    r"'(?:[^']|'')*'"  # 'string'
+    r'|\b\d+(?:\.\d+)?\b'  # 42, 4.2
+    r'|%\(\w+\)s|%s|\$\d+|:\w+|\?'  # %(name)s, %s, $1, :name, ?
+)
+REPEATED_GROUPS = re.compile(r'\?(?:\s*,\s*\?)+')  # IN (?, ?, ?) and VALUES rows
+REPEATED_ROWS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> tuple[str, str]:
+    """Normalized text of a statement, without literals, and a short id for it."""
+    normalized = ' '.join(statement.split())
+    normalized = LITERALS.sub('?', normalized)
+    normalized = REPEATED_GROUPS.sub('?', normalized)
+    normalized = REPEATED_ROWS.sub('(?)', normalized)
+    return hashlib.sha1(normalized.encode(), usedforsecurity=False).hexdigest()[:12], normalized
+
+
+# * escrita dos logs fora da thread do event loop
+class LogWriter:
+    """
+    Routes `logger` through a QueueHandler, so request handlers only enqueue
+    records and a QueueListener thread does the I/O. The thread is started
+    again in forked workers, where it does not survive the fork.
+    """
+
+    def __init__(self, target_logger: logging.Logger, handler: logging.Handler):
+        self.logger = target_logger
+        self.handler = handler
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            if not self.listener:
+                self.logger.addHandler(QueueHandler(self.queue))
+                self.logger.propagate = False
+            self.listener = QueueListener(self.queue, self.handler, respect_handler_level=True)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def stop(self):
+        with self.lock:
+            if self.listener and self.pid == os.getpid():
+                self.listener.stop()  # flushes what is still queued
+                self.pid = None
+
+
+def stderr_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    return handler
+
+
+log_writer = LogWriter(logger, stderr_handler())
+
+
+# * estatísticas por fingerprint e log de queries lentas
+class QueryLog:
+    """
+    Times every statement through engine events and keeps count, total and
+    max time per fingerprint. Statements slower than `threshold_ms` are logged
+    with probability `sample_rate`, plus their plan when `explain` is set
+    (plain SELECTs only: EXPLAIN ANALYZE runs the query again, and a WITH may
+    hold an INSERT/UPDATE/DELETE).
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        threshold_ms: float,
+        sample_rate: float = 1.0,
+        explain: bool = False,
+        max_fingerprints: int = 1000,
+        target_logger: logging.Logger = logger,
+    ):
+        self.threshold = threshold_ms / 1000 if threshold_ms > 0 else None
+        self.sample_rate = sample_rate
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.logger = target_logger
+        self.stats: dict[str, dict] = {}
+        # start times of the statements running on a connection, one stack per log
+        self.info_key = f'query_started_{id(self)}'
+
+    @classmethod
+    def from_settings(cls, settings: Settings):
+        return cls(
+            threshold_ms=settings.SLOW_QUERY_MS,
+            sample_rate=settings.SLOW_QUERY_SAMPLE_RATE,
+            explain=settings.SLOW_QUERY_EXPLAIN,
+            max_fingerprints=settings.QUERY_STATS_MAX_FINGERPRINTS,
+        )
+
+    def install(self, engine: Engine):
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(engine, 'handle_error', self.handle_error)
+
+    def uninstall(self, engine: Engine):
+        event.remove(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.remove(engine, 'handle_error', self.handle_error)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913, PLR0917
+        conn.info.setdefault(self.info_key, []).append(time.perf_counter())
+
+    def handle_error(self, exception_context):
+        # a failed statement never reaches after_cursor_execute, drop its start time
+        conn = exception_context.connection
+        started = conn.info.get(self.info_key) if conn is not None else None
+        if started:
+            started.pop()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913, PLR0917
+        started = conn.info.get(self.info_key)
+        if not started:  # installed while this statement was already running
+            return
+        elapsed = time.perf_counter() - started.pop()
+        record_db_time(elapsed)
+        fingerprint_id, normalized = fingerprint(statement)
+        self.record(fingerprint_id, normalized, elapsed)
+
+        if self.threshold is None or elapsed < self.threshold:
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:  # noqa: S311
+            return
+        plan = None
+        if self.explain and not executemany:
+            plan = self.explain_plan(conn, statement, parameters)
+        self.logger.warning(
+            'slow query %.1f ms [%s] %s%s',
+            elapsed * 1000,
+            fingerprint_id,
+            normalized,
+            f'\n{plan}' if plan else '',
+            extra={'duration_ms': elapsed * 1000, 'fingerprint': fingerprint_id, 'plan': plan},
+        )
+
+    def record(self, fingerprint_id: str, normalized: str, elapsed: float):
+        stats = self.stats.get(fingerprint_id)
+        if stats is None:
+            if len(self.stats) >= self.max_fingerprints:
+                fingerprint_id, normalized = OTHER_FINGERPRINT, ''
+                stats = self.stats.get(fingerprint_id)
+            if stats is None:
+                stats = {'statement': normalized, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+                self.stats[fingerprint_id] = stats
+        elapsed_ms = elapsed * 1000
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    @staticmethod
+    def explain_plan(conn, statement: str, parameters) -> str | None:
+        if not statement.lstrip().upper().startswith('SELECT'):
+            return None
+        if conn.dialect.name == 'postgresql':
+            prefix, column = 'EXPLAIN (ANALYZE, BUFFERS) ', 0
+        elif conn.dialect.name == 'sqlite':
+            prefix, column = 'EXPLAIN QUERY PLAN ', -1
+        else:
+            return None
+        # Postgres runs it in a savepoint of the request's transaction: a failed
+        # EXPLAIN would otherwise abort the transaction and every later statement
+        savepoint = conn.dialect.name == 'postgresql'
+        # a raw DBAPI cursor: no engine events, so the EXPLAIN is not timed itself
+        cursor = conn.connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute('SAVEPOINT query_log_explain')
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = '\n'.join(str(row[column]) for row in cursor.fetchall())
+            except Exception as exc:  # noqa: BLE001
+                plan = f'EXPLAIN failed: {exc}'
+                if savepoint:
+                    cursor.execute('ROLLBACK TO SAVEPOINT query_log_explain')
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT query_log_explain')
+            return plan
+        except Exception as exc:  # noqa: BLE001
+            return f'EXPLAIN failed: {exc}'
+        finally:
+            cursor.close()
+
+    def top(self, limit: int = 20) -> list[dict]:
+        """Fingerprints that took the most time in total."""
+        ranked = sorted(self.stats.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        return [
+            {'fingerprint': fingerprint_id, **stats, 'avg_ms': stats['total_ms'] / stats['count']}
+            for fingerprint_id, stats in ranked[:limit]
+        ]
+
+    def reset(self):
+        self.stats.clear()
+
+
+query_log = QueryLog.from_settings(Settings())
@@ -0,0 +1,204 @@
+# fast_zero\replicas.py
+import itertools
+import time
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, asynccontextmanager
+from typing import Callable
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+from fast_zero.cache import TTLCache
+from fast_zero.database import create_engine, pool_status
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+
+# * escolha da réplica
+def checked_out(engine: AsyncEngine) -> int:
+    # 0 for pools without counters (in-memory SQLite)
+    return pool_status(engine).get('checked_out', 0)
+
+
+class ReplicaSet:
+    """
+    The read replicas of the primary. `candidates()` lists the healthy ones in
+    the order to try them: rotating for 'round_robin', fewest connections
+    checked out first for 'least_connections'. A replica that failed is
+    skipped for `retry_after` seconds, then tried again.
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        strategy: str = 'round_robin',
+        retry_after: float = 30.0,
+    ):
+        self.engines = engines
+        self.strategy = strategy
+        self.retry_after = retry_after
+        self.down_until: dict[int, float] = {}
+        self.reads = [0] * len(engines)
+        self.primary_reads = 0
+        self.failovers = 0
+        self._turn = itertools.count()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> 'ReplicaSet':
+        return cls(
+            [create_engine(settings, url) for url in settings.DATABASE_REPLICA_URLS],
+            strategy=settings.REPLICA_SELECTION,
+            retry_after=settings.REPLICA_RETRY_SECONDS,
+        )
+
+    def healthy(self) -> list[int]:
+        now = time.monotonic()
+        return [i for i in range(len(self.engines)) if self.down_until.get(i, 0) <= now]
+
+    def candidates(self) -> list[int]:
+        healthy = self.healthy()
+        if not healthy:
+            return []
+        if self.strategy == 'least_connections':
+            return sorted(healthy, key=lambda i: checked_out(self.engines[i]))
+        start = next(self._turn) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def mark_down(self, index: int):
+        self.down_until[index] = time.monotonic() + self.retry_after
+        self.failovers += 1
+
+    async def dispose(self):
+        for replica in self.engines:
+            await replica.dispose()
+
+    def stats(self) -> dict:
+        healthy = set(self.healthy())
+        return {
+            'replicas': len(self.engines),
+            'healthy': len(healthy),
+            'strategy': self.strategy,
+            'primary_reads': self.primary_reads,
+            'replica_reads': sum(self.reads),
+            'failovers': self.failovers,
+            'members': [
+                {
+                    'url': replica.url.render_as_string(hide_password=True),
+                    'healthy': index in healthy,
+                    'reads': self.reads[index],
+                    **pool_status(replica),
+                }
+                for index, replica in enumerate(self.engines)
+            ],
+        }
+
+
+replica_set = ReplicaSet.from_settings(settings)
+
+
+# * leia o que você escreveu
+# user id -> True for READ_YOUR_WRITES_SECONDS after a commit that wrote. Replicas
+# lag behind the primary, so that user's reads stay on the primary meanwhile. The
+# window is kept in each worker process: a read served by another worker may
+# still go to a replica.
+recent_writers = TTLCache(max_size=100_000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def check_statement(orm_execute_state):
+    if not (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        return
+    session = orm_execute_state.session
+    if session.info.get('read_only'):
+        raise exc.InvalidRequestError('Write statement on a read replica session.')
+    session.info['wrote'] = True  # session.execute(insert/update/delete ...)
+
+
+@event.listens_for(Session, 'before_flush')
+def check_flush(session, flush_context, instances):
+    if session.info.get('read_only'):
+        raise exc.InvalidRequestError('Flush on a read replica session.')
+
+
+@event.listens_for(Session, 'after_flush')
+def remember_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def remember_writer(session):
+    # user_id is set by the auth dependencies on the request's primary session
+    if session.info.pop('wrote', False) and session.info.get('user_id') is not None:
+        recent_writers.set(session.info['user_id'], True)
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_write(session):
+    session.info.pop('wrote', None)
+
+
+# * sessão de leitura
+@asynccontextmanager
+async def read_session(primary: AsyncSession, user_id: int | None = None):
+    """
+    A session on a replica for a read-only handler, or `primary` when there
+    are no healthy replicas or `user_id` wrote within READ_YOUR_WRITES_SECONDS.
+    A replica that cannot hand out a connection is marked down and the next
+    one is tried.
+    """
+    if not replica_set.engines or (user_id is not None and user_id in recent_writers):
+        replica_set.primary_reads += 1
+        yield primary
+        return
+
+    for index in replica_set.candidates():
+        session = AsyncSession(
+            replica_set.engines[index], expire_on_commit=False, info={'read_only': True}
+        )
+        try:
+            await session.connection()  # checkout, with pre-ping, fails on a dead replica
+        except (exc.DBAPIError, OSError):
+            await session.close()
+            replica_set.mark_down(index)
+            continue
+
+        replica_set.reads[index] += 1
+        try:
+            yield session
+        except exc.DBAPIError as error:
+            if error.connection_invalidated:
+                replica_set.mark_down(index)  # lost mid-request, later reads go elsewhere
+            raise
+        finally:
+            await session.close()
+        return
+
+    replica_set.primary_reads += 1
+    yield primary
+
+
+class LazySession:
+    """
+    The read session of a request, opened by `get()` right before the first
+    statement that needs it. Requests answered from a cache, and the writes,
+    never check out a replica connection. The session is closed with `stack`,
+    which the dependency holding this object exits at the end of the request.
+    """
+
+    def __init__(
+        self,
+        stack: AsyncExitStack,
+        open_session: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+    ):
+        self._stack = stack
+        self._open_session = open_session
+        self._session: AsyncSession | None = None
+
+    async def get(self) -> AsyncSession:
+        # read_session tries the replicas here, a dead one fails over at this first use
+        if self._session is None:
+            self._session = await self._stack.enter_async_context(self._open_session())
+        return self._session
@@ -0,0 +1,228 @@
+# fast_zero\response_cache.py
+import math
+import time
+from dataclasses import dataclass
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+from fast_zero.cache import TTLCache
+from fast_zero.etag import etag_matches, not_modified
+from fast_zero.settings import Settings
+
+try:  # optional: pip install fast-zero[redis]
+    from redis import asyncio as redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+    def to_response(self, if_none_match: str | None = None) -> Response:
+        if etag_matches(if_none_match, self.etag):
+            return not_modified(self.etag)
+        return Response(
+            self.body,
+            status_code=HTTPStatus.OK,
+            headers={'ETag': self.etag},
+            media_type='application/json',
+        )
+
+    def dump(self) -> bytes:
+        return self.etag.encode() + b'\n' + self.body
+
+    @classmethod
+    def load(cls, data: bytes) -> 'CachedResponse':
+        etag, body = data.split(b'\n', 1)
+        return cls(body=body, etag=etag.decode())
+
+
+# * backends
+# Invalidation bumps a generation number that is part of every key, old
+# entries are simply never read again and age out. A lookup returns the
+# generation it used and the store must reuse it: a response computed while
+# an invalidation happened lands in the old generation instead of being served.
+class MemoryBackend:
+    """Per process: invalidations only reach the worker that handled the write."""
+
+    name = 'memory'
+
+    def __init__(self, max_size: int, ttl: float):
+        self.entries = TTLCache(max_size=max_size, ttl=ttl)
+        self.generations: dict[str, int] = {}
+
+    async def lookup(self, namespace: str, key: str) -> tuple[int, bytes | None]:
+        generation = self.generations.get(namespace, 0)
+        return generation, self.entries.get((namespace, generation, key))
+
+    async def store(self, namespace: str, generation: int, key: str, value: bytes):
+        self.entries.set((namespace, generation, key), value)
+
+    async def invalidate(self, namespace: str):
+        self.generations[namespace] = self.generations.get(namespace, 0) + 1
+
+    def stats(self) -> dict:
+        return {'size': len(self.entries), 'max_size': self.entries.max_size}
+
+    def clear(self):
+        self.entries.clear()
+        self.generations.clear()
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Shared by every worker and host. Entries expire after `ttl`; the memory
+    bound is Redis' own (maxmemory with an LRU eviction policy).
+    """
+
+    name = 'redis'
+    # generation and entry in one round trip
+    LOOKUP = """
+    local generation = redis.call('GET', KEYS[1]) or '0'
+    return {generation, redis.call('GET', KEYS[1] .. ':' .. generation .. ':' .. ARGV[1])}
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = 'fast_zero:response'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.lookup_script = client.register_script(self.LOOKUP)
+
+    def generation_key(self, namespace: str) -> str:
+        return f'{self.prefix}:{namespace}'
+
+    async def lookup(self, namespace: str, key: str) -> tuple[int, bytes | None]:
+        generation, value = await self.lookup_script(
+            keys=[self.generation_key(namespace)], args=[key]
+        )
+        return int(generation), value
+
+    async def store(self, namespace: str, generation: int, key: str, value: bytes):
+        entry_key = f'{self.generation_key(namespace)}:{generation}:{key}'
+        await self.client.set(entry_key, value, px=int(self.ttl * 1000))
+
+    async def invalidate(self, namespace: str):
+        await self.client.incr(self.generation_key(namespace))
+
+    def stats(self) -> dict:  # noqa: PLR6301
+        return {}
+
+    def clear(self):
+        pass
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class NullBackend:
+    name = 'none'
+
+    async def lookup(self, namespace: str, key: str) -> tuple[int, bytes | None]:  # noqa: PLR6301
+        return 0, None
+
+    async def store(self, namespace: str, generation: int, key: str, value: bytes):
+        pass
+
+    async def invalidate(self, namespace: str):
+        pass
+
+    def stats(self) -> dict:  # noqa: PLR6301
+        return {}
+
+    def clear(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def create_backend(settings: Settings):
+    if settings.RESPONSE_CACHE_BACKEND == 'redis':
+        if redis is None:  # pragma: no cover
+            raise RuntimeError('RESPONSE_CACHE_BACKEND=redis needs the redis package.')
+        return RedisBackend(
+            redis.from_url(settings.REDIS_URL), ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+        )
+    if settings.RESPONSE_CACHE_BACKEND == 'memory':
+        return MemoryBackend(
+            max_size=settings.RESPONSE_CACHE_MAX_SIZE, ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+        )
+    return NullBackend()
+
+
+# * cache de respostas por namespace
+# A write commits on the primary and bumps the generation at once, but replicas
+# lag: a miss read from a replica right after the bump would cache the old rows
+# under the new generation. For `settle_seconds` after this process sees the
+# generation change (its own invalidation, or another worker's through Redis),
+# `settling()` tells the routes to read from the primary instead.
+class ResponseCache:
+    """Cached JSON bodies of the GET routes of one namespace, keyed by path and query."""
+
+    def __init__(self, backend, namespace: str, settle_seconds: float = 0.0):
+        self.backend = backend
+        self.namespace = namespace
+        self.settle_seconds = settle_seconds
+        self.generation: int | None = None
+        self.changed_at = -math.inf
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(request: Request) -> str:
+        query = '&'.join(sorted(f'{k}={v}' for k, v in request.query_params.multi_items()))
+        return f'{request.url.path}?{query}'
+
+    async def lookup(self, request: Request) -> tuple[int, CachedResponse | None]:
+        generation, data = await self.backend.lookup(self.namespace, self.key(request))
+        if generation != self.generation:
+            if self.generation is not None:
+                self.changed_at = time.monotonic()
+            self.generation = generation
+        if data is None:
+            self.misses += 1
+            return generation, None
+        self.hits += 1
+        return generation, CachedResponse.load(data)
+
+    async def store(self, generation: int, request: Request, body: bytes, etag: str):
+        cached = CachedResponse(body=body, etag=etag)
+        await self.backend.store(self.namespace, generation, self.key(request), cached.dump())
+        return cached
+
+    async def invalidate(self):
+        await self.backend.invalidate(self.namespace)
+
+    def settling(self) -> bool:
+        """True while a replica may still miss the write behind the last invalidation."""
+        return time.monotonic() - self.changed_at < self.settle_seconds
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            **self.backend.stats(),
+        }
+
+    def clear(self):
+        self.backend.clear()
+        self.generation = None
+        self.changed_at = -math.inf
+        self.hits = 0
+        self.misses = 0
+
+
+settings = Settings()
+response_cache_backend = create_backend(settings)
+user_responses = ResponseCache(
+    response_cache_backend, 'users', settle_seconds=settings.READ_YOUR_WRITES_SECONDS
+)
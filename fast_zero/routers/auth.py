@@ -4,16 +4,19 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import get_session
 from fast_zero.models import User
-from fast_zero.schemas import Token
+from fast_zero.schemas import Message, Token
 from fast_zero.security import (
+    Principal,
     create_access_token,
-    get_current_user,
-    verify_password,
+    forget_principal,
+    get_current_principal,
+    password_hasher,
+    token_claims,
 )
 
 router = APIRouter(
@@ -21,21 +24,35 @@ router = APIRouter(
     tags=['auth'],
     responses={404: {'description': 'Not found'}},
 )
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
 T_OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
+T_Principal = Annotated[Principal, Depends(get_current_principal)]
 
 
 # * autenticar um usuario
 # * retornar um token JWT
 @router.post('/token', response_model=Token, status_code=HTTPStatus.OK)
-def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
-    user = session.scalar(select(User).where(User.username == form_data.username))
-    if not user or not verify_password(form_data.password, user.password):
+async def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
+    user = await session.scalar(select(User).where(User.username == form_data.username))
+    # end the read transaction so the pooled connection is not held during Argon2
+    await session.commit()
+    valid, updated_hash = False, None
+    if user:
+        valid, updated_hash = await password_hasher.verify_and_update(
+            form_data.password, user.password
+        )
+    if not valid:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED, detail='Incorrect username or password.'
         )
 
-    access_token = create_access_token(data={'sub': user.username})
+    if updated_hash:
+        # hash made with outdated Argon2 parameters: upgrade it transparently
+        user.password = updated_hash
+        await session.commit()
+        forget_principal(user.id, user.username)
+
+    access_token = create_access_token(data=token_claims(user))
     if not access_token:
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail='Could not create access token.'
@@ -44,14 +61,25 @@ def login_for_access_token(session: T_Session, form_data: T_OAuth2Form):
     return {'access_token': access_token, 'token_type': 'bearer'}
 
 
+# the claims of the current token are reissued, no users query
 @router.post('/refresh_token', response_model=Token, status_code=HTTPStatus.OK)
-def refresh_token(
-    user: User = Depends(get_current_user),
-):
-    access_token = create_access_token(data={'sub': user.username})
+async def refresh_token(principal: T_Principal):
+    access_token = create_access_token(data=token_claims(principal))
     if not access_token:
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail='Could not create access token.'
         )
 
     return {'access_token': access_token, 'token_type': 'bearer'}
+
+
+# * revogar todos os tokens do usuario
+@router.post('/revoke', response_model=Message, status_code=HTTPStatus.OK)
+async def revoke_tokens(session: T_Session, principal: T_Principal):
+    await session.execute(
+        update(User).where(User.id == principal.id).values(token_version=User.token_version + 1)
+    )
+    await session.commit()
+    # other workers notice within PRINCIPAL_CACHE_TTL_SECONDS
+    forget_principal(principal.id, principal.username)
+    return {'message': 'Tokens revoked'}
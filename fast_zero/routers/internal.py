@@ -0,0 +1,55 @@
+# fast_zero\routers\internal.py
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends
+
+from fast_zero.database import engine, pool_status
+from fast_zero.querylog import query_log
+from fast_zero.replicas import replica_set
+from fast_zero.response_cache import user_responses
+from fast_zero.security import (
+    password_hasher,
+    principal_cache,
+    token_cache,
+    token_versions,
+    verify_ops_token,
+)
+
+# Operational endpoints, hidden from the OpenAPI schema and only served with
+# the OPS_TOKEN bearer token (404 while it is not set).
+router = APIRouter(
+    prefix='/internal',
+    tags=['internal'],
+    include_in_schema=False,
+    dependencies=[Depends(verify_ops_token)],
+)
+
+
+@router.get('/caches', status_code=HTTPStatus.OK)
+async def cache_stats():
+    return {
+        'principal': principal_cache.stats(),
+        'tokens': token_cache.stats(),
+        'token_versions': token_versions.stats(),
+        'user_responses': user_responses.stats(),
+    }
+
+
+@router.get('/password-hasher', status_code=HTTPStatus.OK)
+async def password_hasher_stats():
+    return password_hasher.stats()
+
+
+@router.get('/pool', status_code=HTTPStatus.OK)
+async def pool_stats():
+    return pool_status(engine)
+
+
+@router.get('/replicas', status_code=HTTPStatus.OK)
+async def replica_stats():
+    return replica_set.stats()
+
+
+@router.get('/queries', status_code=HTTPStatus.OK)
+async def query_stats(limit: int = 20):
+    return {'queries': query_log.top(limit)}
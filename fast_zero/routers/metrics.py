@@ -0,0 +1,46 @@
+# fast_zero\routers\metrics.py
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from fast_zero import metrics
+from fast_zero.database import engine, pool_status
+from fast_zero.replicas import replica_set
+from fast_zero.response_cache import user_responses
+from fast_zero.security import (
+    password_hasher,
+    principal_cache,
+    token_cache,
+    token_versions,
+    verify_ops_token,
+)
+
+# Prometheus scrape target, behind the OPS_TOKEN bearer token like /internal.
+# Metrics live in each worker process, so with several workers every scrape
+# sees the worker that answered it.
+router = APIRouter(
+    tags=['metrics'], include_in_schema=False, dependencies=[Depends(verify_ops_token)]
+)
+
+
+@router.get('/metrics', status_code=HTTPStatus.OK, response_class=PlainTextResponse)
+async def prometheus_metrics():
+    lines = [
+        *metrics.request_latency.expose(),
+        *metrics.auth_latency.expose(),
+        *metrics.hash_latency.expose(),
+        *metrics.db_queries.expose(),
+        *metrics.gauges('principal_cache', 'Principal cache statistics.', principal_cache.stats()),
+        *metrics.gauges('token_cache', 'Verified token cache.', token_cache.stats()),
+        *metrics.gauges('token_versions', 'Token version cache.', token_versions.stats()),
+        *metrics.gauges(
+            'response_cache', 'User response cache statistics.', user_responses.stats()
+        ),
+        *metrics.gauges('db_pool', 'Connection pool statistics.', pool_status(engine)),
+        *metrics.gauges('db_replicas', 'Read replica routing.', replica_set.stats()),
+        *metrics.gauges('password_hasher', 'Password hasher pool.', password_hasher.stats()),
+    ]
+    return PlainTextResponse(
+        '\n'.join(lines) + '\n', media_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,15 +1,39 @@
 # fast_zero\routers\todo.py
+import csv
+import io
+from collections import Counter
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from fast_zero.bulk import ImportErrors, bulk_insert, chunked, validate_rows
+from fast_zero.counters import adjust_counters, list_version, state_changes, todo_stats
 from fast_zero.database import get_session
-from fast_zero.models import Todo, TodoState, User
-from fast_zero.schemas import TodoList, TodoPublic, TodoSchema, TodoUpdate
-from fast_zero.security import get_current_user
+from fast_zero.etag import etag_matches, make_etag, not_modified
+from fast_zero.models import Todo, TodoState
+from fast_zero.pagination import decode_cursor, paginate
+from fast_zero.replicas import LazySession
+from fast_zero.schemas import (
+    TodoBatchDeleteResult,
+    TodoBatchResult,
+    TodoBatchUpdate,
+    TodoImportResult,
+    TodoList,
+    TodoPublic,
+    TodoSchema,
+    TodoStats,
+    TodoUpdate,
+)
+from fast_zero.search import dialect_name, search_todos
+from fast_zero.security import Principal, get_current_principal, get_read_session
+from fast_zero.serialization import fast_json_response, row_serializer
+from fast_zero.settings import Settings
+from fast_zero.shards import UserMoving, sharded, todo_ids, user_session
 
 router = APIRouter(
     prefix='/todos',
@@ -17,80 +41,397 @@ router = APIRouter(
     responses={404: {'description': 'Not found'}},
 )
 
-T_Session = Annotated[Session, Depends(get_session)]
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+# read-only handlers: a replica when DATABASE_REPLICA_URLS is set
+T_ReadSession = Annotated[LazySession, Depends(get_read_session)]
+# only the id is used here: the principal comes from the token claims
+T_CurrentUser = Annotated[Principal, Depends(get_current_principal)]
+
+
+# * sessão do shard do usuario (fast_zero.shards)
+async def get_todo_session(user: T_CurrentUser, session: T_Session):
+    """Session on the database that holds the user's todos, see TODO_SHARD_URLS."""
+    try:
+        async with user_session(session, user.id) as todo_session:
+            yield todo_session
+    except UserMoving:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail='Todos are being moved to another database, try again shortly.',
+            headers={'Retry-After': '1'},
+        )
+
+
+async def get_todo_read_session(user: T_CurrentUser, session: T_Session, read: T_ReadSession):
+    # sharded todos are read from the user's shard, otherwise from a replica,
+    # checked out only when todos are not sharded
+    async with user_session(session, user.id, write=False, unsharded=read.get) as todo_session:
+        yield todo_session
+
+
+T_TodoSession = Annotated[AsyncSession, Depends(get_todo_session)]
+T_TodoReadSession = Annotated[AsyncSession, Depends(get_todo_read_session)]
+T_BatchItems = Annotated[list[dict[str, Any]], Body()]
+T_BatchIds = Annotated[list[int], Body()]
+FileFormat = Literal['ndjson', 'csv']
+
+settings = Settings()
+NOT_FOUND_DETAIL = 'Todo not found or not owned by user'
+serialize_todo = row_serializer(TodoPublic)
+EXPORT_COLUMNS = ('id', 'title', 'description', 'state', 'created_at', 'updated_at')
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+IMPORT_COLUMNS = ['title', 'description', 'state', 'user_id']
+
+
+def filter_todos(query, title: str | None, description: str | None, state: TodoState | None):
+    if title:
+        query = query.filter(Todo.title.ilike(f'%{title}%'))
+    if description:
+        query = query.filter(Todo.description.ilike(f'%{description}%'))
+    if state:
+        query = query.filter(Todo.state == state)
+    return query
 
 
 @router.post('/', response_model=TodoPublic, status_code=HTTPStatus.CREATED)
-def create_todo(todo: TodoSchema, session: T_Session, user: T_CurrentUser):
+async def create_todo(todo: TodoSchema, session: T_TodoSession, user: T_CurrentUser):
     db_todo = Todo(
         title=todo.title,
         description=todo.description,
         state=todo.state,
         user_id=user.id,
     )
+    if ids := await todo_ids(1):
+        db_todo.id = ids[0]  # sharded: unique across the shards
     session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    await adjust_counters(session, user.id, Counter([todo.state]))
+    await session.commit()
+    await session.refresh(db_todo)
 
     return db_todo
 
 
+def check_batch_size(items: list):
+    if len(items) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            detail=f'Batch size limit is {settings.BATCH_MAX_SIZE} items.',
+        )
+
+
+def validate_batch(items: list[dict[str, Any]], schema: type[BaseModel]):
+    """Validate every item on its own, so one bad item does not fail the batch."""
+    check_batch_size(items)
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            model = schema.model_validate(item)
+        except ValidationError as exc:
+            detail = '; '.join(
+                f'{".".join(map(str, error["loc"])) or "item"}: {error["msg"]}'
+                for error in exc.errors()
+            )
+            errors.append({'index': index, 'detail': detail})
+            continue
+        # the update schemas are Optional to allow partial updates, but an
+        # explicit null would hit the NOT NULL columns and fail the whole batch
+        nulls = [
+            field for field, value in model.model_dump(exclude_unset=True).items() if value is None
+        ]
+        if nulls:
+            detail = '; '.join(f'{field}: Input should not be null' for field in nulls)
+            errors.append({'index': index, 'detail': detail})
+        else:
+            valid.append((index, model))
+    return valid, errors
+
+
+# Batch endpoints run as one transaction and report errors per item, so they
+# answer 200 even when some items failed. They must be declared before the
+# /{todo_id} routes.
+@router.post('/batch', response_model=TodoBatchResult)
+async def create_todos_batch(items: T_BatchItems, session: T_TodoSession, user: T_CurrentUser):
+    valid, errors = validate_batch(items, TodoSchema)
+
+    todos = []
+    if valid:
+        rows = [todo.model_dump() | {'user_id': user.id} for _, todo in valid]
+        if ids := await todo_ids(len(rows)):
+            rows = [row | {'id': todo_id} for row, todo_id in zip(rows, ids)]
+        # one multi-row INSERT ... RETURNING per batch of rows
+        todos = (await session.scalars(insert(Todo).returning(Todo), rows)).all()
+        await adjust_counters(session, user.id, Counter(todo.state for _, todo in valid))
+        await session.commit()
+
+    return {'todos': sorted(todos, key=lambda todo: todo.id), 'errors': errors}
+
+
+@router.patch('/batch', response_model=TodoBatchResult)
+async def update_todos_batch(items: T_BatchItems, session: T_TodoSession, user: T_CurrentUser):
+    valid, errors = validate_batch(items, TodoBatchUpdate)
+
+    changes = {}
+    for index, todo in valid:
+        if todo.id in changes:
+            errors.append({'index': index, 'detail': 'Duplicate todo id in batch.'})
+        else:
+            changes[todo.id] = (index, todo.model_dump(exclude_unset=True, exclude={'id'}))
+
+    # locked until the commit, so the old states the counters move from stay valid
+    owned = dict(
+        (
+            await session.execute(
+                select(Todo.id, Todo.state)
+                .where(Todo.id.in_(changes), Todo.user_id == user.id)
+                .order_by(Todo.id)
+                .with_for_update()
+            )
+        ).all()
+    )
+    errors.extend(
+        {'index': index, 'detail': NOT_FOUND_DETAIL}
+        for todo_id, (index, _) in changes.items()
+        if todo_id not in owned
+    )
+
+    rows = [{'id': todo_id} | values for todo_id, (_, values) in changes.items() if values]
+    rows = [row for row in rows if row['id'] in owned]
+    if rows:
+        # ORM bulk UPDATE by primary key: executemany, grouped by changed columns
+        await session.execute(update(Todo), rows)
+        deltas = state_changes((owned[row['id']], row['state']) for row in rows if 'state' in row)
+        await adjust_counters(session, user.id, deltas)
+        await session.commit()
+
+    todos = (
+        await session.scalars(
+            select(Todo)
+            .where(Todo.id.in_(list(owned)))
+            .order_by(Todo.id)
+            .execution_options(populate_existing=True)
+        )
+    ).all()
+    return {'todos': todos, 'errors': sorted(errors, key=lambda error: error['index'])}
+
+
+@router.delete('/batch', response_model=TodoBatchDeleteResult)
+async def delete_todos_batch(ids: T_BatchIds, session: T_TodoSession, user: T_CurrentUser):
+    check_batch_size(ids)
+
+    deleted = dict(
+        (
+            await session.execute(
+                delete(Todo)
+                .where(Todo.id.in_(ids), Todo.user_id == user.id)
+                .returning(Todo.id, Todo.state)
+            )
+        ).all()
+    )
+    if deleted:
+        removed = Counter()
+        removed.subtract(deleted.values())
+        await adjust_counters(session, user.id, removed)
+        await session.commit()
+
+    errors = [
+        {'index': index, 'detail': NOT_FOUND_DETAIL}
+        for index, todo_id in enumerate(ids)
+        if todo_id not in deleted
+    ]
+    return {'deleted': sorted(deleted), 'errors': errors}
+
+
+def serialize_rows(rows, export_format: FileFormat) -> str:
+    if export_format == 'ndjson':
+        return ''.join(
+            TodoPublic.model_validate(row._mapping).model_dump_json() + '\n' for row in rows
+        )
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (
+            row.id,
+            row.title,
+            row.description,
+            row.state.value,
+            row.created_at.isoformat(),
+            row.updated_at.isoformat(),
+        )
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def stream_todos(engine, query, export_format: FileFormat):
+    if export_format == 'csv':
+        yield ','.join(EXPORT_COLUMNS) + '\r\n'
+    # plain rows instead of ORM objects, so no identity map grows with the export;
+    # stream() + yield_per uses a server-side cursor and holds one chunk at a time
+    async with engine.connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE))
+        async for rows in result.partitions():
+            yield serialize_rows(rows, export_format)
+
+
+@router.get('/export')
+async def export_todos(  # noqa: PLR0913, PLR0917
+    session: T_TodoReadSession,
+    user: T_CurrentUser,
+    format: FileFormat = 'ndjson',
+    title: str | None = None,
+    description: str | None = None,
+    state: TodoState | None = None,
+):
+    query = select(*(getattr(Todo, column) for column in EXPORT_COLUMNS)).where(
+        Todo.user_id == user.id
+    )
+    query = filter_todos(query, title, description, state).order_by(Todo.id)
+
+    # the request session is closed before the body streams, so the
+    # export checks out its own connection from the same engine
+    return StreamingResponse(
+        stream_todos(session.bind, query, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={'Content-Disposition': f'attachment; filename="todos.{format}"'},
+    )
+
+
+async def owned_rows(rows, user_id: int, states: Counter):
+    async for row in rows:
+        states[row['state']] += 1
+        yield {**row, 'user_id': user_id}
+
+
+async def numbered(chunks):
+    # sharded imports take their ids from DATABASE_URL, one block per chunk
+    async for chunk in chunks:
+        ids = await todo_ids(len(chunk))
+        yield [row | {'id': todo_id} for row, todo_id in zip(chunk, ids)]
+
+
+@router.post('/import', response_model=TodoImportResult)
+async def import_todos(
+    request: Request, session: T_TodoSession, user: T_CurrentUser, format: FileFormat = 'ndjson'
+):
+    # the body is parsed and validated while it uploads, COPY (Postgres) or
+    # chunked executemany writes it in a single transaction
+    errors = ImportErrors(max_items=settings.IMPORT_MAX_ERRORS)
+    states = Counter()
+    rows = validate_rows(
+        request.stream(), format, TodoSchema, errors, settings.IMPORT_MAX_LINE_BYTES
+    )
+    rows = owned_rows(rows, user.id, states)
+    chunks, columns = chunked(rows, settings.IMPORT_CHUNK_SIZE), IMPORT_COLUMNS
+    if sharded():
+        chunks, columns = numbered(chunks), ['id', *IMPORT_COLUMNS]
+    imported = await bulk_insert(session, Todo.__table__, columns, chunks)
+    await adjust_counters(session, user.id, states)
+    await session.commit()
+    return {'imported': imported, 'failed': errors.count, 'errors': errors.items}
+
+
+async def todos_etag(session: AsyncSession, user_id: int, *params) -> str:
+    # every todo write of the user moves the list version on (fast_zero.counters),
+    # so it stands for any filter or page of the user's todos without reading them
+    return make_etag('todos', user_id, await list_version(session, user_id), *params)
+
+
 @router.get('/', response_model=TodoList)
-def list_todos(  # noqa
-    session: T_Session,
+async def list_todos(  # noqa
+    session: T_TodoReadSession,
     user: T_CurrentUser,
+    response: Response,
     title: str | None = None,
     description: str | None = None,
     state: TodoState | None = None,
     limit: int = 10,
     offset: int = 0,
+    cursor: str | None = None,  # keyset pagination, takes precedence over offset
+    q: str | None = None,  # full-text search over title and description
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    query = filter_todos(select(Todo).where(Todo.user_id == user.id), title, description, state)
+    after_id = decode_cursor(cursor) if cursor else None
 
-    if title:
-        query = query.filter(Todo.title.ilike(f'%{title}%'))
-    if description:
-        query = query.filter(Todo.description.ilike(f'%{description}%'))
-    if state:
-        query = query.filter(Todo.state == state)
+    search = bool(q and q.strip())
+    if search:
+        if cursor:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='Cursor pagination is not available for search results.',
+            )
+        query = search_todos(query, q, dialect_name(session))
+
+    etag = await todos_etag(session, user.id, title, description, state, limit, offset, cursor, q)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    if not search:
+        query = query.order_by(Todo.id)
+    if after_id is not None:
+        query = query.where(Todo.id > after_id)
+    else:
+        query = query.offset(offset)
 
-    todos = session.scalars(query.offset(offset).limit(limit)).all()
-    return {'todos': todos}
+    # one extra row tells whether there is a next page
+    todos = (await session.scalars(query.limit(limit + 1))).all()
+    todos, next_cursor = paginate(todos, limit)
+    if search:
+        # relevance order has no keyset, search results page with offset
+        next_cursor = None
+    if settings.FAST_JSON:
+        todos = [serialize_todo(todo) for todo in todos]
+        return fast_json_response(
+            {'todos': todos, 'next_cursor': next_cursor}, headers={'ETag': etag}
+        )
+    response.headers['ETag'] = etag
+    return {'todos': todos, 'next_cursor': next_cursor}
+
+
+# counts per state from the todo_counters rows, no scan of the todos
+@router.get('/stats', response_model=TodoStats)
+async def read_todo_stats(session: T_TodoReadSession, user: T_CurrentUser):
+    return await todo_stats(session, user.id)
 
 
 @router.delete('/{todo_id}', status_code=HTTPStatus.NO_CONTENT)
-def delete_todo(todo_id: int, session: T_Session, user: T_CurrentUser):
-    todo = session.scalar(select(Todo).where(Todo.id == todo_id, Todo.user_id == user.id))
+async def delete_todo(todo_id: int, session: T_TodoSession, user: T_CurrentUser):
+    todo = await session.scalar(
+        select(Todo).where(Todo.id == todo_id, Todo.user_id == user.id).with_for_update()
+    )
     if not todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
-            detail='Todo not found or not owned by user',
+            detail=NOT_FOUND_DETAIL,
         )
 
-    session.delete(todo)
-    session.commit()
+    await session.delete(todo)
+    await adjust_counters(session, user.id, Counter({todo.state: -1}))
+    await session.commit()
     return {'message': 'Todo deleted successfully'}
 
 
 @router.patch('/{todo_id}', response_model=TodoPublic)
-def update_todo(
+async def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
-    session: T_Session,
+    session: T_TodoSession,
     user: T_CurrentUser,
 ):
-    todo = session.scalar(select(Todo).where(Todo.id == todo_id, Todo.user_id == user.id))
+    todo = await session.scalar(
+        select(Todo).where(Todo.id == todo_id, Todo.user_id == user.id).with_for_update()
+    )
     if not todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
-            detail='Todo not found or not owned by user',
+            detail=NOT_FOUND_DETAIL,
         )
 
+    old_state = todo.state
     for key, value in todo_update.model_dump(exclude_unset=True).items():
         setattr(todo, key, value)
 
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await adjust_counters(session, user.id, state_changes([(old_state, todo.state)]))
+    await session.commit()
+    await session.refresh(todo)
     return todo
@@ -2,32 +2,46 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import get_session
+from fast_zero.etag import etag_matches, make_etag, not_modified
 from fast_zero.models import User
+from fast_zero.pagination import decode_cursor, paginate
+from fast_zero.replicas import LazySession
+from fast_zero.response_cache import user_responses
 from fast_zero.schemas import UserList, UserPublic, UserSchema
 from fast_zero.security import (
+    forget_principal,
     get_current_user,
-    get_password_hash,
+    get_read_session,
+    password_hasher,
 )
+from fast_zero.serialization import dumps, row_serializer
+from fast_zero.shards import drop_user
 
 router = APIRouter(
     prefix='/users',
     tags=['users'],
     responses={404: {'description': 'Not found'}},
 )
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+# checked out on first use, cache hits never touch a replica
+T_ReadSession = Annotated[LazySession, Depends(get_read_session)]
 T_CurrentUser = Annotated[User, Depends(get_current_user)]
 
+T_IfNoneMatch = Annotated[str | None, Header()]
+
+serialize_user = row_serializer(UserPublic)
+
 
 # * criar um usuario
 # * com validação de username e email únicos
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
-def create_user(user: UserSchema, session: T_Session):
-    db_user = session.scalar(
+async def create_user(user: UserSchema, session: T_Session):
+    db_user = await session.scalar(
         select(User).where((User.username == user.username) | (User.email == user.email))
     )
     if db_user:
@@ -42,45 +56,88 @@ def create_user(user: UserSchema, session: T_Session):
                 detail='Email already exists.',
             )
 
-    db_user = User(
-        username=user.username, password=get_password_hash(user.password), email=user.email
-    )
+    # end the read transaction so the pooled connection is not held during Argon2
+    await session.commit()
+    hashed_password = await password_hasher.hash(user.password)
+    db_user = User(username=user.username, password=hashed_password, email=user.email)
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)  # Refresh to get the updated user with ID
+    await session.commit()
+    await session.refresh(db_user)  # Refresh to get the updated user with ID
+    await user_responses.invalidate()
 
     return db_user
 
 
 # * retornar uma lista de usuarios
 # * com paginação
+# as leituras públicas passam pelo cache de respostas (fast_zero.response_cache),
+# invalidado por create_user, update_user e delete_user
 @router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
-def read_users(
-    session: T_Session,
+async def read_users(  # noqa: PLR0913, PLR0917
+    request: Request,
+    session: T_ReadSession,
+    primary: T_Session,
     limit: int = 10,  # limite de usuarios por pagina
     skip: int = 0,  # começar a partir do offset
+    cursor: str | None = None,  # paginação por cursor (keyset), ignora o skip
+    if_none_match: T_IfNoneMatch = None,
 ):
-    user = session.scalars(select(User).offset(skip).limit(limit)).all()
+    generation, cached = await user_responses.lookup(request)
+    if cached:
+        return cached.to_response(if_none_match)
+
+    query = select(User).order_by(User.id)
+    if cursor:
+        query = query.where(User.id > decode_cursor(cursor))
+    else:
+        query = query.offset(skip)
+
+    # right after a write a replica may not have it yet, the page would be cached stale
+    read = primary if user_responses.settling() else await session.get()
+    user, next_cursor = paginate((await read.scalars(query.limit(limit + 1))).all(), limit)
     if not user:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='Not Found.')
-    return {'users': user}
+
+    body = dumps({'users': [serialize_user(row) for row in user], 'next_cursor': next_cursor})
+    cached = await user_responses.store(generation, request, body, make_etag('users', body))
+    return cached.to_response(if_none_match)
 
 
 # * retornar um usuario pelo id
 @router.get('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
-def read_user(user_id: int, session: T_Session):
-    db_user = session.scalar(select(User).where(User.id == user_id))
+async def read_user(
+    request: Request,
+    user_id: int,
+    session: T_ReadSession,
+    primary: T_Session,
+    if_none_match: T_IfNoneMatch = None,
+):
+    generation, cached = await user_responses.lookup(request)
+    if cached:
+        return cached.to_response(if_none_match)
+
+    # the public columns only, no ORM object, the row is not even serialized on a 304
+    read = primary if user_responses.settling() else await session.get()
+    db_user = (
+        await read.execute(
+            select(User.id, User.username, User.email, User.updated_at).where(User.id == user_id)
+        )
+    ).first()
     if not db_user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail=f'User with ID {user_id} not found.'
         )
 
-    return db_user
+    etag = make_etag('user', db_user.id, db_user.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    cached = await user_responses.store(generation, request, dumps(serialize_user(db_user)), etag)
+    return cached.to_response()
 
 
 # * atualizar um usuario
 @router.put('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
-def update_user(
+async def update_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
@@ -93,20 +150,28 @@ def update_user(
             detail='You do not have permission to update this user.',
         )
 
+    # end the read transaction of the auth lookup before Argon2, like create_user
+    await session.commit()
+    hashed_password = await password_hasher.hash(user.password)
+    old_username = current_user.username
     current_user.username = user.username
-    current_user.password = get_password_hash(user.password)
+    current_user.password = hashed_password
     current_user.email = user.email
+    # new credentials: the tokens issued for the old ones stop working
+    current_user.token_version = User.token_version + 1
 
-    session.commit()
-    session.refresh(current_user)  # Refresh to get the updated user with ID
+    await session.commit()
+    forget_principal(user_id, old_username)  # tokens sem uid são indexados pelo username
+    await user_responses.invalidate()
+    await session.refresh(current_user)  # Refresh to get the updated user with ID
 
     return current_user
 
 
 # * deletar um usuario
 @router.delete('/{user_id}', status_code=HTTPStatus.OK)
-def delete_user(user_id: int, session: T_Session, current_user: T_CurrentUser):
-    db_user = session.scalar(select(User).where(User.id == user_id))
+async def delete_user(user_id: int, session: T_Session, current_user: T_CurrentUser):
+    db_user = await session.scalar(select(User).where(User.id == user_id))
     if not db_user:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail=f'User with ID {user_id} not found.'
@@ -116,7 +181,11 @@ def delete_user(user_id: int, session: T_Session, current_user: T_CurrentUser):
             status_code=HTTPStatus.FORBIDDEN,
             detail='You do not have permission to delete this user.',
         )
-    session.delete(db_user)
-    session.commit()
+    # todos on another database than the user (TODO_SHARD_URLS) go first
+    await drop_user(session, user_id)
+    await session.delete(db_user)
+    await session.commit()
+    forget_principal(user_id, db_user.username)
+    await user_responses.invalidate()
 
     return {'message': 'User deleted successfully'}
@@ -26,6 +26,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -49,9 +50,45 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+
+
+class TodoStats(BaseModel):
+    total: int
+    states: dict[TodoState, int]  # every state, zero included
 
 
 class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+
+
+class TodoBatchUpdate(TodoUpdate):
+    id: int
+
+
+class BatchItemError(BaseModel):
+    index: int  # position of the item in the request body
+    detail: str
+
+
+class TodoBatchResult(BaseModel):
+    todos: list[TodoPublic]
+    errors: list[BatchItemError]
+
+
+class TodoBatchDeleteResult(BaseModel):
+    deleted: list[int]
+    errors: list[BatchItemError]
+
+
+class ImportLineError(BaseModel):
+    line: int  # 1-based line of the uploaded file
+    detail: str
+
+
+class TodoImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportLineError]  # only the first IMPORT_MAX_ERRORS
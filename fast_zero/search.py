@@ -0,0 +1,45 @@
+# fast_zero\search.py
+from sqlalchemy import Select, column, func, literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import SEARCH_CONFIG, Todo, todo_search_document
+
+todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+
+def dialect_name(session: AsyncSession) -> str:
+    return session.bind.dialect.name
+
+
+def fts5_query(q: str) -> str:
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    terms = (term.replace('"', '""') for term in q.split())
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search_todos(query: Select, q: str, dialect: str) -> Select:
+    """
+    Restrict `query` (a select of Todo) to rows matching the search terms in
+    `q` and order it by relevance, best match first.
+    """
+    if dialect == 'postgresql':
+        document = todo_search_document()
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), q)
+        return query.where(document.op('@@')(tsquery)).order_by(
+            func.ts_rank(document, tsquery).desc(), Todo.id
+        )
+
+    if dialect == 'sqlite':
+        # bm25 rank: lower is more relevant
+        matches = (
+            select(todos_fts.c.rowid.label('id'), todos_fts.c.rank)
+            .where(text('todos_fts MATCH :fts_query').bindparams(fts_query=fts5_query(q)))
+            .subquery()
+        )
+        return query.join(matches, matches.c.id == Todo.id).order_by(matches.c.rank, Todo.id)
+
+    # no index available: plain substring search, in id order
+    pattern = f'%{q}%'
+    return query.where(Todo.title.ilike(pattern) | Todo.description.ilike(pattern)).order_by(
+        Todo.id
+    )
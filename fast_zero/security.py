@@ -1,23 +1,58 @@
 # fast_zero\security.py
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jwt import decode, encode
 from jwt.exceptions import ExpiredSignatureError, PyJWTError
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
 
+from fast_zero import replicas
+from fast_zero.cache import TTLCache
 from fast_zero.database import get_session
+from fast_zero.metrics import record_auth, record_hash
 from fast_zero.models import User
 from fast_zero.settings import Settings
 
-pwd_context = PasswordHash.recommended()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
 settings = Settings()
+pwd_context = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
+
+# user id (token uid claim), or username for tokens without one -> detached User,
+# see get_current_user
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+# sha256 of the token -> its verified claims, see decode_token
+token_cache = TTLCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+# user id (token uid claim) -> users.token_version, see get_current_principal
+token_versions = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
 
 def get_password_hash(password: str) -> str:
@@ -28,6 +63,93 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    # The new hash is only returned when the stored one uses outdated parameters
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasherPool:
+    """
+    Runs Argon2 hashing and verification on a dedicated, bounded executor so a
+    burst of logins cannot take over the event loop or Starlette's thread pool.
+    Once `queue_limit` operations are already waiting for a worker, new ones
+    are rejected right away with 503 instead of queueing behind them.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_limit: int):
+        self.kind = kind
+        # by default leave one CPU to the event loop
+        self.workers = workers or max(1, (os.cpu_count() or 1) - 1)
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'process':
+                # spawn: forking a process that runs an event loop is unsafe
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='argon2')
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Server busy, try again later.',
+                headers={'Retry-After': '1'},
+            )
+
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            # queue wait included, that is what the request pays for
+            record_hash(func.__name__, time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self.run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.kind,
+            'workers': self.workers,
+            'queue_limit': self.queue_limit,
+            'pending': self.pending,
+            'rejected': self.rejected,
+        }
+
+
+password_hasher = PasswordHasherPool(
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
+
+
 def create_access_token(data: dict) -> str:
     # Create a copy of the data to avoid modifying the original
     if not isinstance(data, dict):
@@ -49,28 +171,190 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session),
-):
-    credentials_exception = HTTPException(
+def token_claims(user: 'User | Principal') -> dict:
+    # uid and ver let get_current_principal skip the users lookup,
+    # sub stays for the routes that load the whole user
+    return {'sub': user.username, 'uid': user.id, 'ver': user.token_version}
+
+
+def credentials_error() -> HTTPException:
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def decode_token(token: str) -> dict:
+    # A token is reused for every request of its lifetime: verify the signature
+    # once and keep the claims until exp. The key is a digest, so the cache
+    # holds 32 bytes per token instead of the token. Callers must not mutate
+    # the returned claims, they are shared.
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
         payload = decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get('sub')
-        if not username:
-            raise credentials_exception
     except ExpiredSignatureError:
-        raise credentials_exception
+        raise credentials_error()
     except PyJWTError:
-        raise credentials_exception
+        raise credentials_error()
+    if not payload.get('sub'):
+        raise credentials_error()
+    expires_at = payload.get('exp')
+    token_cache.set(key, payload, ttl=expires_at - time.time() if expires_at else None)
+    return payload
+
+
+def forget_principal(user_id: int, username: str):
+    """Drop the cached principal of a user whose name, credentials or tokens changed."""
+    principal_cache.invalidate(user_id)
+    principal_cache.invalidate(username)
+    token_versions.invalidate(user_id)
+
+
+# * endpoints operacionais
+def verify_ops_token(request: Request):
+    """Guard of /metrics and /internal: 404 without OPS_TOKEN, 401 without a matching bearer."""
+    if not settings.OPS_TOKEN:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='Not Found')
+    scheme, token = get_authorization_scheme_param(request.headers.get('Authorization'))
+    if scheme.lower() != 'bearer' or not secrets.compare_digest(
+        token.encode(), settings.OPS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Invalid operations token',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+
+
+# * sessão de leitura (réplicas)
+async def get_read_session(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Lazy session for read-only handlers: a replica, or the primary `session`
+    while the caller is inside its read-your-writes window (see
+    fast_zero.replicas). Nothing is checked out until `get()` is awaited.
+    """
+    user_id = None
+    scheme, token = get_authorization_scheme_param(request.headers.get('Authorization'))
+    if replicas.replica_set.engines and scheme.lower() == 'bearer' and token:
+        try:
+            user_id = decode_token(token).get('uid')
+        except HTTPException:
+            pass  # the auth dependency of the route answers with 401
+    async with AsyncExitStack() as stack:
+        yield replicas.LazySession(stack, lambda: replicas.read_session(session, user_id))
+
+
+async def read_current(
+    query, reads: replicas.LazySession | None, session: AsyncSession, is_current
+):
+    """Run `query` on the read session, again on the primary if a lagging replica is behind."""
+    read = await reads.get() if reads is not None else session
+    result = await read.scalar(query)
+    if read is not session and not is_current(result):
+        result = await session.scalar(query)
+    return result
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_session),
+    reads: replicas.LazySession = Depends(get_read_session),
+):
+    started = time.perf_counter()
+    try:
+        return await resolve_user(decode_token(token), session, reads)
+    finally:
+        record_auth(time.perf_counter() - started)
+
+
+async def resolve_user(
+    payload: dict, session: AsyncSession, reads: replicas.LazySession | None = None
+) -> User:
+    version = payload.get('ver', 0)
+    # by id when the token has one: the username of a renamed account can be
+    # registered again by someone else, and its versions start over at 0
+    if 'uid' in payload:
+        key, query = payload['uid'], select(User).where(User.id == payload['uid'])
+    else:
+        key, query = payload['sub'], select(User).where(User.username == payload['sub'])
+    cached_user = principal_cache.get(key)
+    # a newer ver than the cached user's means the cached copy is stale
+    if cached_user is None or version > cached_user.token_version:
+        user = await read_current(
+            query,
+            reads,
+            session,
+            lambda user: user is not None and user.token_version >= version,
+        )
+        if not user:
+            raise credentials_error()
+        # the cached copy stays detached, so handlers never mutate it
+        object_session(user).expunge(user)
+        principal_cache.set(key, user)
+        cached_user = user
+    if 'ver' in payload and payload['ver'] != cached_user.token_version:
+        raise credentials_error()  # revoked
+
+    # commits of this session start the user's read-your-writes window
+    session.info['user_id'] = cached_user.id
+    # attach a copy to this request's session without going to the database
+    return await session.merge(cached_user, load=False)
+
+
+# * principal sem consulta a users
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated user as the token describes it, for routes that only need the id."""
+
+    id: int
+    username: str
+    token_version: int
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_session),
+    reads: replicas.LazySession = Depends(get_read_session),
+) -> Principal:
+    started = time.perf_counter()
+    try:
+        return await resolve_principal(decode_token(token), session, reads)
+    finally:
+        record_auth(time.perf_counter() - started)
+
+
+async def resolve_principal(
+    payload: dict, session: AsyncSession, reads: replicas.LazySession | None = None
+) -> Principal:
+    user_id, version = payload.get('uid'), payload.get('ver')
+    if user_id is None or version is None:
+        # token issued before the uid/ver claims
+        user = await resolve_user(payload, session, reads)
+        return Principal(id=user.id, username=user.username, token_version=user.token_version)
 
-    user = session.scalar(select(User).where(User.username == username))
-    if not user:
-        raise credentials_exception
+    session.info['user_id'] = user_id
+    current = token_versions.get(user_id)
+    # a newer version than the cached one: revoked and logged in again in
+    # another worker, the cache is what is stale
+    if current is None or version > current:
+        current = await read_current(
+            select(User.token_version).where(User.id == user_id),
+            reads,
+            session,
+            lambda current: current is not None and current >= version,
+        )
+        if current is None:
+            raise credentials_error()  # deleted
+        token_versions.set(user_id, current)
+    if version != current:
+        raise credentials_error()  # revoked
 
-    return user
+    return Principal(id=user_id, username=payload['sub'], token_version=version)
@@ -0,0 +1,62 @@
+# fast_zero\serialization.py
+import json
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import override
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:  # optional: pip install fast-zero[fast]
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+# * caminho rápido de JSON (FAST_JSON)
+# The list endpoints normally return ORM objects that FastAPI validates into
+# the response_model and then serializes. With FAST_JSON they build plain
+# dicts straight from the rows and encode them once, skipping the validation
+# of data that came from our own database.
+def json_default(value):
+    if isinstance(value, datetime) and value.utcoffset() == timedelta(0):
+        return value.isoformat().removesuffix('+00:00') + 'Z'  # like pydantic
+    if isinstance(value, datetime | date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        # UTC as 'Z', like pydantic
+        return orjson.dumps(payload, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        payload, default=json_default, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+def row_serializer(schema: type[BaseModel]):
+    """Row -> dict with the fields of `schema`, in its order, without validating them."""
+    fields = tuple(schema.model_fields)
+
+    def serialize(row) -> dict:
+        return {field: getattr(row, field) for field in fields}
+
+    return serialize
+
+
+def fast_json_response(payload, status_code: int = 200, headers: dict | None = None) -> Response:
+    return Response(
+        dumps(payload), status_code=status_code, headers=headers, media_type='application/json'
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class under FAST_JSON, orjson when it is installed."""
+
+    @override
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,132 @@
+# fast_zero\server.py
+import math
+import os
+from pathlib import Path
+from typing import override
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from fast_zero.settings import Settings
+
+CGROUP_V2_CPU_MAX = Path('/sys/fs/cgroup/cpu.max')
+CGROUP_V1_QUOTA = Path('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+CGROUP_V1_PERIOD = Path('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+
+
+# * dimensionamento pelos CPUs disponíveis
+def read_cpu_quota() -> tuple[str, str] | None:
+    """Raw (quota, period) of the cgroup, v2 first, then v1."""
+    try:
+        if CGROUP_V2_CPU_MAX.exists():
+            quota, period = CGROUP_V2_CPU_MAX.read_text(encoding='utf-8').split()
+            return quota, period
+        if CGROUP_V1_QUOTA.exists():
+            return (
+                CGROUP_V1_QUOTA.read_text(encoding='utf-8').strip(),
+                CGROUP_V1_PERIOD.read_text(encoding='utf-8').strip(),
+            )
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def cgroup_cpu_limit() -> float | None:
+    """CPU quota of the container (e.g. docker --cpus), None when unlimited."""
+    raw = read_cpu_quota()
+    # v2 writes 'max', v1 a negative quota, when there is no limit
+    if raw is None or raw[0] == 'max' or int(raw[0]) <= 0:
+        return None
+    return int(raw[0]) / int(raw[1])
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on: affinity mask capped by the cgroup quota."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def worker_count(settings: Settings) -> int:
+    # async workers, one event loop per core is enough to keep it busy
+    return settings.SERVER_WORKERS or available_cpus()
+
+
+# * servidor de produção (gunicorn + uvicorn workers)
+class ProductionWorker(UvicornWorker):
+    # fail at boot instead of silently falling back to asyncio/h11
+    CONFIG_KWARGS = {'loop': 'uvloop', 'http': 'httptools', 'lifespan': 'on'}
+
+
+def post_fork(server, worker):
+    # the app is preloaded in the master, never share its pooled connections
+    from fast_zero.database import engine  # noqa: PLC0415
+    from fast_zero.replicas import replica_set  # noqa: PLC0415
+    from fast_zero.shards import shard_router  # noqa: PLC0415
+
+    for pooled in (engine, *replica_set.engines, *shard_router.shard_engines):
+        pooled.sync_engine.dispose(close=False)
+
+
+class ProductionServer(BaseApplication):
+    """
+    Gunicorn master with uvicorn workers. The app is imported once before
+    forking (preload) and workers are recycled after SERVER_MAX_REQUESTS
+    requests (plus jitter, so they do not restart together).
+    """
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    @override
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    @override
+    def load(self):
+        from fast_zero.app import app  # noqa: PLC0415
+
+        return app
+
+
+def check_response_cache(settings: Settings, workers: int):
+    # invalidations of a memory cache never reach the other workers
+    if settings.RESPONSE_CACHE_BACKEND == 'memory' and workers > 1:
+        raise RuntimeError(
+            f'RESPONSE_CACHE_BACKEND=memory is per process, {workers} workers would serve '
+            'stale responses: use redis, or none.'
+        )
+
+
+def production_options(
+    settings: Settings, host: str, port: int, workers: int | None = None
+) -> dict:
+    workers = workers or worker_count(settings)
+    check_response_cache(settings, workers)
+    return {
+        'bind': f'{host}:{port}',
+        'workers': workers,
+        'worker_class': f'{__name__}.ProductionWorker',
+        'preload_app': True,
+        'max_requests': settings.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': settings.SERVER_MAX_REQUESTS_JITTER,
+        'graceful_timeout': settings.SERVER_GRACEFUL_TIMEOUT,
+        'keepalive': settings.SERVER_KEEPALIVE,
+        'post_fork': post_fork,
+        'accesslog': '-' if settings.SERVER_ACCESS_LOG else None,
+        'errorlog': '-',
+    }
+
+
+def run_production(host: str, port: int, workers: int | None = None):
+    ProductionServer(production_options(Settings(), host, port, workers)).run()
+
+
+def run_development(host: str, port: int):
+    import uvicorn  # noqa: PLC0415
+
+    uvicorn.run('fast_zero.app:app', host=host, port=port, reload=True, log_level='info')
@@ -1,4 +1,6 @@
 # fast_zero\settings.py
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,3 +21,87 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    # Read replicas for the read-only handlers, see fast_zero/replicas.py. A user that
+    # wrote reads from the primary for READ_YOUR_WRITES_SECONDS (tracked per worker), a
+    # replica that fails to connect is skipped for REPLICA_RETRY_SECONDS
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_SELECTION: Literal['round_robin', 'least_connections'] = 'round_robin'
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    REPLICA_RETRY_SECONDS: float = 30.0
+
+    # Todos (and their counters) sharded by user_id across these databases, see
+    # fast_zero/shards.py; empty keeps them on DATABASE_URL. DATABASE_URL keeps the users
+    # and the shard directory, list it here as well to use it as one of the shards
+    TODO_SHARD_URLS: list[str] = []
+    SHARD_ID_BLOCK_SIZE: int = 1_000  # todo ids reserved per round trip to DATABASE_URL
+
+    # Bearer token for /metrics and /internal/* (the Prometheus scrape config sends it as
+    # authorization credentials); empty disables those endpoints, they answer 404
+    OPS_TOKEN: str = ''
+
+    # Connection pool of the engine (ignored for in-memory SQLite), see /internal/pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10  # extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced, -1 never
+    DB_POOL_PRE_PING: bool = True  # test connections on checkout, drops dead ones
+    DB_POOL_USE_LIFO: bool = True  # reuse the hottest connections, idle ones can expire
+
+    # SQL logging: DB_ECHO logs every statement, the slow-query log only those over
+    # SLOW_QUERY_MS (0 disables it), sampled, optionally with their EXPLAIN plan
+    DB_ECHO: bool = False
+    SLOW_QUERY_MS: float = 500.0
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0
+    SLOW_QUERY_EXPLAIN: bool = False  # EXPLAIN ANALYZE runs slow SELECTs a second time
+    QUERY_STATS_MAX_FINGERPRINTS: int = 1000
+
+    # Cache of authenticated users resolved by get_current_user
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000  # 0 disables the cache
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    # Verified access tokens, each one kept until its exp claim
+    TOKEN_CACHE_MAX_SIZE: int = 10_000  # 0 disables the cache
+
+    # Cache of the public GET /users/ responses. 'memory' is per worker process (a write
+    # only invalidates the worker that handled it), so the production server refuses it
+    # with more than one worker; 'redis' is shared through REDIS_URL. Misses are read
+    # from the primary for READ_YOUR_WRITES_SECONDS after an invalidation
+    RESPONSE_CACHE_BACKEND: Literal['none', 'memory', 'redis'] = 'none'
+    RESPONSE_CACHE_TTL_SECONDS: float = 10.0
+    RESPONSE_CACHE_MAX_SIZE: int = 1_000
+    REDIS_URL: str = 'redis://localhost:6379/0'
+
+    # Largest number of items accepted by the /todos/batch endpoints
+    BATCH_MAX_SIZE: int = 5000
+
+    # Serialize list responses straight from the rows, with orjson when installed
+    # (pip install fast-zero[fast]), instead of validating them into the response model
+    FAST_JSON: bool = False
+
+    # Rows fetched per round trip while streaming /todos/export
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # /todos/import: rows written per COPY/executemany chunk, rejected lines reported,
+    # longest line (or CSV record) accepted, longer ones are rejected without buffering
+    IMPORT_CHUNK_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 100
+    IMPORT_MAX_LINE_BYTES: int = 1_048_576
+
+    # Production server (fast-zero serve), 0 workers means one per available CPU
+    SERVER_WORKERS: int = 0
+    SERVER_MAX_REQUESTS: int = 10_000  # recycle a worker after this many requests
+    SERVER_MAX_REQUESTS_JITTER: int = 1_000
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # seconds to finish in-flight requests
+    SERVER_KEEPALIVE: int = 5
+    SERVER_ACCESS_LOG: bool = True
+
+    # Argon2 cost parameters, tune them per host with `fast-zero calibrate-argon2`.
+    # Hashes made with other parameters are upgraded on the next login.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+
+    # Argon2 runs on a dedicated executor, see security.PasswordHasherPool
+    PASSWORD_HASH_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    PASSWORD_HASH_WORKERS: int = 0  # 0 uses all CPUs but one
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32  # waiting operations before answering 503
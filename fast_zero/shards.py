@@ -0,0 +1,438 @@
+# fast_zero\shards.py
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from fast_zero.bulk import bulk_insert
+from fast_zero.counters import INSERTS
+from fast_zero.database import create_engine, engine
+from fast_zero.models import IdSequence, Todo, TodoCounter, TodoListVersion, User, UserShard
+from fast_zero.settings import Settings
+
+settings = Settings()
+TODO_COLUMNS = [column.name for column in Todo.__table__.columns]
+COPY_CHUNK_SIZE = 1_000
+
+# Todos are only ever read and written for one user (Todo.user_id == user.id), so
+# they shard by user: the todos, todo_counters and todo_list_versions rows of a
+# user live on one of TODO_SHARD_URLS, users and the directory (user_shards,
+# id_sequences) on DATABASE_URL. A user's shard is the user_shards row, written on the user's
+# first todo write; users without one land on jump_hash(user_id, shards).
+#
+# Adding a shard, with the new URL in TODO_SHARD_URLS of the command only:
+#   fast-zero shards migrate     same Alembic migrations on every database
+#   fast-zero shards pin         user_shards rows for todos written while unsharded
+# then deploy the new TODO_SHARD_URLS and move the users jump_hash now sends to
+# the new shard, while the API keeps serving:
+#   fast-zero shards rebalance
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash (Lamping and Veach): growing from n to n + 1 buckets
+    only moves 1 / (n + 1) of the keys, all of them to the new bucket.
+    """
+    bucket, jump = -1, 0
+    key &= 0xFFFFFFFFFFFFFFFF
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * (1 << 31) / ((key >> 33) + 1))
+    return bucket
+
+
+class UserMoving(Exception):
+    """The user's todos are being copied to another shard, writes must wait."""
+
+
+@dataclass(frozen=True, slots=True)
+class Placement:
+    shard: int
+    moving: bool = False
+    pinned: bool = False  # has a user_shards row
+
+
+# * roteamento
+class ShardRouter:
+    """
+    The shard engines and the directory on DATABASE_URL (`directory`). A
+    shard whose engine is the directory itself shares the request's session.
+    """
+
+    def __init__(self, directory: AsyncEngine, engines: list[AsyncEngine], id_block_size=1_000):
+        self.directory = directory
+        self.engines = engines
+        self.id_block_size = id_block_size
+        self._next_id = self._end_id = 0
+
+    @classmethod
+    def from_settings(cls, settings: Settings, directory: AsyncEngine) -> 'ShardRouter':
+        engines = [
+            directory if url == settings.DATABASE_URL else create_engine(settings, url)
+            for url in settings.TODO_SHARD_URLS
+        ]
+        return cls(directory, engines, settings.SHARD_ID_BLOCK_SIZE)
+
+    @property
+    def shard_engines(self) -> list[AsyncEngine]:
+        # the engines this router opened, without the one of DATABASE_URL
+        return [shard for shard in self.engines if shard is not self.directory]
+
+    async def dispose(self):
+        for shard in self.shard_engines:
+            await shard.dispose()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def home(self, user_id: int) -> int:
+        return jump_hash(user_id, len(self.engines))
+
+    async def placement(
+        self, session: AsyncSession, user_id: int, *, lock: bool = False
+    ) -> Placement:
+        """
+        The user's shard. With `lock`, the row stays share-locked until the
+        transaction of `session` ends, so a move cannot flag the user meanwhile.
+        """
+        query = select(UserShard.shard, UserShard.moving).where(UserShard.user_id == user_id)
+        if lock:
+            query = query.with_for_update(read=True)
+        row = (await session.execute(query)).first()
+        if row is None:
+            return Placement(self.home(user_id))
+        return Placement(row.shard, row.moving, pinned=True)
+
+    @asynccontextmanager
+    async def session(self, shard: int, primary: AsyncSession | None = None):
+        """Session on `shard`, the request's `primary` session when the shard is DATABASE_URL."""
+        if primary is not None and self.engines[shard] is self.directory:
+            yield primary
+            return
+        async with AsyncSession(
+            self.engines[shard], expire_on_commit=False, info={'shard': shard}
+        ) as session:
+            yield session
+
+    async def pin(self, placements: dict[int, int], *, moving: bool = False, replace=True):
+        """Write {user_id: shard} to user_shards, committed right away."""
+        if not placements:
+            return
+        async with self.directory.begin() as conn:
+            upsert = INSERTS[conn.dialect.name](UserShard)
+            if replace:
+                upsert = upsert.on_conflict_do_update(
+                    index_elements=['user_id'],
+                    set_={'shard': upsert.excluded['shard'], 'moving': moving},
+                )
+            else:  # a concurrent writer or a move got there first
+                upsert = upsert.on_conflict_do_nothing()
+            await conn.execute(
+                upsert,
+                [
+                    {'user_id': user_id, 'shard': shard, 'moving': moving}
+                    for user_id, shard in sorted(placements.items())
+                ],
+            )
+
+    async def mark_moving(self, placements: dict[int, int]):
+        """
+        Flag {user_id: shard} as moving. FOR UPDATE waits for the writers that
+        hold the rows share-locked, i.e. that read the directory before the
+        flag and have not committed on their shard yet.
+        """
+        if not placements:
+            return
+        async with self.directory.begin() as conn:
+            await conn.execute(
+                select(UserShard.user_id)
+                .where(UserShard.user_id.in_(placements))
+                .order_by(UserShard.user_id)
+                .with_for_update()
+            )
+            upsert = INSERTS[conn.dialect.name](UserShard)
+            await conn.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=['user_id'],
+                    set_={'shard': upsert.excluded['shard'], 'moving': True},
+                ),
+                [
+                    {'user_id': user_id, 'shard': shard, 'moving': True}
+                    for user_id, shard in sorted(placements.items())
+                ],
+            )
+
+    async def ensure_owners(self, shard: int, user_ids):
+        # todos.user_id references users.id on every database: outside DATABASE_URL,
+        # which keeps the real user, a placeholder row stands for the owner
+        if self.engines[shard] is self.directory or not user_ids:
+            return
+        async with self.engines[shard].begin() as conn:
+            await conn.execute(
+                INSERTS[conn.dialect.name](User).on_conflict_do_nothing(),
+                [
+                    {
+                        'id': user_id,
+                        'username': f'shard-owner-{user_id}',
+                        'email': f'{user_id}@shard-owner.invalid',
+                        'password': '',
+                    }
+                    for user_id in sorted(user_ids)
+                ],
+            )
+
+    # * ids dos todos
+    async def allocate_ids(self, count: int) -> list[int]:
+        """`count` todo ids, taken from a block reserved on DATABASE_URL."""
+        ids = []
+        while len(ids) < count:
+            if self._next_id >= self._end_id:
+                size = max(self.id_block_size, count - len(ids))
+                start = await self.reserve_ids(size)
+                self._next_id, self._end_id = start, start + size
+            # no await from here on, concurrent requests never get the same ids
+            take = min(count - len(ids), self._end_id - self._next_id)
+            ids.extend(range(self._next_id, self._next_id + take))
+            self._next_id += take
+        return ids
+
+    async def reserve_ids(self, size: int, *, after: int = 0) -> int:
+        """Reserve `size` ids above `after`, returns the first one."""
+        bump = (
+            update(IdSequence)
+            .where(IdSequence.name == 'todos')
+            .values(
+                next_id=case((IdSequence.next_id > after, IdSequence.next_id), else_=after + 1)
+                + size
+            )
+            .returning(IdSequence.next_id)
+        )
+        async with self.directory.begin() as conn:
+            end = await conn.scalar(bump)
+            if end is None:
+                # first reservation: after the todos written before sharding
+                first = await conn.scalar(select(func.coalesce(func.max(Todo.id), 0) + 1))
+                await conn.execute(
+                    INSERTS[conn.dialect.name](IdSequence)
+                    .values(name='todos', next_id=first)
+                    .on_conflict_do_nothing()
+                )
+                end = await conn.scalar(bump)
+        return end - size
+
+    async def highest_todo_id(self) -> int:
+        highest = 0
+        for shard_engine in self.engines:
+            async with shard_engine.connect() as conn:
+                highest = max(highest, await conn.scalar(select(func.max(Todo.id))) or 0)
+        return highest
+
+
+shard_router = ShardRouter.from_settings(settings, engine)
+
+
+# * sessão do shard de um usuario
+@asynccontextmanager
+async def user_session(
+    primary: AsyncSession,
+    user_id: int,
+    *,
+    write: bool = True,
+    unsharded: Callable[[], Awaitable[AsyncSession]] | None = None,
+):
+    """
+    Session on the shard holding `user_id`'s todos; the one `unsharded()`
+    returns (default `primary`) when todos are not sharded. Raises UserMoving for a write
+    during a move.
+
+    A write keeps the user's directory row share-locked in `primary` until the
+    shard session is done, so `fast-zero shards rebalance` cannot copy the
+    todos while the write is still to commit on the old shard.
+    """
+    router = shard_router
+    if not router.enabled:
+        yield await unsharded() if unsharded else primary
+        return
+
+    placement = await router.placement(primary, user_id, lock=write)
+    if write and not placement.pinned:
+        # first write: record the shard, so a new TODO_SHARD_URLS does not move the user
+        await router.ensure_owners(placement.shard, [user_id])
+        await router.pin({user_id: placement.shard}, replace=False)
+        placement = await router.placement(primary, user_id, lock=True)
+    if write and placement.moving:
+        raise UserMoving(user_id)
+    async with router.session(placement.shard, primary) as session:
+        yield session
+    if write and session is not primary:
+        # the shard transaction is over: release the directory row
+        await primary.commit()
+
+
+def sharded() -> bool:
+    return shard_router.enabled
+
+
+async def todo_ids(count: int) -> list[int] | None:
+    """Ids for new todos when sharded, None to let the database number them."""
+    if not sharded() or not count:
+        return None
+    return await shard_router.allocate_ids(count)
+
+
+async def delete_user_rows(session: AsyncSession, user_id: int, *, owner: bool):
+    await session.execute(delete(Todo).where(Todo.user_id == user_id))
+    await session.execute(delete(TodoCounter).where(TodoCounter.user_id == user_id))
+    await session.execute(delete(TodoListVersion).where(TodoListVersion.user_id == user_id))
+    if owner:
+        await session.execute(delete(User).where(User.id == user_id))
+
+
+async def drop_user(primary: AsyncSession, user_id: int):
+    """Delete the todos of a user being deleted from a shard other than DATABASE_URL."""
+    router = shard_router
+    if not router.enabled:
+        return
+    placement = await router.placement(primary, user_id)
+    if router.engines[placement.shard] is router.directory:
+        return
+    async with router.session(placement.shard) as session:
+        await delete_user_rows(session, user_id, owner=True)
+        await session.commit()
+
+
+# * manutenção: pin, rebalanceamento, status
+async def pin_existing(router: ShardRouter) -> Counter:
+    """
+    Pin every user with todos but no user_shards row to the shard that holds
+    them, and move the id sequence past every todo id. Returns users per shard.
+    """
+    async with router.directory.connect() as conn:
+        pinned = set((await conn.scalars(select(UserShard.user_id))).all())
+    found = {}
+    for shard, shard_engine in enumerate(router.engines):
+        async with shard_engine.connect() as conn:
+            for user_id in await conn.scalars(select(Todo.user_id).distinct()):
+                if user_id not in pinned:
+                    found.setdefault(user_id, shard)
+
+    users = sorted(found)
+    for start in range(0, len(users), COPY_CHUNK_SIZE):
+        chunk = {user_id: found[user_id] for user_id in users[start : start + COPY_CHUNK_SIZE]}
+        for shard, owners in itertools.groupby(sorted(chunk, key=chunk.get), key=chunk.get):
+            await router.ensure_owners(shard, list(owners))
+        await router.pin(chunk, replace=False)
+    await router.reserve_ids(0, after=await router.highest_todo_id())
+    return Counter(found.values())
+
+
+async def copy_user(router: ShardRouter, user_id: int, source: int, target: int) -> int:
+    async with router.session(source) as src, router.session(target) as dst:
+        # rows left on the target by a move that failed halfway
+        await delete_user_rows(dst, user_id, owner=False)
+        counters = (
+            (await src.execute(select(TodoCounter.__table__).where(TodoCounter.user_id == user_id)))
+            .mappings()
+            .all()
+        )
+        # same version on the target: list ETags held by clients stay valid
+        version = (
+            (
+                await src.execute(
+                    select(TodoListVersion.__table__).where(TodoListVersion.user_id == user_id)
+                )
+            )
+            .mappings()
+            .all()
+        )
+        todos = await src.stream(
+            select(Todo.__table__)
+            .where(Todo.user_id == user_id)
+            .order_by(Todo.id)
+            .execution_options(yield_per=COPY_CHUNK_SIZE)
+        )
+        copied = await bulk_insert(
+            dst,
+            Todo.__table__,
+            TODO_COLUMNS,
+            (list(rows) async for rows in todos.mappings().partitions()),
+        )
+        if counters:
+            await dst.execute(TodoCounter.__table__.insert(), [dict(row) for row in counters])
+        if version:
+            await dst.execute(TodoListVersion.__table__.insert(), [dict(row) for row in version])
+        await dst.commit()
+    return copied
+
+
+async def move_users(router: ShardRouter, moves: dict[int, tuple[int, int]]):
+    """
+    Move {user_id: (source, target)}. The users are flagged as moving first,
+    which waits for their in-flight writes (see user_session); later writes
+    answer 503. Reads keep using the source until each user's row points at
+    the target.
+    """
+    await router.mark_moving({user_id: source for user_id, (source, _) in moves.items()})
+
+    copied = {}
+    for user_id, (source, target) in sorted(moves.items()):
+        if source != target:
+            await router.ensure_owners(target, [user_id])
+            copied[user_id] = await copy_user(router, user_id, source, target)
+        await router.pin({user_id: target})
+        if source != target:
+            async with router.session(source) as session:
+                owner = router.engines[source] is not router.directory
+                await delete_user_rows(session, user_id, owner=owner)
+                await session.commit()
+    return copied
+
+
+async def plan_rebalance(router: ShardRouter) -> dict[int, tuple[int, int]]:
+    """Users whose row is not their jump_hash shard, or left moving by a failed run."""
+    async with router.directory.connect() as conn:
+        rows = await conn.execute(
+            select(UserShard.user_id, UserShard.shard, UserShard.moving).order_by(UserShard.user_id)
+        )
+        return {
+            user_id: (shard, router.home(user_id))
+            for user_id, shard, moving in rows
+            if moving or shard != router.home(user_id)
+        }
+
+
+async def rebalance(
+    router: ShardRouter, *, batch_size: int = 100, limit: int | None = None
+) -> dict[int, int]:
+    """Move the users of plan_rebalance, `batch_size` at a time. Returns todos moved per user."""
+    plan = list((await plan_rebalance(router)).items())[:limit]
+    moved = {}
+    for start in range(0, len(plan), batch_size):
+        moved |= await move_users(router, dict(plan[start : start + batch_size]))
+    return moved
+
+
+async def shard_status(router: ShardRouter) -> list[dict]:
+    async with router.directory.connect() as conn:
+        rows = (await conn.execute(select(UserShard.user_id, UserShard.shard))).all()
+    pinned = Counter(shard for _, shard in rows)
+    misplaced = Counter(shard for user_id, shard in rows if shard != router.home(user_id))
+
+    status = []
+    for shard, shard_engine in enumerate(router.engines):
+        async with shard_engine.connect() as conn:
+            todos = await conn.scalar(select(func.count()).select_from(Todo))
+        status.append({
+            'shard': shard,
+            'url': shard_engine.url.render_as_string(hide_password=True),
+            'users': pinned[shard],
+            'todos': todos,
+            'to_move': misplaced[shard],
+        })
+    return status
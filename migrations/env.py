@@ -1,8 +1,10 @@
 # migrations\env.py
+import asyncio
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
 
@@ -12,7 +14,22 @@ from fast_zero.settings import Settings
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", Settings().DATABASE_URL)
+
+
+def database_url() -> str:
+    # every database (DATABASE_URL and each of TODO_SHARD_URLS) has the same schema:
+    # `fast-zero shards migrate` passes each URL in config.attributes, from the
+    # command line `alembic -x shard=N upgrade head` migrates the Nth shard
+    settings = Settings()
+    if "url" in config.attributes:
+        return config.attributes["url"]
+    shard = context.get_x_argument(as_dictionary=True).get("shard")
+    if shard is not None:
+        return settings.TODO_SHARD_URLS[int(shard)]
+    return settings.DATABASE_URL
+
+
+config.set_main_option("sqlalchemy.url", database_url())
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -31,6 +48,19 @@ target_metadata = table_registry.metadata
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate off the schema that only exists on some dialects."""
+    # the SQLite full-text index (todos_fts and its FTS5 shadow tables) is created
+    # by DDL events of the todos table, it has no model
+    if type_ == "table" and reflected and compare_to is None and name.startswith("todos_fts"):
+        return False
+    # Index(...).ddl_if(dialect=...), e.g. the Postgres GIN indexes of the search
+    ddl_if = getattr(object, "_ddl_if", None)
+    if type_ == "index" and not reflected and ddl_if is not None:
+        return ddl_if._should_execute(None, object, context.get_bind())
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -55,26 +85,38 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
-def run_migrations_online() -> None:
-    """Run migrations in 'online' mode.
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
 
-    In this scenario we need to create an Engine
+async def run_async_migrations() -> None:
+    """In this scenario we need to create an Engine
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
+    connectable = async_engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
 
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode."""
 
-        with context.begin_transaction():
-            context.run_migrations()
+    asyncio.run(run_async_migrations())
 
 
 if context.is_offline_mode():
@@ -0,0 +1,96 @@
+"""add todo search indexes
+
+Revision ID: 1b36d0408348
+Revises: 3ee3ebedfb17
+Create Date: 2026-10-18 10:12:31.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b36d0408348'
+down_revision: Union[str, Sequence[str], None] = '3ee3ebedfb17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        # CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_todos_search',
+                'todos',
+                [sa.text("to_tsvector('simple', title || ' ' || description)")],
+                postgresql_using='gin',
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.create_index(
+                'ix_todos_title_trgm',
+                'todos',
+                ['title'],
+                postgresql_using='gin',
+                postgresql_ops={'title': 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.create_index(
+                'ix_todos_description_trgm',
+                'todos',
+                ['description'],
+                postgresql_using='gin',
+                postgresql_ops={'description': 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+            "title, description, content='todos', content_rowid='id')"
+        )
+        op.execute(
+            'CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN '
+            'INSERT INTO todos_fts(rowid, title, description) '
+            'VALUES (new.id, new.title, new.description); END'
+        )
+        op.execute(
+            'CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN '
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        op.execute(
+            'CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE ON todos BEGIN '
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            'INSERT INTO todos_fts(rowid, title, description) '
+            'VALUES (new.id, new.title, new.description); END'
+        )
+        # index the rows that already exist
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name in ('ix_todos_description_trgm', 'ix_todos_title_trgm', 'ix_todos_search'):
+                op.drop_index(
+                    name, table_name='todos', postgresql_concurrently=True, if_exists=True
+                )
+
+    elif dialect == 'sqlite':
+        for trigger in ('todos_fts_au', 'todos_fts_ad', 'todos_fts_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS todos_fts')
@@ -0,0 +1,42 @@
+"""add todo shard directory
+
+Revision ID: 4c8e2f1b7a93
+Revises: 9d3b6e1a4f27
+Create Date: 2026-10-18 23:02:17.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e2f1b7a93'
+down_revision: Union[str, Sequence[str], None] = '9d3b6e1a4f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # created on every database, only read on DATABASE_URL; `fast-zero shards pin`
+    # fills user_shards and id_sequences before TODO_SHARD_URLS is turned on
+    op.create_table('user_shards',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('moving', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('id_sequences',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('next_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('id_sequences')
+    op.drop_table('user_shards')
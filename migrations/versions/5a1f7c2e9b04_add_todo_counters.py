@@ -0,0 +1,42 @@
+"""add todo counters
+
+Revision ID: 5a1f7c2e9b04
+Revises: cda3f914c95e
+Create Date: 2026-10-18 20:41:07.318554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1f7c2e9b04'
+down_revision: Union[str, Sequence[str], None] = 'cda3f914c95e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('todo_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    # the todostate type already exists, created with the todos table
+    sa.Column('state', postgresql.ENUM('draft', 'todo', 'doing', 'done', 'trash', name='todostate', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+    # backfill; todos written between this and the deploy of the new code are
+    # not counted, `fast-zero check-counters --repair` fixes them afterwards
+    op.execute(
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('todo_counters')
@@ -0,0 +1,51 @@
+"""add todo list versions
+
+Revision ID: 7e2a9c4d1f58
+Revises: 4c8e2f1b7a93
+Create Date: 2026-10-19 10:14:52.204731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2a9c4d1f58'
+down_revision: Union[str, Sequence[str], None] = '4c8e2f1b7a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # no backfill: a user without a row is at version 0, and the ETags issued
+    # before this revision were computed differently, so none of them matches
+    op.create_table('todo_list_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # only backed the max(updated_at) + count() the ETag no longer runs
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_todos_user_id_updated_at',
+            table_name='todos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_todos_user_id_updated_at',
+            'todos',
+            ['user_id', 'updated_at'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.drop_table('todo_list_versions')
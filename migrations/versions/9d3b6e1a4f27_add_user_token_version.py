@@ -0,0 +1,30 @@
+"""add user token version
+
+Revision ID: 9d3b6e1a4f27
+Revises: 5a1f7c2e9b04
+Create Date: 2026-10-18 21:26:44.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6e1a4f27'
+down_revision: Union[str, Sequence[str], None] = '5a1f7c2e9b04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a constant server default: no table rewrite on Postgres 11+
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,41 @@
+"""add todo updated_at index
+
+Revision ID: cda3f914c95e
+Revises: e37f46821ef3
+Create Date: 2026-10-18 19:32:51.895006
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cda3f914c95e'
+down_revision: Union[str, Sequence[str], None] = 'e37f46821ef3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # backs max(updated_at) + count() for the ETag of GET /todos/
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_todos_user_id_updated_at',
+            'todos',
+            ['user_id', 'updated_at'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_todos_user_id_updated_at',
+            table_name='todos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,55 @@
+"""add todo access path indexes
+
+Revision ID: e37f46821ef3
+Revises: 1b36d0408348
+Create Date: 2026-10-18 11:03:52.907114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e37f46821ef3'
+down_revision: Union[str, Sequence[str], None] = '1b36d0408348'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY (Postgres only) builds the indexes without blocking writes,
+    # but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_todos_user_id_id',
+            'todos',
+            ['user_id', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_todos_user_id_state_id',
+            'todos',
+            ['user_id', 'state', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_todos_user_id_state_id',
+            table_name='todos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_todos_user_id_id',
+            table_name='todos',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
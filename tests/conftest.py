@@ -2,15 +2,19 @@
 import factory
 import factory.fuzzy
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer
 
+from fast_zero import security
 from fast_zero.app import app
 from fast_zero.database import get_session
 from fast_zero.models import Todo, TodoState, User, table_registry
-from fast_zero.security import get_password_hash
+from fast_zero.querylog import query_log
+from fast_zero.replicas import recent_writers
+from fast_zero.response_cache import user_responses
+from fast_zero.security import get_password_hash, principal_cache, token_cache, token_versions
 
 
 # Fabrica de de usuários para testes
@@ -33,6 +37,29 @@ class TodoFactory(factory.Factory):
     user_id = factory.LazyAttribute(lambda _: UserFactory().id)  # Reference to the user ID
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # caches are module level, tables are recreated for every test
+    principal_cache.clear()
+    token_cache.clear()
+    token_versions.clear()
+    user_responses.clear()
+    recent_writers.clear()
+    yield
+    principal_cache.clear()
+    token_cache.clear()
+    token_versions.clear()
+    user_responses.clear()
+    recent_writers.clear()
+
+
+@pytest.fixture
+def ops_headers(monkeypatch):
+    # /metrics and /internal/* are only served with OPS_TOKEN set
+    monkeypatch.setattr(security.settings, 'OPS_TOKEN', 'ops-token')
+    return {'Authorization': 'Bearer ops-token'}
+
+
 # Arrange (Organizar)
 @pytest.fixture
 def client(session):
@@ -50,13 +77,14 @@ def client(session):
 def engine():
     with PostgresContainer('postgres:latest', driver='psycopg') as postgres:
         # Create a new SQLAlchemy engine using the database URL from the settings
-        _engine = create_engine(postgres.get_connection_url(), echo=True)
-        with _engine.begin():
-            yield _engine
+        _engine = create_async_engine(postgres.get_connection_url(), echo=True)
+        # time statements like the app's engine does (Server-Timing, /metrics)
+        query_log.install(_engine.sync_engine)
+        yield _engine
 
 
-@pytest.fixture
-def session(engine):
+@pytest_asyncio.fixture
+async def session(engine):
     # * Create an in-memory SQLite database for testing
     # engine = create_engine(
     #     'sqlite:///:memory:',
@@ -67,20 +95,22 @@ def session(engine):
     # )
     # Create tables
 
-    table_registry.metadata.create_all(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
 
     # Create a new session
     # gerenciamento de contexto para a sessão
     # o contexto é fechado automaticamente após o uso
-    with Session(engine) as session:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
     # Drop tables
-    table_registry.metadata.drop_all(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
 
 
-@pytest.fixture
-def user(session):
+@pytest_asyncio.fixture
+async def user(session):
     plain_password = '123456'
     pwd = get_password_hash(plain_password)
     # Create a test user
@@ -89,28 +119,29 @@ def user(session):
     )
 
     session.add(test_user)
-    session.commit()
-    session.refresh(test_user)  # Refresh to get the updated user with ID
+    await session.commit()
+    await session.refresh(test_user)  # Refresh to get the updated user with ID
 
     test_user.clean_password = plain_password  # monkey patching para evitar hash de senha em testes
     return test_user
 
 
-@pytest.fixture
-def other_user(session):
+@pytest_asyncio.fixture
+async def other_user(session):
     test_user = UserFactory()
 
     session.add(test_user)
-    session.commit()
-    session.refresh(test_user)
+    await session.commit()
+    await session.refresh(test_user)
 
     return test_user
 
 
-@pytest.fixture
-def limpar_banco(session):
-    table_registry.metadata.drop_all(bind=session.get_bind())
-    table_registry.metadata.create_all(bind=session.get_bind())
+@pytest_asyncio.fixture
+async def limpar_banco(session):
+    async with session.bind.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
+        await conn.run_sync(table_registry.metadata.create_all)
 
 
 @pytest.fixture
@@ -1,7 +1,14 @@
 # tests\test_auth.py
 from http import HTTPStatus
 
+import pytest
 from freezegun import freeze_time
+from jwt import decode
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from fast_zero.calibration import MIN_MEMORY_COST
+from fast_zero.security import pwd_context, settings, verify_password
 
 
 def test_get_token(client, user):
@@ -156,3 +163,32 @@ def test_token_expired_dont_refresh(client, user):
         # Assert
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+@pytest.mark.asyncio
+async def test_login_should_rehash_outdated_password(client, session, user):
+    outdated = PasswordHash((Argon2Hasher(time_cost=1, memory_cost=MIN_MEMORY_COST),))
+    user.password = outdated.hash(user.clean_password)
+    await session.commit()
+
+    response = client.post(
+        'auth/token',
+        data={'username': user.username, 'password': user.clean_password},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    await session.refresh(user)
+    assert user.password.startswith('$argon2id$')
+    assert not pwd_context.current_hasher.check_needs_rehash(user.password)
+    assert verify_password(user.clean_password, user.password)
+
+
+def test_refresh_token_should_keep_the_principal_claims(client, user, token):
+    response = client.post('/auth/refresh_token', headers={'Authorization': f'Bearer {token}'})
+
+    payload = decode(
+        response.json()['access_token'], settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+    assert payload['sub'] == user.username
+    assert payload['uid'] == user.id
+    assert payload['ver'] == user.token_version
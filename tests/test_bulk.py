@@ -0,0 +1,67 @@
+# tests\test_bulk.py
+import pytest
+
+from fast_zero.bulk import ImportErrors, chunked, iter_lines, validate_rows
+from fast_zero.schemas import TodoSchema
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_should_join_lines_split_across_chunks():
+    # 'é' is two bytes in UTF-8, cut between the chunks
+    encoded = 'café\nsecond line\nlast'.encode()
+    chunks = [encoded[:4], encoded[4:10], encoded[10:]]
+
+    assert await collect(iter_lines(stream(*chunks), 100)) == ['café', 'second line', 'last']
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_should_reject_invalid_utf8_and_long_lines():
+    chunks = [b'ok\nbad \xff\n', b'x' * 6, b'x' * 6, b'\nlast']
+
+    lines = await collect(iter_lines(stream(*chunks), 10))
+
+    assert lines[0] == 'ok'
+    assert str(lines[1]) == 'invalid UTF-8 at byte 5'
+    assert str(lines[2]) == 'line longer than 10 bytes'
+    assert lines[3] == 'last'
+
+
+@pytest.mark.asyncio
+async def test_validate_rows_should_continue_after_bad_lines():
+    body = b'{"title": "a", "description": "b", "state": "todo"}\n{oops\n{"title": "c"}\n'
+    errors = ImportErrors(max_items=10)
+
+    rows = await collect(validate_rows(stream(body), 'ndjson', TodoSchema, errors, 100))
+
+    assert [row['title'] for row in rows] == ['a']
+    assert [error['line'] for error in errors.items] == [2, 3]
+    assert 'description: Field required' in errors.items[1]['detail']
+
+
+@pytest.mark.asyncio
+async def test_chunked_should_yield_fixed_size_chunks():
+    async def numbers():
+        for i in range(5):
+            yield i
+
+    assert await collect(chunked(numbers(), 2)) == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.asyncio
+async def test_validate_rows_csv_should_reject_an_unclosed_quoted_field():
+    body = b'title,description,state\n"never closed,b,todo\nmore\nmore\n'
+    errors = ImportErrors(max_items=10)
+
+    rows = await collect(validate_rows(stream(body), 'csv', TodoSchema, errors, 30))
+
+    assert rows == []
+    assert errors.items == [{'line': 2, 'detail': 'record longer than 30 characters'}]
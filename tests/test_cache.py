@@ -0,0 +1,54 @@
+# tests\test_cache.py
+from freezegun import freeze_time
+
+from fast_zero.cache import TTLCache
+
+
+def test_cache_get_set_and_stats():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.stats() == {'size': 1, 'max_size': 2, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')  # 'b' is now the least recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3  # noqa: PLR2004
+
+
+def test_cache_entries_expire():
+    cache = TTLCache(max_size=10, ttl=30)
+    with freeze_time('2025-01-01 00:00:00') as frozen:
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=120)
+        frozen.tick(31)
+
+        assert cache.get('a') is None
+        assert cache.get('b') == 2  # noqa: PLR2004
+        assert len(cache) == 1
+
+
+def test_cache_with_max_size_zero_is_disabled():
+    cache = TTLCache(max_size=0, ttl=30)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_cache_invalidate():
+    cache = TTLCache(max_size=10, ttl=30)
+    cache.set('a', 1)
+    cache.invalidate('a')
+    cache.invalidate('missing')
+
+    assert cache.get('a') is None
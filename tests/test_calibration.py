@@ -0,0 +1,48 @@
+# tests\test_calibration.py
+from fast_zero import calibration
+from fast_zero.calibration import MIN_MEMORY_COST, calibrate, update_env_file
+from fast_zero.cli import main
+
+
+def fake_measure(time_cost, memory_cost, parallelism):
+    # 50 ms per pass over 64 MiB
+    return 0.05 * time_cost * memory_cost / 65536
+
+
+def test_calibrate_should_raise_time_cost_within_budget():
+    values, latency = calibrate(0.25, 65536, 4, measure=fake_measure)
+
+    assert values == {
+        'ARGON2_TIME_COST': 5,
+        'ARGON2_MEMORY_COST': 65536,
+        'ARGON2_PARALLELISM': 4,
+    }
+    assert latency <= 0.25  # noqa: PLR2004
+
+
+def test_calibrate_should_lower_memory_cost_when_one_pass_is_too_slow():
+    values, _ = calibrate(0.02, 65536, 4, measure=fake_measure)
+
+    assert values['ARGON2_MEMORY_COST'] == MIN_MEMORY_COST
+    assert values['ARGON2_TIME_COST'] == 1
+
+
+def test_update_env_file_should_replace_and_append(tmp_path):
+    env_file = tmp_path / '.env'
+    env_file.write_text('SECRET_KEY=abc\nARGON2_TIME_COST=3\n', encoding='utf-8')
+
+    update_env_file(env_file, {'ARGON2_TIME_COST': 4, 'ARGON2_MEMORY_COST': 32768})
+
+    assert env_file.read_text(encoding='utf-8') == (
+        'SECRET_KEY=abc\nARGON2_TIME_COST=4\nARGON2_MEMORY_COST=32768\n'
+    )
+
+
+def test_cli_calibrate_argon2_should_write_env(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(calibration, 'measure_hash', fake_measure)
+    env_file = tmp_path / '.env'
+
+    main(['calibrate-argon2', '--target-ms', '100', '--write-env', '--env-file', str(env_file)])
+
+    assert 'ARGON2_TIME_COST=2' in capsys.readouterr().out
+    assert 'ARGON2_TIME_COST=2' in env_file.read_text(encoding='utf-8')
@@ -0,0 +1,56 @@
+# tests\test_counters.py
+from collections import Counter
+
+import pytest
+
+from fast_zero import cli
+from fast_zero.counters import adjust_counters, counter_drift, repair_counters, todo_stats
+from fast_zero.models import TodoState
+from tests.conftest import TodoFactory
+
+
+@pytest.mark.asyncio
+async def test_adjust_counters_should_add_to_the_stored_counts(session, user, other_user):
+    await adjust_counters(session, user.id, Counter({TodoState.todo: 2, TodoState.done: 1}))
+    await adjust_counters(session, user.id, Counter({TodoState.todo: -1, TodoState.draft: 0}))
+    await adjust_counters(session, other_user.id, Counter({TodoState.todo: 5}))
+    await session.commit()
+
+    stats = await todo_stats(session, user.id)
+
+    assert stats['total'] == 2  # noqa: PLR2004
+    assert stats['states'][TodoState.todo] == 1
+    assert stats['states'][TodoState.done] == 1
+    assert stats['states'][TodoState.draft] == 0
+
+
+@pytest.mark.asyncio
+async def test_repair_counters_should_fix_drift(session, user, other_user):
+    # rows written behind the API's back, e.g. before the backfill ran
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id, state=TodoState.doing))
+    await adjust_counters(session, other_user.id, Counter({TodoState.trash: 3}))
+    await session.commit()
+
+    drift = await counter_drift(session)
+    repaired = await repair_counters(session)
+
+    assert drift == [
+        {'user_id': user.id, 'state': TodoState.doing, 'stored': 0, 'actual': 2},
+        {'user_id': other_user.id, 'state': TodoState.trash, 'stored': 3, 'actual': 0},
+    ]
+    assert repaired == drift
+    assert await counter_drift(session) == []
+    assert (await todo_stats(session, user.id))['total'] == 2  # noqa: PLR2004
+
+
+def test_cli_check_counters_should_exit_1_on_drift(monkeypatch, capsys):
+    drift = [{'user_id': 1, 'state': TodoState.todo, 'stored': 0, 'actual': 1}]
+
+    async def fake_check(repair):
+        return drift
+
+    monkeypatch.setattr(cli, 'run_counter_check', fake_check)
+
+    assert cli.main(['check-counters']) == 1
+    assert cli.main(['check-counters', '--repair']) == 0
+    assert 'user 1 todo: stored 0, actual 1' in capsys.readouterr().out
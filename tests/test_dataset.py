@@ -0,0 +1,55 @@
+# tests\test_dataset.py
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import func, select
+
+from fast_zero import dataset
+from fast_zero.counters import counter_drift
+from fast_zero.dataset import DatasetSpec, generate, user_weights
+from fast_zero.models import Todo, User
+
+
+@pytest.mark.asyncio
+async def test_generate_should_load_skewed_users_and_todos(session, monkeypatch):
+    hashes = []
+
+    def counting_hash(password):
+        hashes.append(password)
+        return f'hash-of-{password}'
+
+    monkeypatch.setattr(dataset, 'get_password_hash', counting_hash)
+    spec = DatasetSpec(users=50, todos=2_000, chunk_size=300, prefix='scale')
+
+    result = await generate(session, spec)
+
+    expected_users, expected_todos = 50, 2_000
+    assert result['users'] == expected_users
+    assert result['todos'] == expected_todos
+    assert await session.scalar(select(func.count()).select_from(Todo)) == expected_todos
+    assert hashes == ['benchmark']  # one hash for every user
+    # a few heavy users, many light ones
+    assert result['heaviest_user_todos'] > 5 * result['median_user_todos']
+    # GET /todos/stats agrees with the loaded todos
+    assert await counter_drift(session) == []
+
+
+@pytest.mark.asyncio
+async def test_generate_should_be_repeatable_per_seed(session):
+    first = await generate(session, DatasetSpec(users=5, todos=100, seed=7, prefix='a'))
+    second = await generate(session, DatasetSpec(users=5, todos=100, seed=7, prefix='b'))
+
+    assert first['heaviest_user_todos'] == second['heaviest_user_todos']
+    assert await session.scalar(select(func.count()).select_from(User)) == 10  # noqa: PLR2004
+
+
+def test_user_weights_without_skew_should_be_even():
+    assert user_weights(4, 0) == [1, 2, 3, 4]
+
+
+def test_generated_user_should_log_in(client, session):
+    client.portal.call(generate, session, DatasetSpec(users=2, todos=10, prefix='login'))
+
+    response = client.post('/auth/token', data={'username': 'login_0', 'password': 'benchmark'})
+
+    assert response.status_code == HTTPStatus.OK
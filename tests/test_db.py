@@ -1,10 +1,19 @@
 # tests\test_db.py
-from sqlalchemy import select
+from http import HTTPStatus
 
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import exc, select
+
+from fast_zero.cli import MIGRATIONS, migrate_databases
+from fast_zero.database import create_engine, engine_options, pool_status
 from fast_zero.models import User
+from fast_zero.settings import Settings
 
 
-def test_create_user(session):
+@pytest.mark.asyncio
+async def test_create_user(session):
     # Arrange (Preparar)
     new_user = User(
         username='test_user',
@@ -12,10 +21,77 @@ def test_create_user(session):
         password='123456',
     )
     session.add(new_user)
-    session.commit()
-    result = session.scalar(select(User).where(User.username == 'test_user'))
+    await session.commit()
+    result = await session.scalar(select(User).where(User.username == 'test_user'))
 
     # Assert (Afirmar)
     assert result.username == 'test_user'
     assert result.email == 'test_user@test_user.com'
     assert result.password == '123456'
+
+
+@pytest.mark.asyncio
+async def test_pool_status_should_count_checkouts_and_timeouts(engine):
+    settings = Settings(
+        DATABASE_URL=engine.url.render_as_string(hide_password=False),
+        DB_POOL_SIZE=1,
+        DB_MAX_OVERFLOW=0,
+        DB_POOL_TIMEOUT=0.1,
+    )
+    pooled_engine = create_engine(settings)
+    try:
+        async with pooled_engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                await pooled_engine.connect()  # the only connection is taken
+
+            status = pool_status(pooled_engine)
+            assert status['pool'] == 'InstrumentedPool'
+            assert status['checked_out'] == 1
+            assert status['checkouts'] == 1
+            assert status['timeouts'] == 1
+            assert status['wait_max_ms'] >= 100  # noqa: PLR2004
+
+        assert pool_status(pooled_engine)['checked_out'] == 0
+    finally:
+        await pooled_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_status_should_report_the_configured_max_overflow(tmp_path):
+    settings = Settings(
+        DATABASE_URL=f'sqlite+aiosqlite:///{tmp_path / "db.db"}', DB_POOL_SIZE=2, DB_MAX_OVERFLOW=3
+    )
+    pooled_engine = create_engine(settings)
+    try:
+        status = pool_status(pooled_engine)
+        assert status['size'] == 2  # noqa: PLR2004
+        assert status['max_overflow'] == 3  # noqa: PLR2004
+
+        await pooled_engine.dispose()  # the pool is recreated with the same options
+        assert pool_status(pooled_engine)['max_overflow'] == 3  # noqa: PLR2004
+    finally:
+        await pooled_engine.dispose()
+
+
+def test_engine_options_should_skip_pool_for_in_memory_sqlite():
+    options = engine_options(Settings(DATABASE_URL='sqlite+aiosqlite:///:memory:'))
+
+    assert 'poolclass' not in options
+
+
+def test_internal_pool_endpoint(client, ops_headers):
+    response = client.get('/internal/pool', headers=ops_headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert {'pool', 'checkouts', 'timeouts'} <= set(response.json())
+
+
+def test_migrations_should_match_the_models_on_sqlite(tmp_path):
+    url = f'sqlite+aiosqlite:///{tmp_path / "db.db"}'
+    migrate_databases([url], 'head', None)
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS))
+    config.attributes['url'] = url
+
+    # neither the FTS5 tables nor the Postgres-only indexes show up as changes
+    command.check(config)
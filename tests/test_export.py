@@ -0,0 +1,58 @@
+# tests\test_export.py
+import tracemalloc
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+from fast_zero.models import Todo, TodoState
+from fast_zero.routers.todo import EXPORT_COLUMNS, stream_todos
+
+SMALL_EXPORT = 2_500
+LARGE_EXPORT = 50_000
+
+
+async def seed_todos(session, user_id: int, count: int):
+    await session.execute(delete(Todo))
+    states = list(TodoState)
+    await session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'todo {i}',
+                'description': f'exported description {i}',
+                'state': states[i % len(states)],
+                'user_id': user_id,
+            }
+            for i in range(count)
+        ],
+    )
+    await session.commit()
+
+
+async def export_peak_memory(engine, user_id: int, export_format: str) -> tuple[int, int]:
+    query = select(*(getattr(Todo, column) for column in EXPORT_COLUMNS))
+    query = query.where(Todo.user_id == user_id).order_by(Todo.id)
+
+    size = 0
+    tracemalloc.start()
+    try:
+        async for chunk in stream_todos(engine, query, export_format):
+            size += len(chunk)  # the chunk is dropped, like a socket write
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size, peak
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+async def test_export_memory_should_not_grow_with_row_count(session, user, export_format):
+    await seed_todos(session, user.id, SMALL_EXPORT)
+    small_size, small_peak = await export_peak_memory(session.bind, user.id, export_format)
+
+    await seed_todos(session, user.id, LARGE_EXPORT)
+    large_size, large_peak = await export_peak_memory(session.bind, user.id, export_format)
+
+    # 20x the rows (and bytes sent), but the same working set: one chunk at a time
+    assert large_size > small_size * 15
+    assert large_peak < small_peak * 1.5
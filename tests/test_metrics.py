@@ -0,0 +1,119 @@
+# tests\test_metrics.py
+import re
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+from fast_zero.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    RequestTimings,
+    format_labels,
+    request_latency,
+)
+
+
+def server_timing(response) -> dict:
+    return {
+        entry.split(';')[0].strip(): entry for entry in response.headers['server-timing'].split(',')
+    }
+
+
+def test_server_timing_should_report_db_and_auth_time(client, token):
+    response = client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    timings = server_timing(response)
+    assert set(timings) == {'db', 'auth', 'hash', 'total'}
+    queries = int(re.search(r'desc="(\d+) queries"', timings['db']).group(1))
+    assert queries >= 1
+    assert float(re.search(r'dur=([\d.]+)', timings['auth']).group(1)) > 0
+
+
+def test_server_timing_should_report_hash_time_on_login(client, user):
+    response = client.post(
+        '/auth/token', data={'username': user.username, 'password': user.clean_password}
+    )
+
+    hash_ms = float(re.search(r'dur=([\d.]+)', server_timing(response)['hash']).group(1))
+    assert hash_ms > 0
+
+
+def test_metrics_should_expose_route_templates(client, token, ops_headers):
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+    client.delete('/todos/999', headers={'Authorization': f'Bearer {token}'})
+    client.get('/no/such/path')
+
+    response = client.get('/metrics', headers=ops_headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    body = response.text
+    assert 'route="/todos/{todo_id}",status="404",le="+Inf"' in body
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}' in body
+    )
+    assert re.search(r'^db_queries_total \d+$', body, re.MULTILINE)
+    assert 'principal_cache_hit_rate' in body
+    assert 'db_pool_checkouts' in body
+
+
+def test_histogram_buckets_should_be_cumulative():
+    histogram = Histogram('latency', 'Test.', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(('/a',), value)
+
+    assert histogram.expose()[2:] == [
+        'latency_bucket{route="/a",le="0.1"} 2',
+        'latency_bucket{route="/a",le="1.0"} 3',
+        'latency_bucket{route="/a",le="+Inf"} 4',
+        'latency_sum{route="/a"} 5.65',
+        'latency_count{route="/a"} 4',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_middleware_should_label_requests_once_per_route():
+    route = SimpleNamespace(path='/items/{item_id}')
+
+    async def app(scope, receive, send):
+        scope['route'] = route
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+
+    async def send(message):
+        pass
+
+    middleware = MetricsMiddleware(app)
+    for _ in range(2):
+        await middleware({'type': 'http', 'method': 'GET'}, None, send)
+
+    series = request_latency.series[('GET', '/items/{item_id}', 200)]
+    assert middleware.series == {('GET', id(route), 200): (route, series)}
+    assert series[-1] == 2  # noqa: PLR2004
+
+
+def test_format_labels_should_escape_values():
+    assert format_labels([('path', 'a"b\\c')]) == '{path="a\\"b\\\\c"}'
+
+
+def test_request_timings_server_timing_header():
+    timings = RequestTimings()
+    timings.db, timings.db_queries = 0.0015, 2
+
+    assert timings.server_timing(0.01) == (
+        b'db;dur=1.50;desc="2 queries", auth;dur=0.00, hash;dur=0.00, total;dur=10.00'
+    )
+
+
+def test_ops_endpoints_should_be_disabled_without_ops_token(client):
+    assert client.get('/metrics').status_code == HTTPStatus.NOT_FOUND
+    assert client.get('/internal/queries').status_code == HTTPStatus.NOT_FOUND
+
+
+def test_ops_endpoints_should_require_the_ops_token(client, token, ops_headers):
+    response = client.get('/internal/queries', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+    assert client.get('/metrics').status_code == HTTPStatus.UNAUTHORIZED
+    assert client.get('/internal/queries', headers=ops_headers).status_code == HTTPStatus.OK
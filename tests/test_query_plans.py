@@ -0,0 +1,139 @@
+# tests\test_query_plans.py
+import json
+import re
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert, select
+
+from fast_zero.models import Todo, TodoState, User
+
+SEED_USERS = 200
+SEED_TODOS = 50_000
+
+# a full table scan on todos, but not on the todos_fts search table
+SEQ_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on todos\b'),
+    'sqlite': re.compile(r'^SCAN todos\b'),
+}
+USER_INDEX_ROUTES = {
+    '/todos/',
+    '/todos/?state=done',
+    '/todos/export',
+    '/todos/export?format=csv&state=done',
+}
+
+
+@pytest_asyncio.fixture
+async def large_todo_table(session, user):
+    await session.execute(
+        insert(User),
+        [
+            {'username': f'seed{i}', 'email': f'seed{i}@example.com', 'password': 'x'}
+            for i in range(SEED_USERS)
+        ],
+    )
+    user_ids = (await session.scalars(select(User.id))).all()
+    states = list(TodoState)
+    await session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'todo {i}',
+                'description': f'seeded description {i}',
+                'state': states[i % len(states)],
+                'user_id': user_ids[i % len(user_ids)],
+            }
+            for i in range(SEED_TODOS)
+        ],
+    )
+    await session.commit()
+
+    # fresh statistics, so the planner sees the table as large
+    async with session.bind.connect() as conn:
+        await conn.exec_driver_sql('ANALYZE')
+        await conn.commit()
+
+
+@pytest.fixture
+def captured_statements(session):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913, PLR0917
+        if executemany or 'todos' not in statement:
+            return
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            statements.append((statement, parameters))
+
+    sync_engine = session.bind.sync_engine
+    event.listen(sync_engine, 'before_cursor_execute', capture)
+    yield statements
+    event.remove(sync_engine, 'before_cursor_execute', capture)
+
+
+async def explain(engine, statement, parameters) -> str:
+    async with engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            rows = await conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+            return '\n'.join(row[0] for row in rows)
+        rows = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        return '\n'.join(row[-1] for row in rows)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('large_todo_table')
+async def test_todo_routes_should_not_seq_scan_todos(
+    client, token, session, user, captured_statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    own_todos = (
+        await session.scalars(select(Todo.id).where(Todo.user_id == user.id).limit(4))
+    ).all()
+    captured_statements.clear()  # only the queries emitted by the routes
+
+    first_page = client.get('/todos/?limit=5', headers=headers).json()
+    new_todo = {'title': 'new', 'description': 'new', 'state': 'todo'}
+
+    requests = [
+        ('get', '/todos/', None),
+        ('get', '/todos/?state=done', None),
+        ('get', '/todos/?title=todo 1', None),
+        ('get', '/todos/?description=seeded', None),
+        ('get', '/todos/?state=todo&title=todo&description=seeded', None),
+        ('get', f'/todos/?limit=5&cursor={first_page["next_cursor"]}', None),
+        ('get', '/todos/?limit=5&offset=50', None),
+        ('get', '/todos/?q=seeded', None),
+        ('get', '/todos/stats', None),
+        ('get', '/todos/export', None),
+        ('get', '/todos/export?format=csv&state=done', None),
+        ('post', '/todos/batch', [new_todo, new_todo]),
+        ('patch', '/todos/batch', [{'id': own_todos[2], 'state': 'doing'}]),
+        ('delete', '/todos/batch', [own_todos[3]]),
+        ('post', '/todos/import', json.dumps(new_todo) + '\n'),
+        ('patch', f'/todos/{own_todos[0]}', {'state': 'done'}),
+        ('delete', f'/todos/{own_todos[1]}', None),
+    ]
+    statements = {}  # url -> statements it emitted
+    for method, url, body in requests:
+        kwargs = {'content': body} if isinstance(body, str) else {'json': body} if body else {}
+        captured_statements.clear()
+        response = client.request(method.upper(), url, headers=headers, **kwargs)
+        assert response.is_success, (method, url, response.text)
+        statements[url] = list(captured_statements)
+
+    assert any(statements.values())
+    seq_scan = SEQ_SCAN[session.bind.dialect.name]
+    offenders = []
+    user_index_misses = []
+    for url, emitted in statements.items():
+        for statement, parameters in emitted:
+            plan = await explain(session.bind, statement, parameters)
+            if any(seq_scan.search(line.strip()) for line in plan.splitlines()):
+                offenders.append(f'{url}\n{statement}\n{plan}')
+            # the listings of a user's todos walk one of its (user_id, ...) indexes
+            if url in USER_INDEX_ROUTES and 'ix_todos_user_id_' not in plan:
+                user_index_misses.append(f'{url}\n{statement}\n{plan}')
+
+    assert not offenders, '\n\n'.join(offenders)
+    assert statements['/todos/export'], 'the export emitted no todos query'
+    assert not user_index_misses, '\n\n'.join(user_index_misses)
@@ -0,0 +1,139 @@
+# tests\test_querylog.py
+import logging
+from logging.handlers import BufferingHandler
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import exc, select, text
+
+from fast_zero.models import Todo
+from fast_zero.querylog import OTHER_FINGERPRINT, LogWriter, QueryLog, fingerprint
+
+
+@pytest.fixture
+def installed_log(engine):
+    logs = []
+
+    def install(**kwargs):
+        log = QueryLog(target_logger=logging.getLogger('tests.sql'), **kwargs)
+        log.install(engine.sync_engine)
+        logs.append(log)
+        return log
+
+    yield install
+    for log in logs:
+        log.uninstall(engine.sync_engine)
+
+
+def test_fingerprint_should_ignore_literals_and_list_sizes():
+    first_id, normalized = fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'a'")
+    second_id, _ = fingerprint("SELECT *\n  FROM t WHERE id IN (?) AND name = 'it''s'")
+
+    assert first_id == second_id
+    assert normalized == 'SELECT * FROM t WHERE id IN (?) AND name = ?'
+    assert fingerprint('SELECT 1 FROM t WHERE a = %(a_1)s')[1] == 'SELECT ? FROM t WHERE a = ?'
+
+
+@pytest.mark.asyncio
+async def test_query_log_should_aggregate_by_fingerprint(session, installed_log):
+    log = installed_log(threshold_ms=0)
+
+    for todo_id in (1, 2, 3):
+        await session.scalars(select(Todo).where(Todo.id == todo_id))
+
+    [stats] = [entry for entry in log.top() if 'FROM todos' in entry['statement']]
+    assert stats['count'] == 3  # noqa: PLR2004
+    assert stats['total_ms'] >= stats['max_ms'] > 0
+
+
+@pytest.mark.asyncio
+async def test_query_log_should_log_slow_selects_with_plan(session, installed_log, caplog):
+    installed_log(threshold_ms=0.000_001, explain=True)
+
+    with caplog.at_level(logging.WARNING, logger='tests.sql'):
+        await session.scalars(select(Todo).where(Todo.user_id == 1))
+
+    [record] = [r for r in caplog.records if 'FROM todos' in r.getMessage()]
+    assert record.getMessage().startswith('slow query')
+    assert record.plan  # EXPLAIN QUERY PLAN on SQLite, EXPLAIN (ANALYZE, BUFFERS) on Postgres
+    assert 'todos' in record.plan
+
+
+@pytest.mark.asyncio
+async def test_query_log_should_sample_and_skip_fast_queries(session, installed_log, caplog):
+    installed_log(threshold_ms=0.000_001, sample_rate=0)
+    installed_log(threshold_ms=60_000)
+
+    with caplog.at_level(logging.WARNING, logger='tests.sql'):
+        await session.execute(text('SELECT 1'))
+
+    assert not caplog.records
+
+
+@pytest.mark.asyncio
+async def test_query_log_should_forget_failed_statements(session, installed_log):
+    log = installed_log(threshold_ms=0)
+
+    with pytest.raises(exc.OperationalError):
+        await session.execute(text('SELECT * FROM missing_table'))
+
+    connection = await session.connection()
+    assert not connection.info[log.info_key]
+
+
+class FailingCursor:
+    def __init__(self, executed: list):
+        self.executed = executed
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement.split(' (')[0])
+        if statement.startswith('EXPLAIN'):
+            raise RuntimeError('boom')
+
+    def close(self):
+        pass
+
+
+def test_explain_plan_should_roll_back_to_a_savepoint_on_postgres():
+    executed = []
+    conn = SimpleNamespace(
+        dialect=SimpleNamespace(name='postgresql'),
+        connection=SimpleNamespace(cursor=lambda: FailingCursor(executed)),
+    )
+
+    plan = QueryLog.explain_plan(conn, 'SELECT 1', {})
+
+    assert plan == 'EXPLAIN failed: boom'
+    assert executed == [
+        'SAVEPOINT query_log_explain',
+        'EXPLAIN',
+        'ROLLBACK TO SAVEPOINT query_log_explain',
+        'RELEASE SAVEPOINT query_log_explain',
+    ]
+
+
+def test_explain_plan_should_skip_writes_in_a_with():
+    statement = 'WITH gone AS (DELETE FROM todos RETURNING id) SELECT count(*) FROM gone'
+
+    assert QueryLog.explain_plan(SimpleNamespace(), statement, {}) is None
+
+
+def test_query_log_should_cap_fingerprints():
+    log = QueryLog(threshold_ms=0, max_fingerprints=1)
+
+    log.record('a', 'SELECT a', 0.001)
+    log.record('b', 'SELECT b', 0.002)
+    log.record('c', 'SELECT c', 0.003)
+
+    assert set(log.stats) == {'a', OTHER_FINGERPRINT}
+    assert log.stats[OTHER_FINGERPRINT]['count'] == 2  # noqa: PLR2004
+
+
+def test_log_writer_should_write_from_a_background_thread():
+    collected = BufferingHandler(capacity=10)
+    writer = LogWriter(logging.getLogger('tests.writer'), collected)
+    writer.start()
+    writer.logger.warning('queued')
+    writer.stop()
+
+    assert [record.getMessage() for record in collected.buffer] == ['queued']
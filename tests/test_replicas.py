@@ -0,0 +1,148 @@
+# tests\test_replicas.py
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import exc, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fast_zero import replicas
+from fast_zero.models import Todo, TodoState, User, table_registry
+from fast_zero.replicas import ReplicaSet
+from fast_zero.response_cache import MemoryBackend, user_responses
+
+
+# the primary is the test database, the replica a second SQLite file
+@pytest.fixture
+def replica(client, tmp_path, monkeypatch):
+    replica_engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "replica.db"}')
+    monkeypatch.setattr(replicas, 'replica_set', ReplicaSet([replica_engine]))
+    yield replica_engine
+    client.portal.call(replica_engine.dispose)
+
+
+async def seed(replica_engine, user=None, titles=()):
+    # what replication would have copied so far
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        if user is not None:
+            await conn.execute(
+                insert(User).values(
+                    id=user.id, username=user.username, email=user.email, password=user.password
+                )
+            )
+        for title in titles:
+            await conn.execute(
+                insert(Todo).values(
+                    title=title, description='', state=TodoState.todo, user_id=user.id
+                )
+            )
+
+
+def test_list_todos_should_read_from_the_replica(client, user, token, replica):
+    client.portal.call(seed, replica, user, ['from the replica'])
+
+    response = client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()['todos']] == ['from the replica']
+    assert replicas.replica_set.reads == [1]
+
+
+def test_writer_should_read_its_writes_from_the_primary(client, user, token, replica):
+    client.portal.call(seed, replica, user)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    client.post(
+        '/todos/', headers=headers, json={'title': 'new', 'description': '', 'state': 'todo'}
+    )
+    replica_reads = replicas.replica_set.reads[0]
+    response = client.get('/todos/', headers=headers)
+
+    assert [todo['title'] for todo in response.json()['todos']] == ['new']
+    assert user.id in replicas.recent_writers
+    assert replicas.replica_set.reads[0] == replica_reads
+    assert replicas.replica_set.primary_reads == 1
+
+
+def test_write_should_not_check_out_a_replica(client, user, token, replica):
+    client.portal.call(seed, replica, user)
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)  # caches the principal
+
+    response = client.post(
+        '/todos/', headers=headers, json={'title': 'new', 'description': '', 'state': 'todo'}
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert replicas.replica_set.reads == [1]
+    assert replicas.replica_set.primary_reads == 0
+
+
+def test_principal_should_fall_back_to_the_primary_when_the_replica_lags(
+    client, user, token, replica
+):
+    client.portal.call(seed, replica)  # the user is not replicated yet
+
+    response = client.get('/todos/stats', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_cached_users_should_not_be_read_from_a_lagging_replica(client, user, replica, monkeypatch):
+    monkeypatch.setattr(user_responses, 'backend', MemoryBackend(max_size=100, ttl=60))
+    client.portal.call(seed, replica, user)
+    client.get('/users/')
+
+    client.post(
+        '/users/', json={'username': 'novo', 'email': 'novo@test.com', 'password': 'secret'}
+    )  # not replicated yet
+    response = client.get('/users/')
+
+    assert [row['username'] for row in response.json()['users']] == [user.username, 'novo']
+    assert replicas.replica_set.reads == [1]
+    assert user_responses.settling()
+
+
+def test_read_users_should_fail_over_to_the_primary(client, user, tmp_path, monkeypatch):
+    unreachable = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "missing" / "db.db"}')
+    monkeypatch.setattr(replicas, 'replica_set', ReplicaSet([unreachable]))
+
+    response = client.get('/users/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert [row['username'] for row in response.json()['users']] == [user.username]
+    stats = replicas.replica_set.stats()
+    assert stats['healthy'] == 0
+    assert stats['failovers'] == 1
+    assert stats['primary_reads'] == 1
+
+
+def test_replica_session_should_refuse_writes(client, replica):
+    async def write():
+        async with AsyncSession(replica, info={'read_only': True}) as session:
+            await session.execute(insert(User).values(username='x', email='x', password='x'))
+
+    with pytest.raises(exc.InvalidRequestError):
+        client.portal.call(write)
+
+
+def test_round_robin_should_rotate_and_skip_replicas_marked_down():
+    replica_set = ReplicaSet([SimpleNamespace(), SimpleNamespace(), SimpleNamespace()])
+
+    assert [replica_set.candidates()[0] for _ in range(4)] == [0, 1, 2, 0]
+
+    replica_set.mark_down(1)
+
+    assert 1 not in replica_set.candidates()
+    replica_set.retry_after = 0
+    replica_set.mark_down(1)
+    assert 1 in replica_set.candidates()  # tried again once retry_after passed
+
+
+def test_least_connections_should_prefer_the_idlest_replica(monkeypatch):
+    busy, idle = SimpleNamespace(connections=3), SimpleNamespace(connections=1)
+    monkeypatch.setattr(replicas, 'checked_out', lambda engine: engine.connections)
+    replica_set = ReplicaSet([busy, idle], strategy='least_connections')
+
+    assert replica_set.candidates() == [1, 0]
@@ -0,0 +1,101 @@
+# tests\test_response_cache.py
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from starlette.datastructures import QueryParams
+
+from fast_zero.response_cache import (
+    CachedResponse,
+    MemoryBackend,
+    NullBackend,
+    RedisBackend,
+    ResponseCache,
+)
+
+
+@pytest_asyncio.fixture(params=['memory', 'redis'])
+async def backend(request):
+    if request.param == 'memory':
+        yield MemoryBackend(max_size=10, ttl=60)
+        return
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')  # the lookup is a Lua script
+    backend = RedisBackend(fakeredis.FakeAsyncRedis(), ttl=60)
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_backend_should_return_stored_value(backend):
+    generation, value = await backend.lookup('users', '/users/?')
+    await backend.store('users', generation, '/users/?', b'body')
+
+    assert value is None
+    assert await backend.lookup('users', '/users/?') == (generation, b'body')
+
+
+@pytest.mark.asyncio
+async def test_invalidate_should_hide_entries_of_the_namespace(backend):
+    await backend.store('users', 0, '/users/1?', b'user')
+    await backend.store('todos', 0, '/todos/?', b'todos')
+    await backend.invalidate('users')
+
+    assert await backend.lookup('users', '/users/1?') == (1, None)
+    assert await backend.lookup('todos', '/todos/?') == (0, b'todos')
+
+
+@pytest.mark.asyncio
+async def test_store_after_invalidation_should_not_be_served(backend):
+    # a response read before a write must not outlive the write
+    generation, _ = await backend.lookup('users', '/users/1?')
+    await backend.invalidate('users')
+    await backend.store('users', generation, '/users/1?', b'stale')
+
+    assert (await backend.lookup('users', '/users/1?'))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_should_evict_least_recently_used():
+    backend = MemoryBackend(max_size=2, ttl=60)
+    for key in ('a', 'b', 'c'):
+        await backend.store('users', 0, key, key.encode())
+
+    assert (await backend.lookup('users', 'a'))[1] is None
+    assert backend.stats() == {'size': 2, 'max_size': 2}
+
+
+@pytest.mark.asyncio
+async def test_null_backend_should_never_cache():
+    backend = NullBackend()
+    await backend.store('users', 0, 'a', b'a')
+
+    assert await backend.lookup('users', 'a') == (0, None)
+
+
+@pytest.mark.asyncio
+async def test_redis_invalidation_should_reach_every_worker():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    server = fakeredis.FakeServer()
+    # two worker processes, each with its own client and ResponseCache
+    first, second = (
+        ResponseCache(RedisBackend(fakeredis.FakeAsyncRedis(server=server), ttl=60), 'users')
+        for _ in range(2)
+    )
+    request = SimpleNamespace(url=SimpleNamespace(path='/users/1'), query_params=QueryParams())
+    generation, _ = await first.lookup(request)
+    await first.store(generation, request, b'{"id": 1}', '"v1"')
+    assert (await second.lookup(request))[1] is not None
+
+    await first.invalidate()
+
+    assert (await second.lookup(request))[1] is None
+    await first.backend.close()
+    await second.backend.close()
+
+
+def test_cached_response_should_round_trip():
+    cached = CachedResponse(body=b'{"a":\n1}', etag='"abc"')
+
+    assert CachedResponse.load(cached.dump()) == cached
@@ -1,9 +1,24 @@
 # tests\test_security.py
+import asyncio
+import threading
 from http import HTTPStatus
 
+import pytest
+from fastapi import HTTPException
+from freezegun import freeze_time
 from jwt import decode
 
-from fast_zero.security import Settings, create_access_token
+from fast_zero import security
+from fast_zero.querylog import query_log
+from fast_zero.security import (
+    PasswordHasherPool,
+    Settings,
+    create_access_token,
+    password_hasher,
+    principal_cache,
+    token_cache,
+    token_versions,
+)
 
 settings = Settings()
 
@@ -32,3 +47,221 @@ def test_jwt_invalid_token(client):
     # Assert
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_get_current_user_should_use_principal_cache(client, user, ops_headers):
+    # tokens without the uid/ver claims resolve the user by username
+    headers = {'Authorization': f'Bearer {create_access_token({"sub": user.username})}'}
+    client.get('/todos/', headers=headers)
+    client.get('/todos/', headers=headers)
+
+    assert principal_cache.stats()['misses'] == 1
+    assert principal_cache.stats()['hits'] == 1
+
+    response = client.get('/internal/caches', headers=ops_headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['principal']['hits'] == 1
+
+
+def test_update_user_should_invalidate_principal_cache(client, user, token):
+    legacy_headers = {'Authorization': f'Bearer {create_access_token({"sub": user.username})}'}
+    client.get('/todos/', headers=legacy_headers)
+    assert user.username in principal_cache
+
+    response = client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'renamed', 'email': 'renamed@example.com', 'password': 'secret'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert user.username not in principal_cache
+
+    # the token subject no longer exists
+    response = client.get('/todos/', headers=legacy_headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_delete_user_should_invalidate_principal_cache(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.delete(f'/users/{user.id}', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert user.username not in principal_cache
+
+    response = client.get('/todos/', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_token_should_carry_user_id_and_version(user, token):
+    payload = decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    assert payload['uid'] == user.id
+    assert payload['ver'] == 0
+    assert payload['sub'] == user.username
+
+
+def test_todo_routes_should_resolve_the_principal_without_a_users_query(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+    query_log.reset()
+
+    response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert principal_cache.stats()['misses'] == 0
+    assert token_versions.stats()['hits'] == 1
+    assert not any('FROM users' in entry['statement'] for entry in query_log.top(50))
+
+
+def test_revoke_should_reject_older_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/auth/revoke', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'Tokens revoked'}
+
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.UNAUTHORIZED
+    assert (
+        client.put(
+            f'/users/{user.id}',
+            headers=headers,
+            json={'username': 'x', 'email': 'x@example.com', 'password': 'x'},
+        ).status_code
+        == HTTPStatus.UNAUTHORIZED
+    )
+
+    new_token = client.post(
+        '/auth/token', data={'username': user.username, 'password': user.clean_password}
+    ).json()['access_token']
+    response = client.get('/todos/', headers={'Authorization': f'Bearer {new_token}'})
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_newer_token_version_should_refresh_a_stale_cache(client, user, token):
+    client.post('/auth/revoke', headers={'Authorization': f'Bearer {token}'})
+    # another worker still holds the version from before the revocation
+    token_versions.set(user.id, 0)
+    new_token = create_access_token({'sub': user.username, 'uid': user.id, 'ver': 1})
+
+    response = client.get('/todos/', headers={'Authorization': f'Bearer {new_token}'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert token_versions.get(user.id) == 1
+
+
+def test_update_user_should_revoke_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={'username': user.username, 'email': user.email, 'password': 'changed'},
+    )
+
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_revoked_token_should_not_reach_a_new_account_with_the_old_username(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    old_username = user.username
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={'username': 'renamed', 'email': 'renamed@example.com', 'password': 'secret'},
+    )
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.UNAUTHORIZED
+
+    response = client.post(
+        '/users/',
+        json={'username': old_username, 'email': 'new@example.com', 'password': 'secret'},
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    new_user_id = response.json()['id']
+
+    response = client.put(
+        f'/users/{new_user_id}',
+        headers=headers,
+        json={'username': old_username, 'email': 'new@example.com', 'password': 'taken'},
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_pool_should_reject_when_queue_is_full():
+    pool = PasswordHasherPool(kind='thread', workers=1, queue_limit=1)
+    release = threading.Event()
+    # one operation running, one waiting in the queue
+    busy = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.run(release.wait)
+
+    release.set()
+    await asyncio.gather(*busy)
+    pool.shutdown()
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert pool.stats()['rejected'] == 1
+    assert pool.stats()['pending'] == 0
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_pool_with_processes():
+    pool = PasswordHasherPool(kind='process', workers=1, queue_limit=1)
+    try:
+        hashed = await pool.hash('secret')
+        assert await pool.verify('secret', hashed)
+        assert not await pool.verify('wrong', hashed)
+    finally:
+        pool.shutdown()
+
+
+def test_login_should_return_503_when_password_hasher_is_saturated(client, user, monkeypatch):
+    monkeypatch.setattr(
+        password_hasher, 'pending', password_hasher.workers + password_hasher.queue_limit
+    )
+    response = client.post(
+        '/auth/token',
+        data={'username': user.username, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+    assert response.json() == {'detail': 'Server busy, try again later.'}
+
+
+def test_decode_token_should_verify_each_token_once(client, user, token, monkeypatch, ops_headers):
+    calls = []
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(security, 'decode', counting_decode)
+    headers = {'Authorization': f'Bearer {token}'}
+    for _ in range(3):
+        assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+
+    assert calls == [token]
+    assert token_cache.stats()['hits'] == 2  # noqa: PLR2004
+    caches = client.get('/internal/caches', headers=ops_headers).json()
+    assert caches['tokens']['misses'] == 1
+
+
+def test_cached_token_should_expire_at_its_exp(client, user):
+    with freeze_time('2025-01-01 12:00:00') as frozen:
+        token = create_access_token({'sub': user.username, 'uid': user.id, 'ver': 0})
+        headers = {'Authorization': f'Bearer {token}'}
+        assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+
+        frozen.tick(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 1)
+        response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_invalid_tokens_should_not_be_cached(client):
+    client.get('/todos/', headers={'Authorization': 'Bearer invalid_token'})
+
+    assert len(token_cache) == 0
@@ -0,0 +1,44 @@
+# tests\test_serialization.py
+import json
+from datetime import UTC, datetime
+
+import pytest
+
+from fast_zero import serialization
+from fast_zero.models import TodoState
+from fast_zero.schemas import TodoPublic
+from fast_zero.serialization import dumps, row_serializer
+
+
+class Row:
+    id = 7
+    title = 'Título'
+    description = 'desc'
+    state = TodoState.doing
+    created_at = datetime(2025, 1, 2, 3, 4, 5, 678901)
+    updated_at = datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC)
+    user_id = 1  # not part of TodoPublic
+
+
+def test_row_serializer_should_follow_the_schema_fields():
+    assert list(row_serializer(TodoPublic)(Row())) == [
+        'title',
+        'description',
+        'state',
+        'id',
+        'created_at',
+        'updated_at',
+    ]
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_dumps_should_match_pydantic_json(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    row = Row()
+
+    encoded = dumps(row_serializer(TodoPublic)(row))
+
+    assert json.loads(encoded) == json.loads(
+        TodoPublic.model_validate(row, from_attributes=True).model_dump_json()
+    )
@@ -0,0 +1,68 @@
+# tests\test_server.py
+import pytest
+
+from fast_zero import server
+from fast_zero.cli import main
+from fast_zero.settings import Settings
+
+
+@pytest.fixture
+def cgroup_v2(tmp_path, monkeypatch):
+    cpu_max = tmp_path / 'cpu.max'
+    monkeypatch.setattr(server, 'CGROUP_V2_CPU_MAX', cpu_max)
+    monkeypatch.setattr(server, 'CGROUP_V1_QUOTA', tmp_path / 'missing')
+    return cpu_max
+
+
+def test_cgroup_cpu_limit_should_read_quota(cgroup_v2):
+    cgroup_v2.write_text('150000 100000\n', encoding='utf-8')
+
+    assert server.cgroup_cpu_limit() == 1.5  # noqa: PLR2004
+
+
+def test_cgroup_cpu_limit_should_be_none_when_unlimited(cgroup_v2):
+    cgroup_v2.write_text('max 100000\n', encoding='utf-8')
+
+    assert server.cgroup_cpu_limit() is None
+
+
+def test_available_cpus_should_be_capped_by_cgroup(cgroup_v2, monkeypatch):
+    monkeypatch.setattr(server.os, 'sched_getaffinity', lambda pid: set(range(8)))
+    cgroup_v2.write_text('250000 100000\n', encoding='utf-8')
+
+    assert server.available_cpus() == 3  # noqa: PLR2004
+
+
+def test_production_options_should_preload_and_recycle_workers(monkeypatch):
+    monkeypatch.setattr(server, 'available_cpus', lambda: 4)
+    settings = Settings(SERVER_MAX_REQUESTS=500, SERVER_MAX_REQUESTS_JITTER=50)
+
+    options = server.production_options(settings, '127.0.0.1', 9000)
+    app = server.ProductionServer(options)
+
+    assert app.cfg.bind == ['127.0.0.1:9000']
+    assert app.cfg.workers == 4  # noqa: PLR2004
+    assert app.cfg.preload_app is True
+    assert app.cfg.max_requests == 500  # noqa: PLR2004
+    assert app.cfg.max_requests_jitter == 50  # noqa: PLR2004
+    assert app.cfg.worker_class is server.ProductionWorker
+    assert server.ProductionWorker.CONFIG_KWARGS['loop'] == 'uvloop'
+
+
+def test_production_options_should_refuse_a_memory_cache_with_several_workers():
+    settings = Settings(RESPONSE_CACHE_BACKEND='memory')
+
+    with pytest.raises(RuntimeError, match='use redis'):
+        server.production_options(settings, '127.0.0.1', 9000, workers=2)
+    assert server.production_options(settings, '127.0.0.1', 9000, workers=1)['workers'] == 1
+
+
+def test_cli_serve_should_pick_the_mode(monkeypatch):
+    calls = []
+    monkeypatch.setattr(server, 'run_production', lambda *args: calls.append(('prod', *args)))
+    monkeypatch.setattr(server, 'run_development', lambda *args: calls.append(('dev', *args)))
+
+    main(['serve', '--workers', '2'])
+    main(['serve', '--dev', '--port', '8001'])
+
+    assert calls == [('prod', '0.0.0.0', 8000, 2), ('dev', '0.0.0.0', 8001)]
@@ -0,0 +1,206 @@
+# tests\test_shards.py
+import asyncio
+import sqlite3
+from collections import Counter
+from functools import partial
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from fast_zero import cli, shards
+from fast_zero.dataset import DatasetSpec, generate
+from fast_zero.models import Todo, TodoState, User, UserShard, table_registry
+from fast_zero.shards import (
+    ShardRouter,
+    jump_hash,
+    pin_existing,
+    plan_rebalance,
+    rebalance,
+    user_session,
+)
+
+TODO = {'title': 'Test Todo', 'description': 'Test Description', 'state': 'todo'}
+
+
+async def create_tables(shard_engine):
+    async with shard_engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+
+async def count(shard_engine, model, *where):
+    async with shard_engine.connect() as conn:
+        return await conn.scalar(select(func.count()).select_from(model).where(*where))
+
+
+# two SQLite files as shards, the test database keeps users and the directory
+@pytest.fixture
+def shard_engines(client, tmp_path):
+    engines = [
+        create_async_engine(f'sqlite+aiosqlite:///{tmp_path / f"shard{i}.db"}') for i in range(2)
+    ]
+    for shard_engine in engines:
+        client.portal.call(create_tables, shard_engine)
+    yield engines
+    for shard_engine in engines:
+        client.portal.call(shard_engine.dispose)
+
+
+@pytest.fixture
+def router(session, shard_engines, monkeypatch):
+    router = ShardRouter(session.bind, shard_engines, id_block_size=10)
+    monkeypatch.setattr(shards, 'shard_router', router)
+    return router
+
+
+def test_todos_should_be_stored_on_the_users_shard(client, user, token, router, shard_engines):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/todos/', headers=headers, json=TODO)
+
+    assert response.status_code == HTTPStatus.CREATED
+    home = router.home(user.id)
+    counts = [client.portal.call(count, e, Todo, Todo.user_id == user.id) for e in shard_engines]
+    assert counts[home] == 1
+    assert sum(counts) == 1
+    listed = client.get('/todos/', headers=headers).json()['todos']
+    assert [todo['id'] for todo in listed] == [response.json()['id']]
+    assert client.get('/todos/stats', headers=headers).json()['total'] == 1
+    # pinned on the first write
+    assert client.portal.call(count, router.directory, UserShard, UserShard.shard == home) == 1
+
+
+def test_rebalance_should_move_a_user_and_keep_its_todos(
+    client, user, token, router, shard_engines
+):
+    away = 1 - router.home(user.id)
+    client.portal.call(router.ensure_owners, away, [user.id])
+    client.portal.call(router.pin, {user.id: away})
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/todos/batch', headers=headers, json=[TODO, TODO | {'state': 'done'}])
+    before = client.get('/todos/', headers=headers).json()['todos']
+    stats = client.get('/todos/stats', headers=headers).json()
+
+    moved = client.portal.call(rebalance, router)
+
+    assert moved == {user.id: 2}
+    assert client.get('/todos/', headers=headers).json()['todos'] == before  # same ids
+    assert client.get('/todos/stats', headers=headers).json() == stats
+    assert client.portal.call(count, shard_engines[away], Todo) == 0
+    assert client.portal.call(count, shard_engines[away], User) == 0  # placeholder owner
+    assert client.portal.call(plan_rebalance, router) == {}
+
+
+def test_writes_should_wait_while_the_user_moves(client, user, token, router):
+    client.portal.call(partial(router.pin, {user.id: router.home(user.id)}, moving=True))
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/todos/', headers=headers, json=TODO)
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_move_should_wait_for_writes_that_read_the_directory(session, user, monkeypatch):
+    if session.bind.dialect.name != 'postgresql':
+        pytest.skip('row locks need Postgres')
+    router = ShardRouter(session.bind, [session.bind])
+    monkeypatch.setattr(shards, 'shard_router', router)
+    await router.pin({user.id: 0})
+
+    async with user_session(session, user.id) as todo_session:
+        mover = asyncio.create_task(router.mark_moving({user.id: 0}))
+        await asyncio.sleep(0.2)
+        assert not mover.done()  # the write still has to commit on the old shard
+
+        todo_session.add(Todo(title='t', description='d', state=TodoState.todo, user_id=user.id))
+        await todo_session.commit()
+
+    await asyncio.wait_for(mover, timeout=5)
+    assert (await router.placement(session, user.id)).moving
+
+
+def test_pin_should_keep_todos_written_before_sharding(
+    client, token, session, shard_engines, monkeypatch
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    created = client.post('/todos/', headers=headers, json=TODO).json()  # unsharded
+    router = ShardRouter(session.bind, [session.bind, shard_engines[1]])
+    monkeypatch.setattr(shards, 'shard_router', router)
+
+    pinned = client.portal.call(pin_existing, router)
+
+    assert pinned == Counter({0: 1})
+    listed = client.get('/todos/', headers=headers).json()['todos']
+    assert [todo['id'] for todo in listed] == [created['id']]
+    assert client.post('/todos/', headers=headers, json=TODO).json()['id'] > created['id']
+
+
+def test_delete_user_should_drop_its_todos_on_the_shard(client, user, token, router, shard_engines):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/todos/', headers=headers, json=TODO)
+
+    response = client.delete(f'/users/{user.id}', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    home = shard_engines[router.home(user.id)]
+    assert client.portal.call(count, home, Todo) == 0
+    assert client.portal.call(count, home, User) == 0
+
+
+def test_generated_todos_should_land_on_the_users_shards(client, session, router, shard_engines):
+    result = client.portal.call(generate, session, DatasetSpec(users=6, todos=60, prefix='shd'))
+
+    assert result['todos'] == 60  # noqa: PLR2004
+    per_shard = [client.portal.call(count, e, Todo) for e in shard_engines]
+    assert sum(per_shard) == 60  # noqa: PLR2004
+    assert client.portal.call(count, router.directory, UserShard) == 6  # noqa: PLR2004
+    assert client.portal.call(plan_rebalance, router) == {}
+    for i in range(6):
+        token = client.post(
+            '/auth/token', data={'username': f'shd_{i}', 'password': 'benchmark'}
+        ).json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+        stats = client.get('/todos/stats', headers=headers).json()
+        listed = client.get('/todos/?limit=100', headers=headers).json()['todos']
+        assert len(listed) == stats['total']
+    # the ids came from id_sequences: the API numbers new todos after them
+    created = client.post('/todos/', headers=headers, json=TODO).json()
+    assert created['id'] > 60  # noqa: PLR2004
+
+
+def test_allocated_ids_should_be_unique_across_workers(client, router, session):
+    other_worker = ShardRouter(session.bind, router.engines, id_block_size=10)
+
+    ids = [
+        *client.portal.call(router.allocate_ids, 15),
+        *client.portal.call(other_worker.allocate_ids, 5),
+        *client.portal.call(router.allocate_ids, 3),
+    ]
+
+    assert len(set(ids)) == len(ids)
+
+
+def test_jump_hash_should_only_move_keys_to_the_new_shard():
+    before = {key: jump_hash(key, 10) for key in range(10_000)}
+    after = {key: jump_hash(key, 11) for key in range(10_000)}
+
+    moved = [key for key in before if before[key] != after[key]]
+
+    assert all(after[key] == 10 for key in moved)  # noqa: PLR2004
+    # about 1 key in 11
+    assert 700 < len(moved) < 1_100  # noqa: PLR2004
+
+
+def test_migrate_databases_should_upgrade_every_shard(tmp_path):
+    paths = [tmp_path / f'db{i}.db' for i in range(2)]
+
+    cli.migrate_databases([f'sqlite+aiosqlite:///{path}' for path in paths], 'head', None)
+
+    for path in paths:
+        with sqlite3.connect(path) as conn:
+            tables = {name for (name,) in conn.execute('SELECT name FROM sqlite_master')}
+        assert {'users', 'todos', 'todo_counters', 'user_shards', 'id_sequences'} <= tables
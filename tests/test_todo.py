@@ -1,9 +1,17 @@
 # tests\test_todo.py
 
 
+import base64
+import csv
+import io
+import json
 from http import HTTPStatus
 
-from fast_zero.models import TodoState
+import pytest
+
+from fast_zero.models import Todo, TodoState
+from fast_zero.querylog import query_log
+from fast_zero.routers import todo as todo_router
 from tests.conftest import TodoFactory, UserFactory
 
 
@@ -33,10 +41,11 @@ def test_create_todo_unauthorized(client):
     assert response.json() == {'detail': 'Not authenticated'}
 
 
-def test_list_todos_should_return_5_todos(client, token, session, user):
+@pytest.mark.asyncio
+async def test_list_todos_should_return_5_todos(client, token, session, user):
     expected_todos = 5
-    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id))
-    session.commit()
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
 
     response = client.get(
         '/todos/',
@@ -46,10 +55,11 @@ def test_list_todos_should_return_5_todos(client, token, session, user):
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_list_todos_pagination_should_return_2_todos(client, token, session, user):
+@pytest.mark.asyncio
+async def test_list_todos_pagination_should_return_2_todos(client, token, session, user):
     expected_todos = 2
-    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id))
-    session.commit()
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
 
     response = client.get(
         '/todos/?limit=2&offset=0',
@@ -60,10 +70,11 @@ def test_list_todos_pagination_should_return_2_todos(client, token, session, use
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_list_todos_filter_title_should_return_5_todos(client, token, session, user):
+@pytest.mark.asyncio
+async def test_list_todos_filter_title_should_return_5_todos(client, token, session, user):
     expected_todos = 5
-    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id, title='Test Todo 1'))
-    session.commit()
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id, title='Test Todo 1'))
+    await session.commit()
 
     response = client.get(
         '/todos/?title=Test Todo 1',
@@ -73,12 +84,11 @@ def test_list_todos_filter_title_should_return_5_todos(client, token, session, u
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_list_todos_filter_description_should_return_5_todos(client, token, session, user):
+@pytest.mark.asyncio
+async def test_list_todos_filter_description_should_return_5_todos(client, token, session, user):
     expected_todos = 5
-    session.bulk_save_objects(
-        TodoFactory.create_batch(5, user_id=user.id, description='Test Description')
-    )
-    session.commit()
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id, description='Test Description'))
+    await session.commit()
 
     response = client.get(
         '/todos/?descr=Test Description',
@@ -88,10 +98,11 @@ def test_list_todos_filter_description_should_return_5_todos(client, token, sess
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_list_todos_filter_state_should_return_5_todos(client, token, session, user):
+@pytest.mark.asyncio
+async def test_list_todos_filter_state_should_return_5_todos(client, token, session, user):
     expected_todos = 5
-    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id, state=TodoState.draft))
-    session.commit()
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id, state=TodoState.draft))
+    await session.commit()
 
     response = client.get(
         '/todos/?state=draft',
@@ -101,9 +112,10 @@ def test_list_todos_filter_state_should_return_5_todos(client, token, session, u
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_list_todos_filter_combined_should_return_5_todos(client, token, session, user):
+@pytest.mark.asyncio
+async def test_list_todos_filter_combined_should_return_5_todos(client, token, session, user):
     expected_todos = 5
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             5,
             user_id=user.id,
@@ -112,7 +124,7 @@ def test_list_todos_filter_combined_should_return_5_todos(client, token, session
             state=TodoState.done,
         )
     )
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             3,
             user_id=user.id,
@@ -121,7 +133,7 @@ def test_list_todos_filter_combined_should_return_5_todos(client, token, session
             state=TodoState.todo,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/?title=Test Todo Combined&description=combined&state=done',
@@ -131,11 +143,12 @@ def test_list_todos_filter_combined_should_return_5_todos(client, token, session
     assert len(response.json()['todos']) == expected_todos
 
 
-def test_delete_todo(client, token, session, user):
+@pytest.mark.asyncio
+async def test_delete_todo(client, token, session, user):
     todo = TodoFactory(user_id=user.id)
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
 
     response = client.delete(
         f'/todos/{todo.id}',
@@ -144,11 +157,12 @@ def test_delete_todo(client, token, session, user):
     assert response.status_code == HTTPStatus.NO_CONTENT
 
     # Verify the todo was deleted
-    deleted_todo = session.get(todo.__class__, todo.id)
+    deleted_todo = await session.get(todo.__class__, todo.id)
     assert deleted_todo is None
 
 
-def test_delete_todo_not_found(client, token, session, user):
+@pytest.mark.asyncio
+async def test_delete_todo_not_found(client, token, session, user):
     response = client.delete(
         f'/todos/{10}',  # Assuming this ID does not exist
         headers={'Authorization': f'Bearer {token}'},
@@ -157,27 +171,29 @@ def test_delete_todo_not_found(client, token, session, user):
     assert response.json() == {'detail': 'Todo not found or not owned by user'}
 
 
-def test_delete_todo_unauthorized(client, session):
+@pytest.mark.asyncio
+async def test_delete_todo_unauthorized(client, session):
     user = UserFactory()
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     todo = TodoFactory.build(user_id=user.id)
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
 
     response = client.delete(f'/todos/{todo.id}')
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Not authenticated'}
 
 
-def test_update_todo(client, token, session, user):
+@pytest.mark.asyncio
+async def test_update_todo(client, token, session, user):
     todo = TodoFactory(user_id=user.id)
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
 
     updated_data = {
         'title': 'Updated Todo',
@@ -214,3 +230,436 @@ def test_update_todo_not_found(client, token):
     )
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'Todo not found or not owned by user'}
+
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination_should_walk_all_pages(client, token, session, user):
+    expected_todos = 5
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {'limit': 2} | ({'cursor': cursor} if cursor else {})
+        response = client.get(
+            '/todos/', params=params, headers={'Authorization': f'Bearer {token}'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        seen.extend(todo['id'] for todo in response.json()['todos'])
+        cursor = response.json()['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == expected_todos
+    assert seen == sorted(seen)
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'not-a-cursor',
+        base64.urlsafe_b64encode(b'{"id":1e400}').decode(),  # int(inf) overflows
+        base64.urlsafe_b64encode(b'{"id":"1"}').decode(),
+        base64.urlsafe_b64encode(b'{"id":true}').decode(),
+        base64.urlsafe_b64encode(b'{"id":1' + b'0' * 30 + b'}').decode(),
+        base64.urlsafe_b64encode(b'[1]').decode(),
+    ],
+)
+def test_list_todos_invalid_cursor_should_return_400(client, token, cursor):
+    response = client.get(
+        '/todos/', params={'cursor': cursor}, headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor.'}
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_should_return_matches_by_relevance(client, token, session, user):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='Buy bread', description='and some eggs'),
+        TodoFactory(user_id=user.id, title='Milk', description='milk milk'),
+        TodoFactory(user_id=user.id, title='Buy milk', description='at the market, with bread'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=milk',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    titles = [todo['title'] for todo in response.json()['todos']]
+    assert titles == ['Milk', 'Buy milk']
+    assert response.json()['next_cursor'] is None
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_should_only_see_own_todos(client, token, session, other_user):
+    session.add(TodoFactory(user_id=other_user.id, title='Secret milk'))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=milk',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['todos'] == []
+
+
+def test_list_todos_search_with_cursor_should_return_400(client, token):
+    response = client.get(
+        '/todos/?q=milk&cursor=eyJpZCI6MX0',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Cursor pagination is not available for search results.'}
+
+
+def test_create_todos_batch_should_report_invalid_items(client, token):
+    response = client.post(
+        '/todos/batch',
+        json=[
+            {'title': 'First', 'description': 'one', 'state': 'draft'},
+            {'title': 'Broken', 'description': 'two', 'state': 'not-a-state'},
+            {'title': 'Third', 'description': 'three', 'state': 'todo'},
+        ],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()['todos']] == ['First', 'Third']
+    assert len(response.json()['errors']) == 1
+    assert response.json()['errors'][0]['index'] == 1
+    assert response.json()['errors'][0]['detail'].startswith('state:')
+
+    response = client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+    assert len(response.json()['todos']) == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_update_todos_batch(client, token, session, user, other_user):
+    own = TodoFactory.create_batch(2, user_id=user.id, state=TodoState.draft)
+    foreign = TodoFactory(user_id=other_user.id)
+    session.add_all([*own, foreign])
+    await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        json=[
+            {'id': own[0].id, 'state': 'done'},
+            {'id': own[1].id, 'title': 'Renamed'},
+            {'id': foreign.id, 'state': 'done'},
+            {'id': 9999, 'state': 'done'},
+            {'id': own[0].id, 'state': 'trash'},
+            {'state': 'done'},
+        ],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    todos = {todo['id']: todo for todo in response.json()['todos']}
+    assert todos[own[0].id]['state'] == 'done'
+    assert todos[own[1].id]['title'] == 'Renamed'
+    assert todos[own[1].id]['state'] == 'draft'
+    assert [error['index'] for error in response.json()['errors']] == [2, 3, 4, 5]
+    assert response.json()['errors'][0]['detail'] == 'Todo not found or not owned by user'
+    assert response.json()['errors'][2]['detail'] == 'Duplicate todo id in batch.'
+
+    state = foreign.state
+    await session.refresh(foreign)
+    assert foreign.state == state
+
+
+@pytest.mark.asyncio
+async def test_update_todos_batch_should_report_null_fields(client, token, session, user):
+    own = TodoFactory.create_batch(2, user_id=user.id, state=TodoState.draft)
+    session.add_all(own)
+    await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        json=[
+            {'id': own[0].id, 'title': None},
+            {'id': own[1].id, 'state': 'done'},
+            {'id': own[0].id, 'description': 'kept', 'state': None},
+        ],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['id'] for todo in response.json()['todos']] == [own[1].id]
+    assert response.json()['todos'][0]['state'] == 'done'
+    assert response.json()['errors'] == [
+        {'index': 0, 'detail': 'title: Input should not be null'},
+        {'index': 2, 'detail': 'state: Input should not be null'},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_batch(client, token, session, user, other_user):
+    own = TodoFactory.create_batch(2, user_id=user.id)
+    foreign = TodoFactory(user_id=other_user.id)
+    session.add_all([*own, foreign])
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/batch',
+        json=[own[0].id, foreign.id, own[1].id],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'deleted': sorted([own[0].id, own[1].id]),
+        'errors': [{'index': 1, 'detail': 'Todo not found or not owned by user'}],
+    }
+    assert await session.get(Todo, foreign.id) is not None
+
+
+def test_todos_batch_should_reject_oversized_batches(client, token, monkeypatch):
+    monkeypatch.setattr(todo_router.settings, 'BATCH_MAX_SIZE', 2)
+    response = client.post(
+        '/todos/batch',
+        json=[{'title': 't', 'description': 'd', 'state': 'todo'}] * 3,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert response.json() == {'detail': 'Batch size limit is 2 items.'}
+
+
+@pytest.mark.asyncio
+async def test_export_todos_ndjson_should_apply_filters(client, token, session, user, other_user):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id, state=TodoState.done))
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id, state=TodoState.todo))
+    session.add_all(TodoFactory.create_batch(2, user_id=other_user.id, state=TodoState.done))
+    await session.commit()
+
+    response = client.get('/todos/export?state=done', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    expected_count = 3
+    assert len(lines) == expected_count
+    assert {line['state'] for line in lines} == {'done'}
+    assert [line['id'] for line in lines] == sorted(line['id'] for line in lines)
+    assert set(lines[0]) == {'id', 'title', 'description', 'state', 'created_at', 'updated_at'}
+
+
+@pytest.mark.asyncio
+async def test_export_todos_csv(client, token, session, user):
+    todo = TodoFactory(user_id=user.id, title='Comma, "quoted"', state=TodoState.draft)
+    session.add(todo)
+    await session.commit()
+
+    response = client.get('/todos/export?format=csv', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'todos.csv' in response.headers['content-disposition']
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows == [
+        {
+            'id': str(todo.id),
+            'title': 'Comma, "quoted"',
+            'description': todo.description,
+            'state': 'draft',
+            'created_at': todo.created_at.isoformat(),
+            'updated_at': todo.updated_at.isoformat(),
+        }
+    ]
+
+
+def test_export_todos_invalid_format_should_return_422(client, token):
+    response = client.get('/todos/export?format=xml', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_import_todos_ndjson_should_report_invalid_lines(client, token):
+    body = '\n'.join([
+        json.dumps({'title': 'first', 'description': 'a', 'state': 'todo'}),
+        '{not json',
+        json.dumps({'title': 'bad state', 'description': 'b', 'state': 'unknown'}),
+        '',
+        json.dumps({'title': 'second', 'description': 'c', 'state': 'done'}),
+    ])
+
+    response = client.post(
+        '/todos/import',
+        content=body.encode(),
+        headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/x-ndjson'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    expected_imported, expected_failed = 2, 2
+    assert data['imported'] == expected_imported
+    assert data['failed'] == expected_failed
+    assert [error['line'] for error in data['errors']] == [2, 3]
+    assert 'state' in data['errors'][1]['detail']
+
+    todos = client.get('/todos/', headers={'Authorization': f'Bearer {token}'}).json()['todos']
+    assert [todo['title'] for todo in todos] == ['first', 'second']
+
+
+def test_import_todos_csv_should_handle_quoted_fields(client, token):
+    body = (
+        'title,description,state\r\n'
+        '"Comma, ""quoted""","spans\r\ntwo lines",draft\r\n'
+        'missing,fields\r\n'
+        'plain,row,doing\r\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv',
+        content=body.encode(),
+        headers={'Authorization': f'Bearer {token}', 'Content-Type': 'text/csv'},
+    )
+    expected_imported = 2
+    assert response.json()['imported'] == expected_imported
+    assert response.json()['errors'] == [{'line': 4, 'detail': 'expected 3 fields, got 2'}]
+
+    todos = client.get('/todos/', headers={'Authorization': f'Bearer {token}'}).json()['todos']
+    assert [(todo['title'], todo['description']) for todo in todos] == [
+        ('Comma, "quoted"', 'spans\r\ntwo lines'),
+        ('plain', 'row'),
+    ]
+
+
+def test_import_todos_should_report_lines_that_are_not_utf8(client, token):
+    body = b'\n'.join([
+        json.dumps({'title': 'first', 'description': 'a', 'state': 'todo'}).encode(),
+        '{"title": "caf\u00e9", "description": "b", "state": "todo"}'.encode('latin-1'),
+    ])
+
+    response = client.post(
+        '/todos/import', content=body, headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['imported'] == 1
+    assert response.json()['errors'] == [{'line': 2, 'detail': 'invalid UTF-8 at byte 15'}]
+
+
+def test_import_todos_should_cap_reported_errors(client, token, monkeypatch):
+    monkeypatch.setattr(todo_router.settings, 'IMPORT_MAX_ERRORS', 2)
+    monkeypatch.setattr(todo_router.settings, 'IMPORT_CHUNK_SIZE', 2)
+
+    response = client.post(
+        '/todos/import',
+        content=b'[]\n' * 5,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    expected_failed, expected_reported = 5, 2
+    assert response.json()['imported'] == 0
+    assert response.json()['failed'] == expected_failed
+    assert len(response.json()['errors']) == expected_reported
+
+
+@pytest.mark.asyncio
+async def test_list_todos_fast_json_should_match_response_model(
+    client, token, session, user, monkeypatch
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    validated = client.get('/todos/?limit=2', headers=headers)
+
+    monkeypatch.setattr(todo_router.settings, 'FAST_JSON', True)
+    fast = client.get('/todos/?limit=2', headers=headers)
+
+    assert fast.status_code == HTTPStatus.OK
+    assert fast.headers['content-type'] == 'application/json'
+    assert fast.json() == validated.json()
+
+
+@pytest.mark.asyncio
+async def test_list_todos_etag_should_return_304_until_todos_change(client, token, session, user):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/', headers=headers)
+    etag = first.headers['etag']
+    cached = client.get('/todos/', headers={**headers, 'If-None-Match': f'W/{etag}'})
+    other_page = client.get('/todos/?limit=1', headers={**headers, 'If-None-Match': etag})
+    client.post(
+        '/todos/', headers=headers, json={'title': 'new', 'description': 'new', 'state': 'todo'}
+    )
+    after_create = client.get('/todos/', headers={**headers, 'If-None-Match': etag})
+
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert not cached.content
+    assert cached.headers['etag'] == etag
+    assert other_page.status_code == HTTPStatus.OK
+    assert after_create.status_code == HTTPStatus.OK
+    assert after_create.headers['etag'] != etag
+
+
+@pytest.mark.asyncio
+async def test_list_todos_etag_should_change_when_a_todo_is_updated(client, token, session, user):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['etag']
+    search_etag = client.get('/todos/?q=zzz', headers=headers).headers['etag']
+
+    # no state change, only the list version moves
+    client.patch(f'/todos/{todo.id}', headers=headers, json={'title': 'renamed'})
+
+    response = client.get('/todos/', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    response = client.get('/todos/?q=zzz', headers={**headers, 'If-None-Match': search_etag})
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_list_todos_etag_should_not_scan_the_users_todos(client, token, session, user):
+    session.add_all(TodoFactory.create_batch(30, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+    query_log.reset()
+
+    response = client.get('/todos/?limit=5', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    statements = [entry['statement'] for entry in query_log.top(50)]
+    # the page itself, LIMIT n + 1, and the list version by primary key
+    assert not any('count(' in statement or 'max(' in statement for statement in statements)
+    assert all('LIMIT' in statement for statement in statements if 'FROM todos' in statement)
+    assert any('FROM todo_list_versions' in statement for statement in statements)
+
+
+def test_todo_stats_should_follow_every_write_path(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = client.post(
+        '/todos/', headers=headers, json={'title': 'a', 'description': 'a', 'state': 'draft'}
+    ).json()
+    batch = client.post(
+        '/todos/batch',
+        headers=headers,
+        json=[{'title': str(i), 'description': 'b', 'state': 'todo'} for i in range(3)],
+    ).json()['todos']
+    client.patch(f'/todos/{todo["id"]}', headers=headers, json={'state': 'doing'})
+    client.patch(
+        '/todos/batch',
+        headers=headers,
+        json=[{'id': batch[0]['id'], 'state': 'done'}, {'id': batch[1]['id'], 'title': 'x'}],
+    )
+    client.request('DELETE', '/todos/batch', headers=headers, json=[batch[2]['id']])
+    client.post(
+        '/todos/import',
+        headers=headers,
+        content='{"title": "i", "description": "i", "state": "trash"}\n',
+    )
+    client.delete(f'/todos/{todo["id"]}', headers=headers)
+
+    response = client.get('/todos/stats', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'total': 3,
+        'states': {'draft': 0, 'todo': 1, 'doing': 0, 'done': 1, 'trash': 1},
+    }
@@ -1,7 +1,12 @@
 # tests\test_users.py
 from http import HTTPStatus
 
-from fast_zero.schemas import UserPublic
+import pytest
+
+from fast_zero.querylog import query_log
+from fast_zero.response_cache import MemoryBackend, user_responses
+from fast_zero.schemas import UserList, UserPublic
+from fast_zero.security import password_hasher
 
 
 def test_criar_usuario_deve_retornar_201(client):
@@ -34,7 +39,8 @@ def test_listar_usuarios_deve_retornar_200(client, user):
                 'username': user.username,
                 'email': user.email,
             }
-        ]
+        ],
+        'next_cursor': None,
     }
 
 
@@ -45,7 +51,7 @@ def test_read_users_with_user(client, user):
     # Assert (Afirmar)
     assert response.status_code == HTTPStatus.OK
     # validar UserList # voltou a lista de usuários correta?
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
 
 
 def test_listar_usuarios_com_banco_vazio_deve_retornar_404(client, limpar_banco):
@@ -207,3 +213,121 @@ def test_criar_usuario_com_email_duplicado_deve_retornar_400(client, user):
 
     assert response.status_code == HTTPStatus.BAD_REQUEST
     assert response.json() == {'detail': 'Email already exists.'}
+
+
+def test_listar_usuarios_com_cursor(client, user, other_user):
+    response = client.get('/users/?limit=1')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['users'][0]['id'] == user.id
+    cursor = response.json()['next_cursor']
+    assert cursor
+
+    response = client.get(f'/users/?limit=1&cursor={cursor}')
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'users': [
+            {'id': other_user.id, 'username': other_user.username, 'email': other_user.email}
+        ],
+        'next_cursor': None,
+    }
+
+
+def test_read_users_cached_body_should_match_response_model(client, user, other_user):
+    # the public reads serialize the rows themselves for the response cache
+    response = client.get('/users/')
+    cached = client.get('/users/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert UserList.model_validate(response.json()).model_dump(mode='json') == response.json()
+    assert cached.content == response.content
+    assert cached.headers['etag'] == response.headers['etag']
+
+
+def test_update_user_should_hash_outside_a_transaction(client, user, token, session, monkeypatch):
+    in_transaction = []
+    hash_password = password_hasher.hash
+
+    async def spy(password):
+        in_transaction.append(session.in_transaction())
+        return await hash_password(password)
+
+    monkeypatch.setattr(password_hasher, 'hash', spy)
+
+    response = client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'renamed', 'email': user.email, 'password': 'secret'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert in_transaction == [False]
+
+
+@pytest.fixture
+def memory_cache(monkeypatch):
+    # the response cache is off by default
+    monkeypatch.setattr(user_responses, 'backend', MemoryBackend(max_size=100, ttl=60))
+
+
+def test_read_users_should_be_cached_until_a_write(client, user, token, memory_cache):
+    first = client.get('/users/')
+    client.post(
+        '/users/',
+        json={'username': 'novo', 'email': 'novo@test.com', 'password': 'secret'},
+    )
+    after_create = client.get('/users/')
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'renamed', 'email': user.email, 'password': 'secret'},
+    )
+    after_update = client.get(f'/users/{user.id}')
+
+    expected_users = 2
+    assert len(first.json()['users']) == 1
+    assert len(after_create.json()['users']) == expected_users
+    assert after_update.json()['username'] == 'renamed'
+    stats = user_responses.stats()
+    assert stats['backend'] == 'memory'
+    assert stats['hits'] == 0
+    assert stats['misses'] == 3  # noqa: PLR2004
+
+
+def test_read_user_should_hit_the_cache_without_the_database(client, user, memory_cache):
+    client.get(f'/users/{user.id}')
+    query_log.reset()
+    response = client.get(f'/users/{user.id}')
+
+    assert response.json() == {'id': user.id, 'username': user.username, 'email': user.email}
+    assert user_responses.stats()['hits'] == 1
+    assert not query_log.top(10)
+
+
+def test_read_user_not_found_should_not_be_cached(client, user, memory_cache):
+    client.get('/users/999')
+    response = client.get('/users/999')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert user_responses.stats()['hits'] == 0
+
+
+def test_delete_user_should_invalidate_the_cache(client, user, token, memory_cache):
+    client.get(f'/users/{user.id}')
+    client.delete(f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'})
+
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.NOT_FOUND
+
+
+def test_read_user_etag_should_return_304(client, user):
+    response = client.get(f'/users/{user.id}')
+    etag = response.headers['etag']
+
+    cached = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+    any_etag = client.get(f'/users/{user.id}', headers={'If-None-Match': '*'})
+    stale = client.get(f'/users/{user.id}', headers={'If-None-Match': '"stale", "older"'})
+
+    assert response.json() == {'id': user.id, 'username': user.username, 'email': user.email}
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert any_etag.status_code == HTTPStatus.NOT_MODIFIED
+    assert stale.status_code == HTTPStatus.OK
+    assert stale.headers['etag'] == etag